@@ -0,0 +1,231 @@
+import sys
+import os.path
+
+# Import from src/ the same way its modules import each other
+sys.path[0] = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir, 'src'))
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from core import Core
+from commands import CommandEmitter
+from camera.base import BaseCamera
+from camera.detection import Detection, DetectionBatch
+from camera.snapshot import FrameSnapshot
+from rules.backoff import BackoffRule
+from rules.follow import FollowRule
+from rules.search import SearchRule
+from rules.none import NoDetectionRule
+from testutils.vehicle import MockVehicle
+from tracking.tracker import Tracker
+
+# Benchmarks for the host-side hot path, run entirely in-process against a
+# mock vehicle and synthetic detections. Each benchmark reports operations per
+# second, and how much memory a single operation allocates.
+#
+#   python benchmarks/run.py                  run, and compare against the baseline
+#   python benchmarks/run.py --save-baseline  run, and store the results as the new baseline
+#   python benchmarks/run.py --check          fail if anything regressed past the threshold
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+PEOPLE        = [0, 1, 5, 10, 50]
+FRAMES        = 256 # distinct synthetic frames cycled through by each benchmark
+
+class SyntheticCamera(BaseCamera):
+    def running(self):
+        return True
+
+def syntheticFrames(people: int, seed: int = 0):
+    '''
+    Snapshots with `people` detections each, scattered in front of the camera
+    '''
+
+    generator = random.Random(seed)
+    frames = []
+
+    for sequence in range(1, FRAMES + 1):
+        detections = [Detection(generator.uniform(-3, 3), generator.uniform(-1, 1), generator.uniform(0.5, 10), generator.uniform(0.85, 1), 30) for _ in range(people)]
+        batch = DetectionBatch.fromDetections(detections, float(sequence), 30)
+        frames.append(FrameSnapshot.create(sequence, float(sequence), batch))
+
+    return frames
+
+def coreTick(people):
+    core = Core(MockVehicle(), SyntheticCamera())
+    core.startRunning()
+    frames = syntheticFrames(people)
+
+    def run(i):
+        core.tick(frames[i % FRAMES], i * 0.01)
+        if i % 1000 == 0:
+            core.vehicle.messages.clear()
+
+    return run
+
+def closestDetection(people):
+    camera = SyntheticCamera()
+    batches = [frame.detections for frame in syntheticFrames(people)]
+
+    def run(i):
+        camera._publishDetections(batches[i % FRAMES], 0.0)
+        camera.closestDetection()
+
+    return run
+
+def syntheticTracks(frames):
+    tracker = Tracker()
+    tracks = []
+
+    for frame in frames:
+        tracker.update(frame.detections, frame.detections.captureTime)
+        tracks.append(tracker.predict(frame.detections.captureTime))
+
+    return tracks
+
+def rule(ruleClass, people):
+    instance = ruleClass(None, None)
+    frames = syntheticFrames(people)
+    tracks = syntheticTracks(frames)
+
+    def run(i):
+        instance.update(frames[i % FRAMES], tracks[i % FRAMES])
+        instance.isActive()
+
+    return run
+
+def tracker(people):
+    instance = Tracker()
+    frames = syntheticFrames(people)
+
+    def run(i):
+        # Restart rather than go back in time when the frames wrap around
+        if i % FRAMES == 0:
+            instance.reset()
+
+        batch = frames[i % FRAMES].detections
+        instance.update(batch, batch.captureTime)
+        instance.predict(batch.captureTime)
+
+    return run
+
+def emitter():
+    vehicle = MockVehicle()
+    instance = CommandEmitter(vehicle)
+
+    def run(i):
+        # Always changes, so that every call encodes and sends
+        instance.setPositionTarget((1.0 + (i % 2), 0.5), 10.0, i * 1.0)
+        if i % 1000 == 0:
+            vehicle.messages.clear()
+
+    return run
+
+def benchmarks():
+    cases = {}
+
+    for people in PEOPLE:
+        cases['core.tick[%d]' % people] = lambda people=people: coreTick(people)
+        cases['camera.closestDetection[%d]' % people] = lambda people=people: closestDetection(people)
+        cases['tracker.update[%d]' % people] = lambda people=people: tracker(people)
+
+    for ruleClass in [BackoffRule, FollowRule, SearchRule, NoDetectionRule]:
+        for people in [0, 1, 50]:
+            cases['%s.update[%d]' % (ruleClass.__name__, people)] = lambda ruleClass=ruleClass, people=people: rule(ruleClass, people)
+
+    cases['commands.setPositionTarget'] = emitter
+
+    return cases
+
+def measure(setup, duration: float):
+    run = setup()
+
+    # Warm up, and find roughly how many iterations fit in the duration
+    iterations = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration / 10:
+        run(iterations)
+        iterations += 1
+
+    iterations *= 10
+    start = time.perf_counter()
+    for i in range(iterations):
+        run(i)
+    elapsed = time.perf_counter() - start
+
+    # Allocations are measured separately, as tracing slows everything down
+    tracemalloc.start()
+    peak = 0
+    for i in range(100):
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        run(i)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+
+    before = tracemalloc.take_snapshot()
+    for i in range(1000):
+        run(i)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+
+    return {
+        "opsPerSec": iterations / elapsed,
+        "peakBytesPerOp": peak,
+        "retainedBlocksPerOp": retained / 1000.0
+    }
+
+def main(args):
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, 'r') as file:
+            baseline = json.load(file)
+
+    results = {}
+    regressions = []
+
+    print('{:<36} {:>12} {:>10} {:>12} {:>10}'.format('benchmark', 'ops/sec', 'vs base', 'peak B/op', 'kept/op'))
+
+    for name, setup in benchmarks().items():
+        if args.filter and args.filter not in name:
+            continue
+
+        result = measure(setup, args.duration)
+        results[name] = result
+
+        comparison = ''
+        if name in baseline:
+            ratio = result["opsPerSec"] / baseline[name]["opsPerSec"]
+            comparison = '{:.2f}x'.format(ratio)
+
+            if ratio < 1.0 - args.threshold:
+                regressions.append(name)
+                comparison += ' !'
+
+        print('{:<36} {:>12.0f} {:>10} {:>12} {:>10.2f}'.format(name, result["opsPerSec"], comparison, result["peakBytesPerOp"], result["retainedBlocksPerOp"]))
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, 'w') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print('Saved baseline to: ' + BASELINE_PATH)
+
+    if len(regressions) > 0:
+        print('Slower than baseline by more than {:.0f}%: {}'.format(args.threshold * 100, ', '.join(regressions)))
+
+        if args.check:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--duration', type=float, required=False, default=0.5, help="Seconds to spend timing each benchmark")
+    parser.add_argument('--filter', type=str, required=False, default=None, help="Only run benchmarks containing this text")
+    parser.add_argument('--threshold', type=float, required=False, default=0.2, help="Fraction slower than baseline to count as a regression")
+    parser.add_argument('--save-baseline', required=False, default=False, help="Store these results as the new baseline", action='store_true')
+    parser.add_argument('--check', required=False, default=False, help="Exit with an error if anything regressed", action='store_true')
+
+    main(parser.parse_args())
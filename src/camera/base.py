@@ -1,13 +1,34 @@
+import threading
+
+from clock import Clock, REAL_CLOCK
+from .detection import DetectionBatch
+from .snapshot import FrameSnapshot, EMPTY_SNAPSHOT
+
 class BaseCamera:
 
-    def __init__(self):
-        pass
+    clock: Clock = REAL_CLOCK
+
+    _snapshot: FrameSnapshot = EMPTY_SNAPSHOT
+    _frameCondition: threading.Condition = None
+
+    def __init__(self, clock: Clock = None):
+        self.clock = clock if clock != None else REAL_CLOCK
+        self._snapshot = EMPTY_SNAPSHOT
+        self._frameCondition = threading.Condition()
 
     def running(self):
         return False
 
-    def detections(self):
-        return []
+    def snapshot(self) -> FrameSnapshot:
+        '''
+        The most recently published frame. This is swapped as a whole by the camera,
+        so it is safe to read from any thread without locking.
+        '''
+
+        return self._snapshot
+
+    def detections(self) -> DetectionBatch:
+        return self._snapshot.detections
 
     def start(self):
         pass
@@ -16,10 +37,31 @@ class BaseCamera:
         pass
 
     def closestDetection(self):
-        closest = None
+        return self._snapshot.closest
+
+    def waitForDetections(self, sequence: int, timeout: float) -> FrameSnapshot:
+        '''
+        Blocks until a frame newer than `sequence` has been published, or until
+        `timeout` seconds have passed. Returns the latest frame either way.
+        '''
+
+        with self._frameCondition:
+            self.clock.wait(self._frameCondition, lambda: self._snapshot.sequence != sequence, timeout)
+            return self._snapshot
+
+    def _publishDetections(self, detections: DetectionBatch, timestamp: float = None) -> FrameSnapshot:
+        '''
+        Publishes a new frame of detections, and wakes up anything waiting on it.
+        Implementations should call this once per frame, even if nothing was detected.
+
+        `timestamp` is when the host received the frame, and defaults to now.
+        '''
+
+        if timestamp == None:
+            timestamp = self.clock.now()
 
-        for detection in self.detections():
-            if closest == None: closest = detection
-            elif closest.z > detection.z: closest = detection
+        with self._frameCondition:
+            self._snapshot = FrameSnapshot.create(self._snapshot.sequence + 1, timestamp, detections)
+            self._frameCondition.notify_all()
 
-        return closest
\ No newline at end of file
+            return self._snapshot
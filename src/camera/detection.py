@@ -2,19 +2,156 @@
 A detection represents the location of a person, relative to the center of
 the camera's reference frame.
 '''
+
+import numpy as np
+
 class Detection():
 
-    x = 0
-    y = 0
-    z = 0
-    confidence = 0
-    fps = 0
+    __slots__ = ('x', 'y', 'z', 'confidence', 'fps', 'timestamp')
 
-    def __init__(self, x, y, z, confidence, fps):
+    def __init__(self, x, y, z, confidence, fps, timestamp = 0.0):
         # NOTE: incoming parameters are all m.
 
         self.x = x
         self.y = y
         self.z = z
         self.confidence = confidence
-        self.fps = fps
\ No newline at end of file
+        self.fps = fps
+        self.timestamp = timestamp # capture time of the frame, from the camera's clock
+
+# Layout of a single row in a DetectionBatch. Coordinates are in m, and the
+# bounding box is normalised to the frame size.
+DETECTION_DTYPE = np.dtype([
+    ('x',          np.float32),
+    ('y',          np.float32),
+    ('z',          np.float32),
+    ('confidence', np.float32),
+    ('xmin',       np.float32),
+    ('ymin',       np.float32),
+    ('xmax',       np.float32),
+    ('ymax',       np.float32),
+    ('label',      np.int16),
+    ('timestamp',  np.float64),
+])
+
+PERSON_LABEL = 0
+
+class DetectionBatch():
+    '''
+    All detections from a single frame, stored as one NumPy structured array
+    rather than a list of objects. Filters return a new batch and never modify
+    this one.
+
+    `captureTime` is when the frame was captured, from the camera's clock. It
+    is 0 if unknown. `receiveTime` and `sequence` are set when the camera
+    publishes the batch, and are 0 until then.
+    '''
+
+    __slots__ = ('records', 'fps', 'captureTime', 'receiveTime', 'sequence')
+
+    def __init__(self, records: np.ndarray = None, fps: float = 0.0, captureTime: float = 0.0, receiveTime: float = 0.0, sequence: int = 0):
+        self.records = records if records is not None else np.empty(0, dtype=DETECTION_DTYPE)
+        self.fps = fps
+        self.captureTime = captureTime
+        self.receiveTime = receiveTime
+        self.sequence = sequence
+
+    @staticmethod
+    def fromDepthai(detections, captureTime: float, fps: float) -> 'DetectionBatch':
+        '''
+        Converts a list of depthai `SpatialImgDetection` into a batch. depthai reports
+        spatial coordinates in mm, these are converted to m.
+        '''
+
+        records = np.array([(
+            d.spatialCoordinates.x, d.spatialCoordinates.y, d.spatialCoordinates.z,
+            d.confidence,
+            d.xmin, d.ymin, d.xmax, d.ymax,
+            d.label,
+            captureTime
+        ) for d in detections], dtype=DETECTION_DTYPE)
+
+        for axis in ('x', 'y', 'z'):
+            records[axis] /= 1000.0
+
+        return DetectionBatch(records, fps, captureTime)
+
+    @staticmethod
+    def fromDetections(detections, captureTime: float, fps: float, label = PERSON_LABEL) -> 'DetectionBatch':
+        records = np.array([(
+            d.x, d.y, d.z,
+            d.confidence,
+            0.0, 0.0, 0.0, 0.0,
+            label,
+            captureTime
+        ) for d in detections], dtype=DETECTION_DTYPE)
+
+        return DetectionBatch(records, fps, captureTime)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index: int) -> Detection:
+        record = self.records[index]
+        return Detection(float(record['x']), float(record['y']), float(record['z']), float(record['confidence']), self.fps, float(record['timestamp']))
+
+    def __iter__(self):
+        for index in range(len(self.records)):
+            yield self[index]
+
+    def stamped(self, sequence: int, receiveTime: float) -> 'DetectionBatch':
+        '''
+        A copy of this batch as published, sharing the same records.
+        '''
+
+        return DetectionBatch(self.records, self.fps, self.captureTime, receiveTime, sequence)
+
+    def age(self, now: float) -> float:
+        '''
+        Seconds since the frame was captured, or since it was received if the
+        capture time is unknown.
+        '''
+
+        return now - (self.captureTime if self.captureTime > 0 else self.receiveTime)
+
+    def filterLabel(self, label: int) -> 'DetectionBatch':
+        return self._filter(self.records['label'] == label)
+
+    def filterDepth(self, minimum: float = None, maximum: float = None) -> 'DetectionBatch':
+        '''
+        Keeps detections with a depth strictly between `minimum` and `maximum`, in m.
+        '''
+
+        mask = np.ones(len(self.records), dtype=bool)
+        if minimum is not None:
+            mask &= self.records['z'] > minimum
+        if maximum is not None:
+            mask &= self.records['z'] < maximum
+
+        return self._filter(mask)
+
+    def filterConfidence(self, minimum: float) -> 'DetectionBatch':
+        return self._filter(self.records['confidence'] >= minimum)
+
+    def closestIndex(self) -> int:
+        '''
+        Index of the detection with the smallest depth, or -1 if the batch is empty.
+        '''
+
+        if len(self.records) == 0:
+            return -1
+
+        return int(np.argmin(self.records['z']))
+
+    def closest(self) -> Detection:
+        index = self.closestIndex()
+        return self[index] if index >= 0 else None
+
+    def _filter(self, mask: np.ndarray) -> 'DetectionBatch':
+        if mask.all():
+            return self
+
+        return DetectionBatch(self.records[mask], self.fps, self.captureTime, self.receiveTime, self.sequence)
+
+EMPTY_BATCH = DetectionBatch()
+EMPTY_BATCH.records.flags.writeable = False
@@ -0,0 +1,16 @@
+import numpy as np
+
+from .detection import DetectionBatch
+
+class BaseDetector:
+    '''
+    Finds people in a frame on the host, for cameras that can't detect on device.
+
+    Detectors that can be called from several threads at once should set
+    `threadSafe`, otherwise calls are made one at a time.
+    '''
+
+    threadSafe = False
+
+    def detect(self, frame: np.ndarray, captureTime: float) -> DetectionBatch:
+        return DetectionBatch(captureTime=captureTime)
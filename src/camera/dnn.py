@@ -0,0 +1,338 @@
+'''
+Person detection on the host's CPU with OpenCV's DNN module, for when there is
+no OAK-D to run the network on.
+
+The network is expected to output YOLO rows as OpenCV's Darknet importer
+does: centre x, centre y, width and height normalised to the input, then
+objectness, then a score per class that already includes objectness.
+YOLOv4-tiny from Darknet, or exported to ONNX in the same layout, works as is.
+'''
+
+from collections import deque
+from pathlib import Path
+from typing import List
+import threading
+
+import cv2
+import numpy as np
+
+from clock import Clock
+from constants import DETECTION_THRESH
+from constants import DNN_INPUT_SIZES, DNN_NMS_THRESHOLD, DNN_FIXED_DEPTH, DNN_HFOV, DNN_ADAPT_FRAMES, DNN_UPSCALE_HEADROOM
+from constants import DNN_WORKERS, DNN_BATCH_SIZE, DNN_TARGET_FPS
+from .base import BaseCamera
+from .detection import DetectionBatch, DETECTION_DTYPE, PERSON_LABEL
+from .detector import BaseDetector
+
+MODEL_PATH  = str((Path(__file__).parent / Path('../../models/yolov4-tiny.weights')).resolve().absolute())
+CONFIG_PATH = str((Path(__file__).parent / Path('../../models/yolov4-tiny.cfg')).resolve().absolute())
+MIN_DEPTH   = 0.5           # m, the closest depth to trust, as for YoloCamera
+DEPTH_RANGE = (250, 10000)  # mm, depth map values outside this are ignored, as on the OAK-D
+
+class DnnDetector(BaseDetector):
+    '''
+    Runs a YOLO network with OpenCV. Each thread that calls it gets its own copy
+    of the network, so it can be called from a pool of threads at once.
+
+    Depth is the median of a supplied depth map (in mm, aligned to the frame)
+    over the middle of each bounding box, or `depth` meters if there is no map.
+    x and y are then found from where the box is in the frame and the camera's
+    horizontal `fov`, with y up.
+
+    Given a `budget` of seconds per frame, the input size steps down through
+    `inputSizes` while inference takes longer than that, and back up once the
+    next size up is expected to fit.
+    '''
+
+    threadSafe = True
+
+    inputSize = 0
+    budget: float = None
+    fps = 0.0
+
+    def __init__(self, model: str = MODEL_PATH, config: str = CONFIG_PATH, inputSizes = DNN_INPUT_SIZES,
+                 threshold: float = DETECTION_THRESH, nmsThreshold: float = DNN_NMS_THRESHOLD,
+                 depth: float = DNN_FIXED_DEPTH, fov: float = DNN_HFOV, budget: float = None):
+        self.model = model
+        self.config = config
+        self.inputSizes = sorted(inputSizes, reverse=True)
+        self.inputSize = self.inputSizes[0]
+        self.threshold = threshold
+        self.nmsThreshold = nmsThreshold
+        self.depth = depth
+        self.tanHalfFov = np.tan(np.radians(fov) / 2)
+        self.budget = budget
+
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._frameTime = None
+        self._framesAtSize = 0
+        self._counter = 0
+        self._counterStart = None
+
+    def detect(self, frame: np.ndarray, captureTime: float, depthMap: np.ndarray = None) -> DetectionBatch:
+        return self.detectBatch([frame], [captureTime], [depthMap] if depthMap is not None else None)[0]
+
+    def detectBatch(self, frames: List[np.ndarray], captureTimes: List[float], depthMaps: List[np.ndarray] = None) -> List[DetectionBatch]:
+        '''
+        Detects people in several frames with one pass of the network.
+        '''
+
+        net, outputNames = self._network()
+        size = self.inputSize
+
+        start = cv2.getTickCount()
+
+        blob = cv2.dnn.blobFromImages(frames, 1 / 255.0, (size, size), swapRB=True, crop=False)
+        net.setInput(blob)
+        outputs = [self._perImage(output, len(frames)) for output in net.forward(outputNames)]
+
+        self._adapt((cv2.getTickCount() - start) / cv2.getTickFrequency() / len(frames), size, len(frames))
+
+        batches = []
+        for i, frame in enumerate(frames):
+            rows = np.concatenate([output[i] for output in outputs])
+            depthMap = depthMaps[i] if depthMaps is not None else None
+            batches.append(self._decode(rows, frame.shape, depthMap, captureTimes[i]))
+
+        return batches
+
+    def _createNet(self):
+        net = cv2.dnn.readNet(self.model, self.config)
+        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+        return net
+
+    def _network(self):
+        if not hasattr(self._local, 'net'):
+            self._local.net = self._createNet()
+            self._local.outputNames = self._local.net.getUnconnectedOutLayersNames()
+
+        return (self._local.net, self._local.outputNames)
+
+    @staticmethod
+    def _perImage(output: np.ndarray, count: int) -> np.ndarray:
+        # Batched outputs are either (images, rows, values), or every image's rows stacked
+        if output.ndim == 3:
+            return output
+
+        return output.reshape(count, -1, output.shape[-1])
+
+    def _decode(self, rows: np.ndarray, shape, depthMap: np.ndarray, captureTime: float) -> DetectionBatch:
+        scores = rows[:, 5 + PERSON_LABEL]
+        rows = rows[scores >= self.threshold]
+        scores = scores[scores >= self.threshold]
+
+        if len(rows) > 0:
+            boxes = np.empty((len(rows), 4))
+            boxes[:, 0:2] = rows[:, 0:2] - rows[:, 2:4] / 2
+            boxes[:, 2:4] = rows[:, 2:4]
+
+            kept = np.array(cv2.dnn.NMSBoxes(boxes.tolist(), scores.tolist(), self.threshold, self.nmsThreshold), dtype=np.int64).reshape(-1)
+            rows = rows[kept]
+            scores = scores[kept]
+
+        records = np.zeros(len(rows), dtype=DETECTION_DTYPE)
+        records['confidence'] = scores
+        records['xmin'] = np.clip(rows[:, 0] - rows[:, 2] / 2, 0, 1)
+        records['ymin'] = np.clip(rows[:, 1] - rows[:, 3] / 2, 0, 1)
+        records['xmax'] = np.clip(rows[:, 0] + rows[:, 2] / 2, 0, 1)
+        records['ymax'] = np.clip(rows[:, 1] + rows[:, 3] / 2, 0, 1)
+        records['label'] = PERSON_LABEL
+        records['timestamp'] = captureTime
+
+        if depthMap is not None:
+            records['z'] = [self._depthIn(depthMap, record) for record in records]
+        else:
+            records['z'] = self.depth
+
+        # From the box centre to meters either side of the camera, at that depth
+        height, width = shape[0], shape[1]
+        offsetX = ((records['xmin'] + records['xmax']) - 1) * self.tanHalfFov
+        offsetY = ((records['ymin'] + records['ymax']) - 1) * self.tanHalfFov * height / width
+        records['x'] = records['z'] * offsetX
+        records['y'] = -records['z'] * offsetY
+
+        return DetectionBatch(records, self._tickFps(captureTime), captureTime).filterDepth(minimum=MIN_DEPTH)
+
+    @staticmethod
+    def _depthIn(depthMap: np.ndarray, record) -> float:
+        # The middle half of the box, so that the background around a person is left out
+        height, width = depthMap.shape[0], depthMap.shape[1]
+        xmin, xmax = (3 * record['xmin'] + record['xmax']) / 4, (record['xmin'] + 3 * record['xmax']) / 4
+        ymin, ymax = (3 * record['ymin'] + record['ymax']) / 4, (record['ymin'] + 3 * record['ymax']) / 4
+
+        region = depthMap[int(ymin * height):int(np.ceil(ymax * height)), int(xmin * width):int(np.ceil(xmax * width))]
+        valid = region[(region >= DEPTH_RANGE[0]) & (region <= DEPTH_RANGE[1])]
+
+        return float(np.median(valid)) / 1000.0 if len(valid) > 0 else 0.0
+
+    def _tickFps(self, now: float) -> float:
+        with self._lock:
+            if self._counterStart == None:
+                self._counterStart = now
+
+            self._counter += 1
+            if now - self._counterStart > 1:
+                self.fps = self._counter / (now - self._counterStart)
+                self._counter = 0
+                self._counterStart = now
+
+            return self.fps
+
+    def _adapt(self, frameTime: float, size: int, frames: int) -> None:
+        '''
+        Moves the input size towards the largest that fits the budget, from a
+        moving average of seconds per frame at the current size.
+        '''
+
+        if self.budget == None:
+            return
+
+        with self._lock:
+            # Ignore passes that started before the last change of size
+            if size != self.inputSize:
+                return
+
+            self._frameTime = frameTime if self._frameTime == None else 0.8 * self._frameTime + 0.2 * frameTime
+            self._framesAtSize += frames
+
+            if self._framesAtSize < DNN_ADAPT_FRAMES:
+                return
+
+            index = self.inputSizes.index(size)
+
+            if self._frameTime > self.budget and index + 1 < len(self.inputSizes):
+                index += 1
+            elif index > 0:
+                # Inference time grows with the number of pixels
+                expected = self._frameTime * (self.inputSizes[index - 1] / size) ** 2
+                if expected < self.budget * DNN_UPSCALE_HEADROOM:
+                    index -= 1
+
+            if self.inputSizes[index] != size:
+                self.inputSize = self.inputSizes[index]
+                self._frameTime = None
+                self._framesAtSize = 0
+
+class DnnCamera(BaseCamera):
+    '''
+    Detects people in frames from `source` with a DnnDetector, on a pool of
+    `workers` threads. `source` is anything cv2.VideoCapture can open, like a
+    webcam index or a stream URL, or an object with the same `read()`. If given,
+    `depthSource` is read alongside it for depth maps aligned to each frame.
+
+    Only the latest `batchSize` frames are kept waiting for a worker, and older
+    ones are skipped, so that detections never fall behind a live source. Each
+    worker detects every waiting frame in one batch. The detector's input size
+    adapts to keep up with `targetFps`.
+
+    For recorded videos, use VideoFileCamera with a DnnDetector instead, which
+    detects every frame rather than skipping.
+    '''
+
+    skipped = 0   # frames dropped without being detected
+    published = 0 # frames detected and published
+
+    _running = False
+
+    def __init__(self, source, detector: DnnDetector = None, depthSource = None, callback = None, clock: Clock = None,
+                 workers: int = DNN_WORKERS, batchSize: int = DNN_BATCH_SIZE, targetFps: float = DNN_TARGET_FPS):
+        super().__init__(clock)
+
+        self.source = source
+        self.depthSource = depthSource
+        self.detector = detector if detector != None else DnnDetector()
+        self.workers = workers
+        self.batchSize = batchSize
+
+        # Workers detect in parallel, so each has `workers` frame times to spend on a frame
+        self.detector.budget = workers / targetFps
+
+        self._userCallback = callback
+        self._pending = deque(maxlen=batchSize)
+        self._pendingCondition = threading.Condition()
+        self._publishLock = threading.Lock()
+        self._lastCaptureTime = -1.0
+        self._threads = []
+
+    def running(self):
+        return self._running
+
+    def start(self):
+        self._capture = cv2.VideoCapture(self.source) if isinstance(self.source, (int, str)) else self.source
+        self._running = True
+
+        self._threads = [threading.Thread(target=self._read)] + [threading.Thread(target=self._detect) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        with self._pendingCondition:
+            self._running = False
+            self._pendingCondition.notify_all()
+
+        for thread in self._threads:
+            thread.join(5)
+
+        if isinstance(self.source, (int, str)):
+            self._capture.release()
+
+    def _read(self):
+        while self._running:
+            ok, frame = self._capture.read()
+            if not ok:
+                break
+
+            depthMap = None
+            if self.depthSource != None:
+                ok, depthMap = self.depthSource.read()
+                if not ok:
+                    break
+
+            captureTime = self.clock.now()
+
+            with self._pendingCondition:
+                # The oldest frame falls off the end when workers can't keep up
+                if len(self._pending) == self._pending.maxlen:
+                    self.skipped += 1
+
+                self._pending.append((frame, depthMap, captureTime))
+                self._pendingCondition.notify()
+
+        with self._pendingCondition:
+            self._running = False
+            self._pendingCondition.notify_all()
+
+    def _detect(self):
+        while True:
+            with self._pendingCondition:
+                while self._running and len(self._pending) == 0:
+                    self._pendingCondition.wait()
+
+                if len(self._pending) == 0:
+                    return
+
+                work = list(self._pending)
+                self._pending.clear()
+
+            frames, depthMaps, captureTimes = zip(*work)
+            batches = self.detector.detectBatch(list(frames), list(captureTimes), list(depthMaps) if self.depthSource != None else None)
+
+            for frame, detections in zip(frames, batches):
+                self._publish(frame, detections)
+
+    def _publish(self, frame: np.ndarray, detections: DetectionBatch):
+        with self._publishLock:
+            # Another worker already published a newer frame
+            if detections.captureTime <= self._lastCaptureTime:
+                self.skipped += 1
+                return
+
+            self._lastCaptureTime = detections.captureTime
+            snapshot = self._publishDetections(detections)
+            self.published += 1
+
+            if self._userCallback != None:
+                self._userCallback(snapshot, frame)
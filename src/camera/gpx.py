@@ -0,0 +1,98 @@
+import os
+
+import gpxpy
+import numpy as np
+
+CACHE_VERSION = 1
+
+class GPXTrack:
+    '''
+    A GPX track compiled into arrays of time, latitude and longitude, so that
+    the position at any time can be found with a binary search rather than a
+    scan over every point.
+
+    Times are in seconds since the first point of the track.
+    '''
+
+    __slots__ = ('times', 'latitudes', 'longitudes')
+
+    def __init__(self, times: np.ndarray, latitudes: np.ndarray, longitudes: np.ndarray):
+        if len(times) == 0:
+            raise ValueError('GPX track has no points')
+
+        self.times = times
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+
+    @staticmethod
+    def fromGPX(gpx) -> 'GPXTrack':
+        '''
+        Compiles every segment of the first track in a parsed GPX file.
+        '''
+
+        points = [point for segment in gpx.tracks[0].segments for point in segment.points]
+
+        if any(point.time == None for point in points):
+            raise ValueError('GPX track is missing timestamps')
+
+        timestamps = np.array([point.time.timestamp() for point in points], dtype=np.float64)
+        latitudes = np.array([point.latitude for point in points], dtype=np.float64)
+        longitudes = np.array([point.longitude for point in points], dtype=np.float64)
+
+        # Points should already be in time order, but make sure for searching
+        order = np.argsort(timestamps, kind='stable')
+
+        return GPXTrack(timestamps[order] - timestamps[order][0], latitudes[order], longitudes[order])
+
+    @staticmethod
+    def load(path: str, useCache: bool = True) -> 'GPXTrack':
+        '''
+        Loads a GPX file. The compiled track is cached next to the file, and is
+        used instead of parsing again for as long as the GPX file is unchanged.
+        '''
+
+        cachePath = GPXTrack.cachePath(path)
+
+        if useCache and os.path.exists(cachePath) and os.path.getmtime(cachePath) >= os.path.getmtime(path):
+            with np.load(cachePath) as cache:
+                if int(cache['version']) == CACHE_VERSION:
+                    return GPXTrack(cache['times'], cache['latitudes'], cache['longitudes'])
+
+        with open(path, 'r') as file:
+            track = GPXTrack.fromGPX(gpxpy.parse(file))
+
+        if useCache:
+            try:
+                track.save(cachePath)
+            except OSError as e:
+                print('WARNING Cannot cache GPX track: ' + str(e))
+
+        return track
+
+    @staticmethod
+    def cachePath(path: str) -> str:
+        return path + '.npz'
+
+    def save(self, path: str) -> None:
+        # Write to a file object, so numpy doesn't add its own extension
+        with open(path, 'wb') as file:
+            np.savez(file, version=CACHE_VERSION, times=self.times, latitudes=self.latitudes, longitudes=self.longitudes)
+
+    def duration(self) -> float:
+        return float(self.times[-1])
+
+    def position(self, offset: float):
+        '''
+        The (latitude, longitude) at `offset` seconds into the track, linearly
+        interpolated between the points either side. Offsets outside the track
+        are clamped to its first or last point.
+        '''
+
+        return (float(np.interp(offset, self.times, self.latitudes)), float(np.interp(offset, self.times, self.longitudes)))
+
+    def positions(self, offsets: np.ndarray):
+        '''
+        As `position`, but for an array of offsets at once.
+        '''
+
+        return (np.interp(offsets, self.times, self.latitudes), np.interp(offsets, self.times, self.longitudes))
@@ -1,98 +1,85 @@
 from .base import BaseCamera
-from .detection import Detection
-from src.constants import MOCK_FOV, RADIUS_OF_EARTH, MOCK_Z_MAX, MOCK_FPS
+from .detection import Detection, DetectionBatch
+from .gpx import GPXTrack
+from clock import Clock, VirtualClock
+from vehiclestate import VehicleStateFeed
+from constants import MOCK_FOV, RADIUS_OF_EARTH, MOCK_Z_MAX, MOCK_FPS
 
-import gpxpy
-from gpxpy.gpx import GPXTrackPoint
-import time
 import threading
+import random
 import math
 
 STOP = False
 
-def gpxToUnix(time):
-    return time.timestamp() * 1000
-
-def interpolate(currentPoint, nextPoint, offsetSinceCurrent):
-    percent = (gpxToUnix(nextPoint.time) - gpxToUnix(currentPoint.time)) / offsetSinceCurrent
-
-    deltaLat = nextPoint.latitude - currentPoint.latitude
-    deltaLon =  nextPoint.longitude - currentPoint.longtude
-
-    latInter = (currentPoint.latitude + deltaLat) * percent
-    lonInter = (currentPoint.longtude + deltaLon) * percent
-
-    return GPXTrackPoint(latInter, lonInter)
-
-def thread(gpx, callback):
+def thread(track: GPXTrack, callback, speed: float, clock: Clock):
     global STOP
-    points = gpx.tracks[0].segments[0].points
 
-    loopStartTime = time.time() * 1000
-    gpxStartTime = gpxToUnix(points[0].time)
+    loopStartTime = clock.now()
 
     while STOP == False:
-        offsetSinceStart = (time.time() * 1000) - loopStartTime
-
-        # Find the point that is just after this offset
-        currentPoint = None
-        for point in points:
-            timestamp = gpxToUnix(point.time)
+        # Offset into the track, scaled by the playback speed
+        offset = (clock.now() - loopStartTime) * speed
 
-            if timestamp <= gpxStartTime + offsetSinceStart:
-                currentPoint = point
-                break
+        latitude, longitude = track.position(offset)
+        callback(latitude, longitude)
 
-        # If not the last point, pause a second
-        # otherwise, close out the loop
-        if points.index(currentPoint) == len(points) - 1:
-            callback(currentPoint)
+        if offset >= track.duration():
             print('DEBUG :: Finished GPX track, exiting loop')
             break
-        else:
-            # Iterpolate between this point and the next, given time delta
-            nextPoint = points[points.index(currentPoint) + 1]
-            interpolated = interpolate(currentPoint, nextPoint, offsetSinceStart - gpxToUnix(currentPoint.time))
 
-            callback(interpolated)
-
-            # Sleep needs to match FPS
-            time.sleep(1.0 / float(MOCK_FPS))
+        # Sleep needs to match FPS
+        clock.sleep(1.0 / float(MOCK_FPS))
 
 class MockCamera(BaseCamera):
     '''
     A mocked camera implementation for usage in testing. It plays back
     a GPX file as a set of detections in relation to the SITL drone's
     reference frame
+
+    `noise` is the standard deviation in meters of gaussian noise added to each
+    detection's position, seeded by `seed` to be repeatable.
     '''
 
     gpxThread = None
     vehicle   = None
-    _detections = []
+    feed: VehicleStateFeed = None
 
     mockedPosition = {
         "latitude": 0,
         "longitude": 0
     }
 
-    def __init__(self, vehicle):
+    noise = 0.0
+
+    def __init__(self, vehicle, clock: Clock = None, noise: float = 0.0, seed = None):
+        super().__init__(clock)
         self.vehicle = vehicle
+        self.feed = VehicleStateFeed(vehicle, self.clock)
+        self.noise = noise
+        self._random = random.Random(seed)
 
     def running(self):
         return True
 
-    def playbackGPXFromFile(self, filepath):
-        file = open(filepath, 'r')
-        if file == None:
-            raise 'Cannot open GPX file at path: ' + filepath
+    def playbackGPXFromFile(self, filepath, speed = 1.0):
+        '''
+        Plays back a GPX track in real-time, or `speed` times faster.
+
+        The track plays on its own thread, so this can't be used with a
+        `VirtualClock`, which only one thread may drive. Instead, call
+        `setGlobalCoordinate()` from the thread driving the clock, as `sweep.py` does.
+        '''
 
-        gpx = gpxpy.parse(file)
+        if isinstance(self.clock, VirtualClock):
+            raise ValueError('GPX playback needs a real or accelerated clock, drive a VirtualClock with setGlobalCoordinate()')
 
-        self.gpxThread = threading.Thread(target=thread, args=(gpx, self._gpxThreadCallback))
+        track = GPXTrack.load(filepath)
+
+        self.gpxThread = threading.Thread(target=thread, args=(track, self._gpxThreadCallback, speed, self.clock))
         self.gpxThread.start()
 
-    def _gpxThreadCallback(self, point):
-        self.setGlobalCoordinate(point.latitude, point.longitude)
+    def _gpxThreadCallback(self, latitude, longitude):
+        self.setGlobalCoordinate(latitude, longitude)
 
     def setGlobalCoordinate(self, latitude, longitude):
         '''
@@ -106,10 +93,10 @@ class MockCamera(BaseCamera):
             "longitude": longitude
         }
 
-        vehicleGlobalFrame = self.vehicle.location.global_relative_frame
-        vehicleLatitude  = vehicleGlobalFrame.lat
-        vehicleLongitude = vehicleGlobalFrame.lon
-        vehicleHeading   = self.vehicleYaw()
+        vehicleState = self.feed.snapshot()
+        vehicleLatitude  = vehicleState.lat
+        vehicleLongitude = vehicleState.lon
+        vehicleHeading   = self.vehicleYaw(vehicleState.yaw)
 
         # Get normalised bearing
         newHeading = self.headingBetween(vehicleLatitude, vehicleLongitude, latitude, longitude)
@@ -119,7 +106,7 @@ class MockCamera(BaseCamera):
 
         if angle >= MOCK_FOV / 2:
             # Outside the vehicle's FOV, not a detection
-            self._detections = []
+            self._publishDetections(DetectionBatch(fps=MOCK_FPS, captureTime=self.clock.now()))
             # print('DEBUG :: Outside FOV, no detections')
             return
 
@@ -128,7 +115,7 @@ class MockCamera(BaseCamera):
 
         if distance >= MOCK_Z_MAX:
             # Too far away to be counted as a detection
-            self._detections = []
+            self._publishDetections(DetectionBatch(fps=MOCK_FPS, captureTime=self.clock.now()))
             # print('DEBUG :: Beyond max distance, no detections')
             return
 
@@ -139,8 +126,12 @@ class MockCamera(BaseCamera):
         if isLeftward:
             xDistance = 0.0 - xDistance
 
+        if self.noise > 0:
+            xDistance += self._random.gauss(0.0, self.noise)
+            zDistance = max(0.0, zDistance + self._random.gauss(0.0, self.noise))
+
         detection = Detection(xDistance, 0.0, zDistance, 1.0, MOCK_FPS)
-        self._detections = [detection]
+        self._publishDetections(DetectionBatch.fromDetections([detection], self.clock.now(), MOCK_FPS))
 
         # print('DEBUG :: new mock detection. x: ' + str(xDistance) + ', z: ' + str(zDistance) + ', bearingDifference: ' + str(angle) + ', newHeading: ' + str(newHeading))
 
@@ -155,9 +146,6 @@ class MockCamera(BaseCamera):
 
         super().stop()
 
-    def detections(self):
-        return self._detections
-
     def headingBetween(self, lat1, lon1, lat2, lon2):
         # https://stackoverflow.com/a/17662363
         dLon = lon2 - lon1
@@ -174,8 +162,8 @@ class MockCamera(BaseCamera):
 
         return bearing
 
-    def vehicleYaw(self):
-        yaw = math.degrees(self.vehicle.attitude.yaw)
+    def vehicleYaw(self, yaw: float):
+        yaw = math.degrees(yaw)
 
         if yaw > 360:
             yaw -= 360
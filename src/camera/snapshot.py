@@ -0,0 +1,24 @@
+from typing import NamedTuple, Optional
+from .detection import Detection, DetectionBatch, EMPTY_BATCH
+
+class FrameSnapshot(NamedTuple):
+    '''
+    An immutable view of a single frame's detections, as published by a camera.
+
+    The closest detection is found once when the snapshot is created, so that
+    every consumer of the frame agrees on it without scanning again.
+
+    `timestamp` is when the host received the frame, from the camera's clock.
+    The same time and sequence are stamped onto the detections.
+    '''
+
+    sequence: int
+    timestamp: float
+    detections: DetectionBatch
+    closest: Optional[Detection]
+
+    @staticmethod
+    def create(sequence: int, timestamp: float, detections: DetectionBatch) -> 'FrameSnapshot':
+        return FrameSnapshot(sequence, timestamp, detections.stamped(sequence, timestamp), detections.closest())
+
+EMPTY_SNAPSHOT = FrameSnapshot(0, 0.0, EMPTY_BATCH, None)
@@ -0,0 +1,74 @@
+'''
+Reads depthai output queues newest first, pairing each detection message with
+the preview frame it was made from by sequence number.
+
+Only `get()` and `tryGetAll()` of a queue and `getSequenceNum()` of a message
+are used, so this doesn't depend on depthai itself.
+'''
+
+from collections import deque
+
+PREVIEWS_HELD = 8 # previews kept that are newer than the latest detections
+
+class SyncStats:
+    frames = 0  # detection messages returned
+    drops = 0   # detection messages never returned, from gaps in sequence numbers
+    desyncs = 0 # detection messages returned without their preview
+
+    def summary(self) -> str:
+        return '{} frames, {} dropped, {} desynced'.format(self.frames, self.drops, self.desyncs)
+
+class LatestSync:
+    '''
+    Each call to `next()` returns the newest detection message, skipping any
+    older ones still queued, along with its preview. Without a preview queue,
+    previews are never read and `None` is returned in their place.
+    '''
+
+    _lastSequence = None
+
+    def __init__(self, detectionQueue, previewQueue = None, stats: SyncStats = None):
+        self.detectionQueue = detectionQueue
+        self.previewQueue = previewQueue
+        self.stats = stats if stats != None else SyncStats()
+        self._previews = deque(maxlen=PREVIEWS_HELD)
+
+    def next(self):
+        # Block for one message only if none are waiting
+        messages = self.detectionQueue.tryGetAll() or [self.detectionQueue.get()]
+        detections = messages[-1]
+        sequence = detections.getSequenceNum()
+
+        # Gaps also count messages the device dropped before they were queued
+        if self._lastSequence != None:
+            self.stats.drops += max(0, sequence - self._lastSequence - 1)
+        else:
+            self.stats.drops += len(messages) - 1
+        self._lastSequence = sequence
+        self.stats.frames += 1
+
+        preview = None
+        if self.previewQueue != None:
+            preview = self._previewFor(sequence)
+            if preview == None:
+                self.stats.desyncs += 1
+
+        return (detections, preview)
+
+    def _previewFor(self, sequence: int):
+        previews = self._previews
+
+        while True:
+            while len(previews) > 0 and previews[0].getSequenceNum() < sequence:
+                previews.popleft()
+
+            if len(previews) > 0:
+                break
+
+            previews.extend(self.previewQueue.tryGetAll() or [self.previewQueue.get()])
+
+        # The matching preview was dropped if the oldest left is already newer
+        if previews[0].getSequenceNum() != sequence:
+            return None
+
+        return previews.popleft()
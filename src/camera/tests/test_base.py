@@ -0,0 +1,62 @@
+import threading
+import time
+
+from camera.base import BaseCamera
+from camera.detection import Detection, DetectionBatch, EMPTY_BATCH
+
+def test_waitForDetections_wakesOnPublish():
+    camera = BaseCamera()
+
+    def publish():
+        time.sleep(0.05)
+        camera._publishDetections(EMPTY_BATCH)
+
+    thread = threading.Thread(target=publish)
+    thread.start()
+
+    start = time.monotonic()
+    snapshot = camera.waitForDetections(0, 5)
+    thread.join()
+
+    assert snapshot.sequence == 1
+    assert snapshot.timestamp >= start
+    assert time.monotonic() - start < 1
+
+def test_waitForDetections_timesOut():
+    camera = BaseCamera()
+    camera._publishDetections(EMPTY_BATCH)
+
+    start = time.monotonic()
+    snapshot = camera.waitForDetections(1, 0.05)
+
+    assert snapshot.sequence == 1
+    assert time.monotonic() - start >= 0.05
+
+def test_snapshot_precomputesClosest():
+    camera = BaseCamera()
+    near = Detection(0.5, 0.0, 2.0, 0.9, 30)
+    far = Detection(-1.0, 0.0, 6.0, 0.9, 30)
+
+    snapshot = camera._publishDetections(DetectionBatch.fromDetections([far, near], 0.0, 30))
+
+    assert snapshot.closest.z == near.z
+    assert camera.closestDetection() is snapshot.closest
+    assert camera.snapshot() is snapshot
+    assert len(camera.detections()) == 2
+
+def test_publishStampsDetections():
+    camera = BaseCamera()
+    batch = DetectionBatch.fromDetections([Detection(0.0, 0.0, 5.0, 0.9, 30)], 10.0, 30)
+
+    camera._publishDetections(EMPTY_BATCH, 10.5)
+    snapshot = camera._publishDetections(batch, 11.0)
+
+    assert snapshot.detections.sequence == 2
+    assert snapshot.detections.receiveTime == 11.0
+    assert snapshot.detections.captureTime == 10.0
+    assert snapshot.detections[0].timestamp == 10.0
+    assert snapshot.detections.age(11.5) == 1.5
+
+    # Published batches are copies, so shared batches are never stamped
+    assert EMPTY_BATCH.sequence == 0
+    assert batch.sequence == 0
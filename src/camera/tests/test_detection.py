@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import pytest
+
+from camera.detection import Detection, DetectionBatch, EMPTY_BATCH, PERSON_LABEL
+
+def depthaiDetection(label, x, y, z, confidence):
+    return SimpleNamespace(
+        label=label,
+        confidence=confidence,
+        xmin=0.1, ymin=0.2, xmax=0.3, ymax=0.4,
+        spatialCoordinates=SimpleNamespace(x=x, y=y, z=z))
+
+def test_fromDepthai_convertsToMetres():
+    batch = DetectionBatch.fromDepthai([depthaiDetection(PERSON_LABEL, 1000, -500, 4000, 0.9)], 12.5, 30)
+
+    assert len(batch) == 1
+    assert batch[0].x == pytest.approx(1.0)
+    assert batch[0].y == pytest.approx(-0.5)
+    assert batch[0].z == pytest.approx(4.0)
+    assert batch.records['timestamp'][0] == 12.5
+    assert batch.records['xmax'][0] == pytest.approx(0.3)
+
+def test_filters():
+    batch = DetectionBatch.fromDepthai([
+        depthaiDetection(PERSON_LABEL, 0, 0, 300, 0.9),
+        depthaiDetection(PERSON_LABEL, 0, 0, 3000, 0.6),
+        depthaiDetection(PERSON_LABEL, 0, 0, 6000, 0.95),
+        depthaiDetection(5, 0, 0, 2000, 0.99),
+    ], 0.0, 30)
+
+    people = batch.filterLabel(PERSON_LABEL)
+    assert len(people) == 3
+
+    assert [d.z for d in people.filterDepth(minimum=0.5)] == pytest.approx([3.0, 6.0])
+    assert [d.z for d in people.filterDepth(maximum=5.0)] == pytest.approx([0.3, 3.0])
+    assert len(people.filterConfidence(0.9)) == 2
+
+    # Filtering never changes the original batch
+    assert len(batch) == 4
+
+def test_closest():
+    batch = DetectionBatch.fromDetections([
+        Detection(1.0, 0.0, 5.0, 0.9, 30),
+        Detection(-1.0, 0.0, 2.0, 0.9, 30),
+    ], 0.0, 30)
+
+    assert batch.closestIndex() == 1
+    assert batch.closest().x == pytest.approx(-1.0)
+
+    assert EMPTY_BATCH.closestIndex() == -1
+    assert EMPTY_BATCH.closest() is None
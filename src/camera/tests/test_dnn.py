@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from camera.dnn import DnnCamera, DnnDetector
+
+# Rows of centre x, centre y, width, height, objectness, person score
+PERSON = [0.5, 0.5, 0.2, 0.6, 0.95, 0.95]
+OVERLAPPING = [0.51, 0.5, 0.2, 0.6, 0.9, 0.9]
+UNSURE = [0.2, 0.5, 0.1, 0.3, 0.3, 0.3]
+
+class FakeNet:
+    forwards = 0
+
+    def __init__(self, rows):
+        self.rows = np.array(rows, dtype=np.float32)
+
+    def getUnconnectedOutLayersNames(self):
+        return ('yolo',)
+
+    def setInput(self, blob):
+        self.images = blob.shape[0]
+
+    def forward(self, names):
+        FakeNet.forwards += 1
+        return [np.tile(self.rows, (self.images, 1))]
+
+class FakeDetector(DnnDetector):
+    def __init__(self, rows, **kwargs):
+        super().__init__(threshold=0.5, **kwargs)
+        self.rows = rows
+
+    def _createNet(self):
+        return FakeNet(self.rows)
+
+FRAME = np.zeros((48, 64, 3), dtype=np.uint8)
+
+def test_keepsConfidentPeopleOnce():
+    detections = FakeDetector([PERSON, OVERLAPPING, UNSURE], depth=4.0).detect(FRAME, 10.0)
+
+    assert len(detections) == 1
+    record = detections.records[0]
+    assert record['confidence'] == pytest.approx(0.95)
+    assert (record['xmin'], record['xmax']) == pytest.approx((0.4, 0.6))
+    assert record['z'] == pytest.approx(4.0)
+    assert record['x'] == pytest.approx(0.0, abs=1e-6)
+    assert detections.captureTime == 10.0
+
+def test_positionFromBoxAndFov():
+    right = [0.75, 0.5, 0.1, 0.6, 0.9, 0.9]
+    detections = FakeDetector([right], depth=2.0, fov=90).detect(FRAME, 0.0)
+
+    # Half way to the edge of a 90 degree FOV is half as far across as it is deep
+    assert detections.records[0]['x'] == pytest.approx(1.0)
+
+def test_depthFromMiddleOfBox():
+    depthMap = np.zeros((48, 64), dtype=np.uint16)
+    depthMap[10:40, 28:36] = 3000
+
+    detections = FakeDetector([PERSON]).detect(FRAME, 0.0, depthMap)
+    assert detections.records[0]['z'] == pytest.approx(3.0)
+
+    # Nothing valid to measure means no depth, which is dropped
+    assert len(FakeDetector([PERSON]).detect(FRAME, 0.0, np.zeros((48, 64), dtype=np.uint16))) == 0
+
+def test_detectsBatchInOnePass():
+    detector = FakeDetector([PERSON])
+    FakeNet.forwards = 0
+
+    batches = detector.detectBatch([FRAME] * 3, [1.0, 2.0, 3.0])
+
+    assert FakeNet.forwards == 1
+    assert [batch.captureTime for batch in batches] == [1.0, 2.0, 3.0]
+    assert all(len(batch) == 1 for batch in batches)
+
+def test_inputSizeAdaptsToBudget():
+    detector = FakeDetector([PERSON], inputSizes=(416, 320), budget=0.05)
+    assert detector.inputSize == 416
+
+    detector._adapt(0.08, 416, 10)
+    assert detector.inputSize == 320
+
+    # 0.02 s at 320 is expected to be about 0.034 s at 416, inside the headroom
+    detector._adapt(0.02, 320, 10)
+    assert detector.inputSize == 416
+
+def test_cameraPublishesInOrderAndSkipsWhenBehind():
+    class Source:
+        remaining = 50
+
+        def read(self):
+            self.remaining -= 1
+            return (self.remaining >= 0, FRAME)
+
+    published = []
+    camera = DnnCamera(Source(), FakeDetector([PERSON]), callback=lambda snapshot, frame: published.append(snapshot), workers=3, batchSize=2)
+    camera.start()
+
+    for thread in camera._threads:
+        thread.join(5)
+
+    assert not camera.running()
+    assert camera.published + camera.skipped == 50
+    assert [snapshot.sequence for snapshot in published] == list(range(1, camera.published + 1))
+
+    captureTimes = [snapshot.detections.captureTime for snapshot in published]
+    assert captureTimes == sorted(captureTimes)
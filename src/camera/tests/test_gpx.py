@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pytest
+
+from camera.gpx import GPXTrack
+
+GPX = '''<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1">
+  <trk><trkseg>
+    <trkpt lat="-35.0" lon="149.0"><time>2022-05-01T10:00:00Z</time></trkpt>
+    <trkpt lat="-35.1" lon="149.2"><time>2022-05-01T10:00:10Z</time></trkpt>
+  </trkseg><trkseg>
+    <trkpt lat="-35.3" lon="149.2"><time>2022-05-01T10:00:20Z</time></trkpt>
+  </trkseg></trk>
+</gpx>
+'''
+
+@pytest.fixture
+def gpxPath(tmp_path):
+    path = tmp_path / 'walk.gpx'
+    path.write_text(GPX)
+    return str(path)
+
+def test_interpolatesBetweenPoints(gpxPath):
+    track = GPXTrack.load(gpxPath, useCache=False)
+
+    assert track.duration() == 20.0
+    assert track.position(0) == pytest.approx((-35.0, 149.0))
+    assert track.position(2.5) == pytest.approx((-35.025, 149.05))
+    assert track.position(15) == pytest.approx((-35.2, 149.2))
+
+def test_clampsOutsideTrack(gpxPath):
+    track = GPXTrack.load(gpxPath, useCache=False)
+
+    assert track.position(-5) == pytest.approx((-35.0, 149.0))
+    assert track.position(100) == pytest.approx((-35.3, 149.2))
+
+def test_vectorisedPositions(gpxPath):
+    track = GPXTrack.load(gpxPath, useCache=False)
+
+    latitudes, longitudes = track.positions(np.array([0.0, 5.0, 20.0]))
+
+    assert latitudes == pytest.approx([-35.0, -35.05, -35.3])
+    assert longitudes == pytest.approx([149.0, 149.1, 149.2])
+
+def test_usesCacheUntilFileChanges(gpxPath):
+    first = GPXTrack.load(gpxPath)
+    assert os.path.exists(GPXTrack.cachePath(gpxPath))
+
+    # Corrupt the cache contents to prove it is read instead of the GPX file
+    GPXTrack(first.times, first.latitudes + 1, first.longitudes).save(GPXTrack.cachePath(gpxPath))
+    assert GPXTrack.load(gpxPath).position(0)[0] == pytest.approx(-34.0)
+
+    # A newer GPX file invalidates the cache
+    newer = os.path.getmtime(GPXTrack.cachePath(gpxPath)) + 10
+    os.utime(gpxPath, (newer, newer))
+    assert GPXTrack.load(gpxPath).position(0)[0] == pytest.approx(-35.0)
@@ -0,0 +1,64 @@
+from camera.sync import LatestSync
+
+class Message:
+    def __init__(self, sequence):
+        self.sequence = sequence
+
+    def getSequenceNum(self):
+        return self.sequence
+
+class Queue:
+    gets = 0
+
+    def __init__(self, *sequences):
+        self.messages = [Message(sequence) for sequence in sequences]
+
+    def get(self):
+        self.gets += 1
+        return self.messages.pop(0)
+
+    def tryGetAll(self):
+        messages, self.messages = self.messages, []
+        return messages
+
+def test_skipsToNewestDetections():
+    detections = Queue(1, 2, 3)
+    sync = LatestSync(detections)
+
+    message, preview = sync.next()
+    assert message.sequence == 3
+    assert preview == None
+
+    detections.messages = [Message(6)]
+    assert sync.next()[0].sequence == 6
+
+    assert (sync.stats.frames, sync.stats.drops, sync.stats.desyncs) == (2, 4, 0)
+
+def test_blocksOnlyWhenNothingWaiting():
+    detections = Queue(1)
+    sync = LatestSync(detections)
+
+    sync.next()
+    assert detections.gets == 0
+
+def test_pairsPreviewBySequence():
+    previews = Queue(1, 2, 3, 4)
+    sync = LatestSync(Queue(3), previews)
+
+    message, preview = sync.next()
+    assert (message.sequence, preview.sequence) == (3, 3)
+
+    # The preview that arrived ahead is kept for the next detections
+    sync.detectionQueue.messages = [Message(4)]
+    assert sync.next()[1].sequence == 4
+
+def test_countsDesyncWhenPreviewDropped():
+    sync = LatestSync(Queue(2), Queue(1, 3))
+
+    message, preview = sync.next()
+    assert message.sequence == 2
+    assert preview == None
+    assert sync.stats.desyncs == 1
+
+    sync.detectionQueue.messages = [Message(3)]
+    assert sync.next()[1].sequence == 3
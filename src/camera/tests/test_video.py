@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+
+from clock import VirtualClock
+from camera.detection import Detection, DetectionBatch
+from camera.detector import BaseDetector
+from camera.snapshot import FrameSnapshot
+from camera.video import VideoFileCamera
+from recording.sidecar import SidecarWriter, sidecarPath
+
+FRAMES = 12
+FPS = 10
+
+def writeVideo(path) -> str:
+    path = str(path / 'clip.mkv')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), FPS, (64, 48))
+    sidecar = SidecarWriter(sidecarPath(path))
+
+    for i in range(FRAMES):
+        frame = np.full((48, 64, 3), i * 20, dtype=np.uint8)
+        writer.write(frame)
+
+        detections = DetectionBatch.fromDetections([Detection(0.0, 0.0, 1.0 + i, 0.9, 30)], 100.0 + i / FPS, FPS)
+        sidecar.write(FrameSnapshot.create(i + 1, 100.05 + i / FPS, detections))
+
+    writer.release()
+    sidecar.close()
+
+    return path
+
+def play(camera: VideoFileCamera):
+    camera.start()
+    assert camera.wait(10)
+    camera.stop()
+
+def test_playsSidecarDetectionsInOrder(tmp_path):
+    path = writeVideo(tmp_path)
+    frames = []
+
+    camera = VideoFileCamera(path, callback=lambda snapshot, frame: frames.append((snapshot, frame)), workers=3, prefetch=2)
+    play(camera)
+
+    assert not camera.running()
+    assert len(frames) == FRAMES
+    assert [snapshot.sequence for snapshot, _ in frames] == list(range(1, FRAMES + 1))
+    assert [round(snapshot.closest.z) for snapshot, _ in frames] == list(range(1, FRAMES + 1))
+
+    # Decoded in parallel, but still in order
+    assert [round(frame.mean() / 20) for _, frame in frames] == list(range(FRAMES))
+
+    # The recorded latency between capture and receive is kept
+    snapshot = frames[0][0]
+    assert abs(snapshot.timestamp - snapshot.detections.captureTime - 0.05) < 1e-6
+
+def test_realTimePacesAtRecordedFps(tmp_path):
+    path = writeVideo(tmp_path)
+    clock = VirtualClock()
+
+    camera = VideoFileCamera(path, realTime=True, clock=clock)
+    play(camera)
+
+    assert camera.published == FRAMES
+    assert abs(camera.snapshot().timestamp - (FRAMES - 1) / FPS) < 1e-6
+
+def test_runsDetectorOnEveryFrame(tmp_path):
+    path = writeVideo(tmp_path)
+
+    class BrightnessDetector(BaseDetector):
+        calls = 0
+
+        def detect(self, frame, captureTime):
+            self.calls += 1
+            return DetectionBatch.fromDetections([Detection(0.0, 0.0, frame.mean() / 20, 0.9, 30)], captureTime, FPS)
+
+    detector = BrightnessDetector()
+    seen = []
+
+    camera = VideoFileCamera(path, detector, callback=lambda snapshot, frame: seen.append(round(snapshot.closest.z)))
+    play(camera)
+
+    assert detector.calls == FRAMES
+    assert seen == list(range(FRAMES))
@@ -0,0 +1,198 @@
+from concurrent.futures import ThreadPoolExecutor
+import queue
+import threading
+
+import cv2
+
+from clock import Clock
+from constants import VIDEO_PREFETCH, VIDEO_DECODE_WORKERS
+from recording.sidecar import findSidecar, readSidecar
+from .base import BaseCamera
+from .detection import DetectionBatch
+from .detector import BaseDetector
+
+MJPG = cv2.VideoWriter_fourcc('M','J','P','G')
+
+class VideoFileCamera(BaseCamera):
+    '''
+    Plays back a recorded video as if it were coming from the camera.
+
+    Detections are read from the video's sidecar, or found by `detector` if one
+    is given. Frames are read ahead of playback, at most `prefetch` at a time,
+    and decoded and detected on a pool of `workers` threads. MJPG videos, as
+    written by main.py, are decoded in parallel as each frame is a separate
+    JPEG. Other codecs are decoded in order as they are read.
+
+    With `realTime`, frames are published at the video's fps. Otherwise they are
+    published as fast as they can be decoded, for benchmarking.
+
+    Frames are only decoded if there is a detector or a `callback`, which is
+    called with each snapshot and its frame, as for YoloCamera.
+    '''
+
+    path: str = None
+    fps: float = 0.0
+    published = 0 # frames published so far
+
+    _readThread: threading.Thread = None
+    _playThread: threading.Thread = None
+    _stopEvent: threading.Event = None
+    _finished: threading.Event = None
+    _detectorLock: threading.Lock = None
+
+    def __init__(self, path: str, detector: BaseDetector = None, realTime: bool = False, callback = None, clock: Clock = None,
+                 prefetch: int = VIDEO_PREFETCH, workers: int = VIDEO_DECODE_WORKERS):
+        super().__init__(clock)
+
+        self.path = path
+        self.detector = detector
+        self.realTime = realTime
+        self.prefetch = prefetch
+        self.workers = workers
+        self._userCallback = callback
+
+        self._sidecar = None
+        if detector == None:
+            sidecar = findSidecar(path)
+            if sidecar == None:
+                raise ValueError('No detector given, and no sidecar next to: ' + path)
+
+            self._sidecar = list(readSidecar(sidecar))
+
+        self._stopEvent = threading.Event()
+        self._finished = threading.Event()
+        self._detectorLock = threading.Lock()
+
+    def running(self):
+        return self._playThread != None and not self._finished.is_set()
+
+    def start(self):
+        self._capture = cv2.VideoCapture(self.path)
+        if not self._capture.isOpened():
+            raise ValueError('Cannot open video: ' + self.path)
+
+        self.fps = self._capture.get(cv2.CAP_PROP_FPS) or 30.0
+
+        # Read MJPG frames still encoded, so that they can be decoded in parallel
+        self._raw = int(self._capture.get(cv2.CAP_PROP_FOURCC)) == MJPG and self._capture.set(cv2.CAP_PROP_FORMAT, -1)
+
+        self._queue = queue.Queue(maxsize=self.prefetch)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self._startTime = self.clock.now()
+
+        self._readThread = threading.Thread(target=self._read)
+        self._playThread = threading.Thread(target=self._play)
+        self._readThread.start()
+        self._playThread.start()
+
+    def stop(self):
+        self._stopEvent.set()
+
+        if self._playThread:
+            self._readThread.join()
+            self._playThread.join()
+            self._pool.shutdown(cancel_futures=True)
+            self._capture.release()
+
+    def wait(self, timeout: float = None) -> bool:
+        '''
+        Blocks until every frame has been published. Returns False on timeout.
+        '''
+
+        return self._finished.wait(timeout)
+
+    def _needsFrames(self) -> bool:
+        return self.detector != None or self._userCallback != None
+
+    def _read(self):
+        index = 0
+
+        while not self._stopEvent.is_set():
+            if self._sidecar != None and index >= len(self._sidecar):
+                break
+
+            if self._needsFrames():
+                ok, data = self._capture.read()
+            else:
+                ok, data = self._capture.grab(), None
+
+            if not ok:
+                break
+
+            future = self._pool.submit(self._process, index, data, self.clock.now())
+            if not self._put(future):
+                return
+
+            index += 1
+
+        self._put(None)
+
+    def _put(self, item) -> bool:
+        # Blocks while the prefetch queue is full, unless stopped
+        while not self._stopEvent.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+
+        return False
+
+    def _process(self, index: int, data, readTime: float):
+        '''
+        Decodes and finds detections in one frame, on the pool.
+        '''
+
+        frame = data
+        if self._raw and data is not None:
+            frame = cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+        if self.detector == None:
+            return (index, frame, None)
+
+        # When paced, a frame is captured when it is due, otherwise when it was read
+        captureTime = self._dueTime(index) if self.realTime else readTime
+
+        if self.detector.threadSafe:
+            detections = self.detector.detect(frame, captureTime)
+        else:
+            with self._detectorLock:
+                detections = self.detector.detect(frame, captureTime)
+
+        return (index, frame, detections)
+
+    def _dueTime(self, index: int) -> float:
+        return self._startTime + index / self.fps
+
+    def _play(self):
+        while not self._stopEvent.is_set():
+            try:
+                future = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            if future == None:
+                break
+
+            index, frame, detections = future.result()
+
+            if self.realTime:
+                delay = self._dueTime(index) - self.clock.now()
+                if delay > 0:
+                    self.clock.sleep(delay)
+
+            now = self.clock.now()
+
+            if detections == None:
+                # Keep the recorded latency between capture and receive
+                recorded = self._sidecar[index]
+                latency = recorded.timestamp - recorded.detections.captureTime if recorded.detections.captureTime > 0 else 0.0
+                detections = DetectionBatch(recorded.detections.records, recorded.detections.fps, now - latency)
+
+            snapshot = self._publishDetections(detections, now)
+            self.published += 1
+
+            if self._userCallback != None:
+                self._userCallback(snapshot, frame)
+
+        self._finished.set()
@@ -1,11 +1,11 @@
 from .base import BaseCamera
-from .detection import Detection
+from .detection import DetectionBatch, PERSON_LABEL
+from .sync import LatestSync, SyncStats
 
 from pathlib import Path
 import depthai as dai
 import numpy as np
 import time
-import cv2
 import threading
 
 from constants import DETECTION_THRESH
@@ -13,34 +13,33 @@ from constants import DETECTION_THRESH
 THREAD_STOP = False
 BLOB_PATH   = str((Path(__file__).parent / Path('../../models/yolo-v4-tiny-tf_openvino_2021.4_6shave.blob')).resolve().absolute())
 RUNNING     = False
+MIN_DEPTH   = 0.5 # m, the closest depth the camera supports
 
-def thread(callback, _pipeline, outputFrames):
+def thread(callback, _pipeline, outputFrames, stats):
     global THREAD_STOP, RUNNING
 
     with dai.Device(_pipeline) as device:
-        # Output queues will be used to get the rgb frames and nn data from the outputs defined above
-        previewQueue = device.getOutputQueue(name="rgb", maxSize=4, blocking=False)
+        # Output queues will be used to get the rgb frames and nn data from the outputs defined above.
+        # The rgb stream only exists when frames are wanted.
+        previewQueue = device.getOutputQueue(name="rgb", maxSize=4, blocking=False) if outputFrames else None
         detectionNNQueue = device.getOutputQueue(name="detections", maxSize=4, blocking=False)
 
+        # Always the newest detections, with the frame they were made on
+        sync = LatestSync(detectionNNQueue, previewQueue, stats)
+
         startTime = time.monotonic()
         counter = 0
         fps = 0
-        color = (0, 0, 0)
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        fontSize = 0.4
-        xStart = 8
-        yHeight = 20
 
         print('Camera has started, outputting frames: ' + str(outputFrames))
         RUNNING = True
 
         while THREAD_STOP == False:
-            inPreview = previewQueue.get()
-            inDet = detectionNNQueue.get()
+            inDet, inPreview = sync.next()
 
             frame = None
 
-            if outputFrames:
+            if inPreview != None:
                 frame = inPreview.getCvFrame()
 
             counter+=1
@@ -50,59 +49,22 @@ def thread(callback, _pipeline, outputFrames):
                 counter = 0
                 startTime = current_time
 
-            detections = inDet.detections
-
-            # If the frame is available, draw bounding boxes on it and show the frame
-            height = 0
-            width = 0
-
-            if outputFrames:
-                height = frame.shape[0]
-                width  = frame.shape[1]
-
-            personDetections = []
-            for detection in detections:
-                if detection.label == 0:
-                    # Ignore detections with depth closer than the minimum the camera supports
-                    if (detection.spatialCoordinates.z / 1000.0) <= 0.5:
-                        continue
-
-                    personDetections.append(Detection(detection.spatialCoordinates.x / 1000.0, detection.spatialCoordinates.y / 1000.0, detection.spatialCoordinates.z / 1000.0, detection.confidence, fps))
-
-                    if outputFrames:
-                        # Denormalize bounding box
-                        x1 = int(detection.xmin * width)
-                        x2 = int(detection.xmax * width)
-                        y1 = int(detection.ymin * height)
-                        y2 = int(detection.ymax * height)
-                        
-                        cv2.rectangle(frame, (x1, y1), (x2, y2), color, cv2.FONT_HERSHEY_SIMPLEX)
-
-            if outputFrames:
-                cv2.putText(frame, "NN (fps): {:.2f}".format(fps), (xStart, yHeight*4), font, fontSize, color)
-
-                if len(personDetections) == 0:
-                    cv2.putText(frame, "X (m): 0", (xStart, yHeight), font, fontSize, color)
-                    cv2.putText(frame, "Y (m): 0", (xStart, yHeight*2), font, fontSize, color)
-                    cv2.putText(frame, "Z (m): 0", (xStart, yHeight*3), font, fontSize, color)
-                else:
-                    closest = None
-
-                    for detection in personDetections:
-                        if closest == None: closest = detection
-                        elif closest.z > detection.z: closest = detection
+            # depthai timestamps frames against the host's monotonic clock
+            captureTime = inDet.getTimestamp().total_seconds()
 
-                    cv2.putText(frame, f"X (m): {closest.x:.2f}", (xStart, yHeight), font, fontSize, color)
-                    cv2.putText(frame, f"Y (m): {closest.y:.2f}", (xStart, yHeight*2), font, fontSize, color)
-                    cv2.putText(frame, f"Z (m): {closest.z:.2f}", (xStart, yHeight*3), font, fontSize, color)
+            # Keep only people, ignoring detections closer than the camera supports
+            personDetections = DetectionBatch.fromDepthai(inDet.detections, captureTime, fps) \
+                .filterLabel(PERSON_LABEL) \
+                .filterDepth(minimum=MIN_DEPTH)
 
-            callback(personDetections, frame if outputFrames else None)
+            callback(personDetections, frame, current_time)
 
         RUNNING = False
 
         print('Stopping camera...')
 
-        previewQueue.close()
+        if previewQueue != None:
+            previewQueue.close()
         detectionNNQueue.close()
 
         print('Camera has stopped')
@@ -110,15 +72,18 @@ def thread(callback, _pipeline, outputFrames):
 class YoloCamera(BaseCamera):
 
     _thread = None
-    _detections = []
     _userCallback = None
 
+    syncStats: SyncStats = None
+
     def previewSize():
         return (416, 416)
 
     def __init__(self, callback = None):
-        self.setup()
+        super().__init__()
         self._userCallback = callback
+        self.syncStats = SyncStats()
+        self.setup()
 
     def setup(self):
         # Create pipeline
@@ -131,12 +96,15 @@ class YoloCamera(BaseCamera):
         self._monoRight = self._pipeline.create(dai.node.MonoCamera)
         self._stereo = self._pipeline.create(dai.node.StereoDepth)
 
-        self._xoutRgb = self._pipeline.create(dai.node.XLinkOut)
         self._xoutNN = self._pipeline.create(dai.node.XLinkOut)
-
-        self._xoutRgb.setStreamName("rgb")
         self._xoutNN.setStreamName("detections")
 
+        # Frames are only sent to the host if something will use them
+        self._xoutRgb = None
+        if self._userCallback != None:
+            self._xoutRgb = self._pipeline.create(dai.node.XLinkOut)
+            self._xoutRgb.setStreamName("rgb")
+
         # Properties
         self._camRgb.setPreviewSize(416, 416)
         self._camRgb.setResolution(dai.ColorCameraProperties.SensorResolution.THE_1080_P)
@@ -170,7 +138,8 @@ class YoloCamera(BaseCamera):
         self._monoRight.out.link(self._stereo.right)
 
         self._camRgb.preview.link(self._spatialDetectionNetwork.input)
-        self._spatialDetectionNetwork.passthrough.link(self._xoutRgb.input)
+        if self._xoutRgb != None:
+            self._spatialDetectionNetwork.passthrough.link(self._xoutRgb.input)
         self._spatialDetectionNetwork.out.link(self._xoutNN.input)
 
         self._stereo.depth.link(self._spatialDetectionNetwork.inputDepth)
@@ -181,7 +150,7 @@ class YoloCamera(BaseCamera):
         return RUNNING
 
     def start(self):
-        self._thread = threading.Thread(target=thread, args=(self._callback, self._pipeline, self._userCallback != None))
+        self._thread = threading.Thread(target=thread, args=(self._callback, self._pipeline, self._xoutRgb != None, self.syncStats))
         self._thread.start()
 
     def stop(self):
@@ -190,11 +159,10 @@ class YoloCamera(BaseCamera):
 
         self._thread.join(5)
 
-    def _callback(self, detections, frame):
-        self._detections = detections
-
-        if self._userCallback != None:
-            self._userCallback(detections, frame)
+    def _callback(self, detections, frame, receiveTime):
+        snapshot = self._publishDetections(detections, receiveTime)
 
-    def detections(self):
-        return self._detections
+        # Frames are passed on without any overlay, see `recording.overlay` to draw one.
+        # There is no frame if its preview was dropped, see `syncStats`
+        if self._userCallback != None and frame is not None:
+            self._userCallback(snapshot, frame)
@@ -0,0 +1,88 @@
+import threading
+import time
+
+class Clock:
+    '''
+    Real time. Everything that sleeps or reads the time in Core, the rules and
+    the mock camera goes through a clock, so that a simulated one can be swapped in.
+
+    Times are in seconds, and are only meaningful relative to each other.
+    '''
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds)
+
+    def wait(self, condition: threading.Condition, predicate, timeout: float) -> bool:
+        '''
+        Waits on `condition`, which must already be held, until `predicate` is true
+        or `timeout` seconds have passed. Returns the final value of `predicate`.
+        '''
+
+        return condition.wait_for(predicate, timeout)
+
+class AcceleratedClock(Clock):
+    '''
+    Real time, running `factor` times faster. Sleeps and waits are shortened to match.
+    '''
+
+    def __init__(self, factor: float):
+        self.factor = factor
+        self._realStart = time.monotonic()
+
+    def now(self) -> float:
+        return self._realStart + (time.monotonic() - self._realStart) * self.factor
+
+    def sleep(self, seconds: float) -> None:
+        time.sleep(seconds / self.factor)
+
+    def wait(self, condition: threading.Condition, predicate, timeout: float) -> bool:
+        return condition.wait_for(predicate, timeout / self.factor)
+
+class VirtualClock(Clock):
+    '''
+    Simulated time, which only moves forwards when something sleeps or it is
+    stepped. Nothing ever actually blocks, so a scenario runs as fast as the CPU
+    allows.
+
+    Only one thread may drive the clock, being the first to sleep, wait or step
+    it. Any other thread moving time on raises a RuntimeError, as time would then
+    run at the sum of every thread's sleeps. Other threads may still read it.
+
+    A wait whose predicate isn't already true moves time on by the full timeout,
+    as with one driving thread nothing else can happen in the meantime.
+    '''
+
+    def __init__(self, start: float = 0.0):
+        self._now = start
+        self._driver = None # ident of the thread driving the clock
+
+    def now(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float) -> None:
+        self.step(seconds)
+
+    def step(self, seconds: float) -> None:
+        thread = threading.get_ident()
+        if self._driver == None:
+            self._driver = thread
+        elif thread != self._driver:
+            raise RuntimeError('VirtualClock is driven by another thread')
+
+        self._now += seconds
+
+    def wait(self, condition: threading.Condition, predicate, timeout: float) -> bool:
+        if predicate():
+            return True
+
+        self.step(timeout)
+
+        # Give other threads a chance to run, without moving time on any further
+        condition.wait(0)
+
+        return predicate()
+
+REAL_CLOCK = Clock()
@@ -1,15 +1,19 @@
 from typing import Tuple
 from pymavlink import mavutil
 from dronekit import Vehicle
-from constants import ALTITUDE, SPEED
+from constants import ALTITUDE, SPEED, COMMAND_MAX_RATE, COMMAND_KEEPALIVE, COMMAND_POSITION_TOLERANCE, COMMAND_YAW_TOLERANCE, RADIUS_OF_EARTH
 
 import math
 
-IS_LOITER = False
-LOITER_POSITION = {
-    "latitude": 0,
-    "longitude": 0
-}
+from clock import Clock, REAL_CLOCK
+
+# SET_POSITION_TARGET type_mask bits. Only position and yaw rate are used.
+IGNORE_VELOCITY_MASK = 0b111000
+IGNORE_ACCEL_MASK    = 0b111000000
+IGNORE_YAW_MASK      = 0b10000000000
+POSITION_TARGET_MASK = IGNORE_ACCEL_MASK | IGNORE_VELOCITY_MASK | IGNORE_YAW_MASK
+
+METERS_PER_DEGREE = math.radians(RADIUS_OF_EARTH) # of latitude
 
 def setYaw(vehicle: Vehicle, relativeYaw: float) -> None:
     msg = vehicle.message_factory.command_long_encode(
@@ -25,69 +29,175 @@ def setYaw(vehicle: Vehicle, relativeYaw: float) -> None:
     vehicle.send_mavlink(msg)
     vehicle.flush()
 
-def setPositionTarget(vehicle: Vehicle, position: Tuple[float, float], yawRate: float) -> None:
-    global IS_LOITER
-
-    localNorth, localEast = position
-
-    if localNorth == 0 and localEast == 0:
-        # Loiter in place with guided mode
-        setLoiterGuided(vehicle, yawRate)
-    else:
-        IS_LOITER = False
-
-        # Find altitude target for NED frame
-        currentAltitude = vehicle.location.global_relative_frame.alt
-        targetAltOffset = 0.0 - (ALTITUDE - currentAltitude) # up is negative
-
-        ignoreVelocityMask =  0b111000
-        ignoreAccelMask =  0b111000000
-        ignoreYaw = 0b10000000000
-        emptyMask = 0b0000000000000000
-
-        msg = vehicle.message_factory.set_position_target_local_ned_encode(
+class CommandEmitter:
+    '''
+    Sends position targets to the vehicle, without flooding the telemetry link.
+
+    A target is only sent if it differs from the last one sent by more than a
+    tolerance, or if `keepAlive` seconds have passed since then. Offsets are
+    relative to the vehicle, so it is where an offset puts the vehicle that is
+    compared, not the offset itself. Following someone walking at a steady pace
+    gives the same offset each tick, but a new place to fly to. Changes are
+    limited to `maxRate` per second, apart from switching between loitering and
+    moving which is always sent straight away.
+
+    Messages are encoded once, and their fields updated in place for each send.
+    '''
+
+    sent       = 0
+    suppressed = 0
+    lastSentAt = 0.0 # clock time the last message left for the vehicle
+
+    isLoiter = False
+    loiterPosition = {
+        "latitude": 0,
+        "longitude": 0
+    }
+
+    _lastSendTime = None
+    _lastTarget   = None
+
+    def __init__(self, vehicle: Vehicle, maxRate: float = COMMAND_MAX_RATE, keepAlive: float = COMMAND_KEEPALIVE,
+                 positionTolerance: float = COMMAND_POSITION_TOLERANCE, yawTolerance: float = COMMAND_YAW_TOLERANCE, clock: Clock = None):
+        self.vehicle = vehicle
+        self.clock = clock if clock != None else REAL_CLOCK
+        self.minInterval = 1.0 / maxRate
+        self.keepAlive = keepAlive
+        self.positionTolerance = positionTolerance
+        self.yawTolerance = yawTolerance
+
+        self._offsetMessage = vehicle.message_factory.set_position_target_local_ned_encode(
             0,       # time_boot_ms (not used)
             0, 0,    # target system, target component
             mavutil.mavlink.MAV_FRAME_BODY_OFFSET_NED, # Use offset from current position
-            emptyMask + ignoreAccelMask + ignoreVelocityMask + ignoreYaw, # type_mask
-            localNorth, localEast, targetAltOffset,
+            POSITION_TARGET_MASK, # type_mask
+            0, 0, 0, # x, y, z position (set on send)
             0, 0, 0, # x, y, z velocity in m/s (not used)
             0, 0, 0, # x, y, z acceleration (not used)
-            0, math.radians(yawRate))    # yaw, yaw_rate
+            0, 0)    # yaw, yaw_rate (set on send)
 
-        vehicle.send_mavlink(msg)
+        self._loiterMessage = vehicle.message_factory.set_position_target_global_int_encode(
+            0,       # time_boot_ms (not used)
+            0, 0,    # target system, target component
+            mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT, # frame
+            POSITION_TARGET_MASK, # type_mask
+            0, 0,    # lat_int, lon_int (set on send)
+            ALTITUDE,
+            0, 0, 0, # x, y, z velocity in NED frame in m/s (not used)
+            0, 0, 0, # afx, afy, afz acceleration
+            0, 0)    # yaw, yaw_rate (set on send)
+
+    def reset(self) -> None:
+        '''
+        Forgets the last target, so that the next one is always sent.
+        '''
+
+        self.isLoiter = False
+        self._lastSendTime = None
+        self._lastTarget = None
+
+    def setPositionTarget(self, position: Tuple[float, float], yawRate: float, now: float = None, vehicleState = None) -> bool:
+        '''
+        Moves the vehicle by an offset from its current position, in meters, while
+        yawing at `yawRate` degrees per second. An offset of (0, 0) loiters in place.
+
+        The current position is taken from `vehicleState` if given, such as the
+        `VehicleState` Core read for this tick, otherwise from the vehicle.
+
+        Returns True if a message was sent.
+        '''
+
+        # Offline callers give their own time, which is then used for every timestamp
+        realTime = now == None
+        if realTime:
+            now = self.clock.now()
+
+        localNorth, localEast = position
+        loiter = localNorth == 0 and localEast == 0
+        frame = vehicleState if vehicleState != None else self.vehicle.location.global_relative_frame
+
+        if loiter:
+            # Loitering holds the position it started at, so only the yaw rate can change
+            target = (0.0, 0.0, yawRate)
+        else:
+            target = self._absoluteTarget(localNorth, localEast, yawRate, frame)
+
+        if not self._shouldSend(target, loiter != self.isLoiter, now):
+            self.suppressed += 1
+            return False
+
+        if loiter:
+            # Loiter in place with guided mode
+            self._sendLoiter(yawRate, frame)
+        else:
+            self.isLoiter = False
+            self._sendOffset(localNorth, localEast, yawRate, frame)
+
+        self.lastSentAt = self.clock.now() if realTime else now
+        self.sent += 1
+        self._lastSendTime = now
+        self._lastTarget = target
+
+        return True
+
+    def summary(self) -> str:
+        return '{} sent, {} suppressed'.format(self.sent, self.suppressed)
+
+    def _shouldSend(self, target, modeChanged: bool, now: float) -> bool:
+        if self._lastTarget == None or modeChanged:
+            return True
+
+        elapsed = now - self._lastSendTime
+        if elapsed >= self.keepAlive:
+            return True
+
+        lastNorth, lastEast, lastYawRate = self._lastTarget
+        north, east, yawRate = target
+
+        changed = abs(north - lastNorth) > self.positionTolerance or \
+                  abs(east - lastEast) > self.positionTolerance or \
+                  abs(yawRate - lastYawRate) > self.yawTolerance
+
+        return changed and elapsed >= self.minInterval
+
+    def _absoluteTarget(self, localNorth: float, localEast: float, yawRate: float, frame) -> Tuple[float, float, float]:
+        # Meters north and east of the equator and meridian, rotating the body
+        # offset by the vehicle's yaw. The target altitude is always ALTITUDE,
+        # so needs no comparing.
+        yaw = frame.yaw if hasattr(frame, 'yaw') else self.vehicle.attitude.yaw
+        north = frame.lat * METERS_PER_DEGREE
+        east = frame.lon * METERS_PER_DEGREE * math.cos(math.radians(frame.lat))
+
+        return (north + localNorth * math.cos(yaw) - localEast * math.sin(yaw),
+                east + localNorth * math.sin(yaw) + localEast * math.cos(yaw),
+                yawRate)
+
+    def _sendOffset(self, localNorth: float, localEast: float, yawRate: float, frame) -> None:
+        # Find altitude target for NED frame
+        currentAltitude = frame.alt
+        targetAltOffset = 0.0 - (ALTITUDE - currentAltitude) # up is negative
 
-def setLoiterGuided(vehicle: Vehicle, yawRate: float) -> None:
-    global IS_LOITER
-    global LOITER_POSITION
+        msg = self._offsetMessage
+        msg.x = localNorth
+        msg.y = localEast
+        msg.z = targetAltOffset
+        msg.yaw_rate = math.radians(yawRate)
 
-    if IS_LOITER != True:
-        IS_LOITER = True
+        self.vehicle.send_mavlink(msg)
 
-        # update position
-        frame = vehicle.location.global_relative_frame
-        LOITER_POSITION = {
-            "latitude": frame.lat,
-            "longitude": frame.lon
-        }
+    def _sendLoiter(self, yawRate: float, frame) -> None:
+        if self.isLoiter != True:
+            self.isLoiter = True
 
-    ignoreVelocityMask =  0b111000
-    ignoreAccelMask =  0b111000000
-    ignoreYaw = 0b10000000000
-    emptyMask = 0b0000000000000000
+            # update position
+            self.loiterPosition = {
+                "latitude": frame.lat,
+                "longitude": frame.lon
+            }
 
-    msg = vehicle.message_factory.set_position_target_global_int_encode(
-        0,       # time_boot_ms (not used)
-        0, 0,    # target system, target component
-        mavutil.mavlink.MAV_FRAME_GLOBAL_RELATIVE_ALT_INT, # frame
-        emptyMask + ignoreAccelMask + ignoreVelocityMask + ignoreYaw, # type_mask (only speeds enabled)
-        int(LOITER_POSITION["latitude"] * 1e7), # lat_int - X Position in WGS84 frame in 1e7 * meters
-        int(LOITER_POSITION["longitude"] * 1e7), # lon_int - Y Position in WGS84 frame in 1e7 * meters
-        ALTITUDE,
-        0, # X velocity in NED frame in m/s
-        0, # Y velocity in NED frame in m/s
-        0, # Z velocity in NED frame in m/s
-        0, 0, 0, # afx, afy, afz acceleration
-        0, math.radians(yawRate))    # yaw, yaw_rate (rad/s)
+        msg = self._loiterMessage
+        msg.lat_int = int(self.loiterPosition["latitude"] * 1e7) # X Position in WGS84 frame in 1e7 * meters
+        msg.lon_int = int(self.loiterPosition["longitude"] * 1e7) # Y Position in WGS84 frame in 1e7 * meters
+        msg.yaw_rate = math.radians(yawRate) # rad/s
 
-    vehicle.send_mavlink(msg)
+        self.vehicle.send_mavlink(msg)
@@ -3,6 +3,8 @@ ALTITUDE_FUZZINESS = 0.1  # meters around ALTITUDE to allow as error
 MINIMUM_DISTANCE   = 4    # ideal meters away from person
 BACKOFF_DISTANCE   = 3.6  # meters away from person to trigger backoff rule
 HEARTBEAT_TIMEOUT  = 2    # seconds
+LOOP_TIMEOUT       = 0.1  # seconds to wait for new detections before re-sending the current target
+DETECTION_MAX_AGE  = 0.5  # seconds since capture before a frame is too old to steer by
 YAW_RATE           = 25    # degrees per search loop
 YAW_MAX_DAMP       = 5.0   # maxiumum damping value for yaw
 SPEED              = 1.0    # m/s
@@ -11,3 +13,44 @@ MOCK_FOV           = 70   # FOV for the mock camera in tests
 MOCK_Z_MAX         = 10   # Max distance in meters for a detection
 MOCK_FPS           = 60   # Mocked FPS value for detections
 RADIUS_OF_EARTH    = 6378100.0  # in meters (for mock camera)
+RECORDER_QUEUE_SIZE     = 30   # frames buffered before the video recorder starts dropping
+RECORDER_MAX_DECIMATION = 8    # keep at least every Nth frame when decimating
+COMMAND_MAX_RATE           = 20   # Hz, most position targets to send per second
+COMMAND_KEEPALIVE          = 0.5  # seconds before re-sending an unchanged position target
+COMMAND_POSITION_TOLERANCE = 0.05 # meters a position target must move by to be re-sent
+COMMAND_YAW_TOLERANCE      = 1.0  # degrees per second a yaw rate must change by to be re-sent
+LATENCY_LOG_INTERVAL       = 10   # seconds between logging latency percentiles
+FLIGHT_RECORDER_CAPACITY   = 180000 # records in the flight recorder ring, 30 minutes at 100 Hz
+FLIGHT_RECORDER_FLUSH      = 100  # records between flushing the flight recorder to disk
+SIM_MAX_SPEED              = 5.0  # m/s, horizontal speed of the simulated vehicle
+SIM_CLIMB_RATE             = 2.5  # m/s, vertical speed of the simulated vehicle
+SIM_YAW_SPEED              = 60   # degrees per second the simulated vehicle turns to a heading at
+TRACKER_GATE               = 13.8 # squared Mahalanobis distance a detection must be within to match a track (99.9%)
+TRACKER_MAX_AGE            = 1.0  # seconds a track is kept without being detected
+TRACKER_CONFIRM_HITS       = 2    # detections before a track can become the target
+TRACKER_LOCK_TIMEOUT       = 0.25 # seconds the target can go unseen before switching to someone who is seen
+TRACKER_ACCEL_NOISE        = 2.0  # m/s^2, how sharply a person's relative velocity may change
+TRACKER_MEASUREMENT_NOISE  = 0.2  # meters, standard deviation of detected positions
+TRACKER_LEAD_TIME          = 0.02 # seconds between evaluating the rules and the command reaching the vehicle
+VIDEO_PREFETCH             = 8    # frames a video file camera reads ahead of playback
+VIDEO_DECODE_WORKERS       = 4    # threads a video file camera decodes and detects on
+DNN_INPUT_SIZES            = (416, 320, 256, 192) # network input sizes to choose from, largest first
+DNN_NMS_THRESHOLD          = 0.5  # overlap above which the weaker of two detections is dropped
+DNN_FIXED_DEPTH            = 4.0  # meters to assume people are at without a depth map
+DNN_HFOV                   = 69   # degrees, horizontal FOV of the OAK-D colour camera
+DNN_ADAPT_FRAMES           = 10   # frames at an input size before it can change again
+DNN_UPSCALE_HEADROOM       = 0.7  # fraction of the budget the next size up must be expected to fit in
+DNN_WORKERS                = 2    # threads detecting frames in parallel
+DNN_BATCH_SIZE             = 1    # most frames detected in one pass, and kept waiting for a worker
+DNN_TARGET_FPS             = 15   # frames per second the input size adapts to keep up with
+LOG_QUEUE_SIZE             = 10000 # log records waiting to be written before new ones are dropped
+LOG_RATE_LIMIT             = 20   # log records let through from one line of code per interval
+LOG_RATE_INTERVAL          = 1.0  # seconds
+LOG_MAX_BYTES              = 50 * 1024 * 1024 # bytes a log file grows to before rotating
+LOG_ROTATE_INTERVAL        = 3600 # seconds a log file is written to before rotating
+LOG_BACKUP_COUNT           = 10   # compressed rotated log files to keep
+SESSION_DISK_BUDGET        = 8 * 1024 * 1024 * 1024 # bytes saved sessions may use before the oldest are deleted
+TELEMETRY_RATE             = 10   # Hz, frames of telemetry published per second
+TELEMETRY_KEYFRAME_PERIOD  = 1.0  # seconds between telemetry frames holding every channel
+TELEMETRY_MAX_DETECTIONS   = 8    # closest detections included in each telemetry frame
+TELEMETRY_CLIENT_QUEUE     = 4    # telemetry frames queued per WebSocket client before dropping
@@ -1,13 +1,20 @@
-import time
-
 from enum import Enum
-from constants import ALTITUDE, HEARTBEAT_TIMEOUT, ALTITUDE_FUZZINESS
+from typing import NamedTuple, Tuple
+from constants import ALTITUDE, HEARTBEAT_TIMEOUT, ALTITUDE_FUZZINESS, LOOP_TIMEOUT, TRACKER_LEAD_TIME, DETECTION_MAX_AGE
 
-from commands import setPositionTarget
+from commands import CommandEmitter
 from dronekit import Vehicle, VehicleMode
 from camera.base import BaseCamera
+from camera.snapshot import FrameSnapshot, EMPTY_SNAPSHOT
+from stats import LoopStats
+from clock import Clock, REAL_CLOCK
+from tracing import LatencyTracer
+from recording.flightrecorder import FlightRecorder
+from tracking.tracker import Tracker, TrackSet, Pose, EMPTY_TRACKS
+from vehiclestate import VehicleState, VehicleStateFeed
 
 from rules.base import BaseRule
+from rules.engine import RuleEngine
 from rules.none import NoDetectionRule
 from rules.search import SearchRule
 from rules.follow import FollowRule
@@ -23,20 +30,55 @@ class ExecutionState(str, Enum):
     ConnectionLoss = "CONNECTION_LOSS"
     Stop           = "STOP"
 
+class TickResult(NamedTuple):
+    rule: int                              # index of the active rule, or -1
+    output: Tuple[Tuple[float, float], float] # position offset and yaw rate from that rule
+    sent: bool                             # whether the output was sent to the vehicle
+
 class Core:
 
     vehicle: Vehicle = None
+    feed: VehicleStateFeed = None
     camera: BaseCamera = None
+    clock: Clock = REAL_CLOCK
     state: ExecutionState = ExecutionState.Init
     rules: list[BaseRule] = []
+    engine: RuleEngine = None
 
     activeRule = 'n/a'
+    maxDetectionAge = DETECTION_MAX_AGE # seconds, frames older than this count as no detection
+    staleFrames = 0
+    loopStats: LoopStats = None
+    emitter: CommandEmitter = None
+    tracer: LatencyTracer = None
+    tracker: Tracker = None
+    tracks: TrackSet = EMPTY_TRACKS # as given to the rules on the latest tick
+    flightRecorder: FlightRecorder = None
+
+    _lastSequence = 0
+    _origin = None # (latitude, longitude) tracking is relative to
+
+    def __init__(self, vehicle: Vehicle, camera: BaseCamera, clock: Clock = None, maxDetectionAge: float = None):
+        '''
+        `clock` is used for all timing, and should be the same clock the camera uses.
+        It defaults to real time.
+
+        Once the latest frame is older than `maxDetectionAge` seconds, for example
+        if the camera stalls, it is treated as if nothing was detected.
+        '''
 
-    def __init__(self, vehicle: Vehicle, camera: BaseCamera):
         self.camera = camera
         self.vehicle = vehicle
-
-        # Setup vehicle etc
+        self.clock = clock if clock != None else REAL_CLOCK
+        self.maxDetectionAge = maxDetectionAge if maxDetectionAge != None else DETECTION_MAX_AGE
+        self.rules = []
+        self.loopStats = LoopStats(self.clock)
+        self.emitter = CommandEmitter(vehicle, clock=self.clock)
+        self.tracer = LatencyTracer()
+        self.tracker = Tracker()
+
+        # Setup vehicle etc. The feed goes first, so that callbacks see the state they were called for
+        self.feed = VehicleStateFeed(vehicle, self.clock)
         self.vehicle.add_attribute_listener('mode', self.modeCallback)
         self.vehicle.add_attribute_listener('armed', self.armedCallback)
         self.vehicle.add_attribute_listener('last_heartbeat', self.lastHeartbeatCallback)
@@ -46,6 +88,7 @@ class Core:
         self.rules.append(FollowRule(self.vehicle, self.camera))
         self.rules.append(SearchRule(self.vehicle, self.camera))
         self.rules.append(NoDetectionRule(self.vehicle, self.camera))
+        self.engine = RuleEngine(self.rules)
 
         # Enter ready state
         self.state = ExecutionState.AwaitingArm
@@ -62,7 +105,8 @@ class Core:
                 # Go into loiter mode because this is totally undefined now
                 # The pilot needs to set the vehicle down and then switch back into GUIDED
                 print('Cannot restart core flow due to being airborne!')
-                setPositionTarget(self.vehicle, (0,0), 0)
+                self.emitter.reset()
+                self.emitter.setPositionTarget((0,0), 0)
                 return
 
             if self.vehicle.armed:
@@ -83,14 +127,16 @@ class Core:
     #### Getters
 
     def isReady(self) -> bool:
-        return self.vehicle.armed and \
-                self.vehicle.mode.name == "GUIDED" and \
+        vehicleState = self.feed.snapshot()
+
+        return vehicleState.armed and \
+                vehicleState.mode == "GUIDED" and \
                 self.camera.running() and \
-                self.vehicle.location.global_relative_frame.alt > 0.5 # Indicates we are actually flying
+                vehicleState.alt > 0.5 # Indicates we are actually flying
 
     def isAltitudeOk(self) -> bool:
         # TODO: This does not account for altitude at current position, only from home
-        return self.vehicle.location.global_relative_frame.alt >= ALTITUDE - ALTITUDE_FUZZINESS
+        return self.feed.snapshot().alt >= ALTITUDE - ALTITUDE_FUZZINESS
 
     def isConnected(self) -> bool:
         return self.vehicle.last_heartbeat < HEARTBEAT_TIMEOUT
@@ -108,17 +154,17 @@ class Core:
 
             if self.state is ExecutionState.Init:
                 # Do nothing during setup.
-                time.sleep(1)
+                self.clock.sleep(1)
                 pass
             elif self.state is ExecutionState.AwaitingArm:
                 if self.armable():
-                    time.sleep(5) # safety delay
+                    self.clock.sleep(5) # safety delay
 
                     if self.state != ExecutionState.Stop:
                         self.state = ExecutionState.Takeoff
 
                 else:
-                    time.sleep(1)
+                    self.clock.sleep(1)
 
             elif self.state is ExecutionState.Takeoff:
                 print('takeoff mode')
@@ -130,7 +176,7 @@ class Core:
                     self.vehicle.armed = True
 
                     print('Waiting for arming...')
-                    time.sleep(1)
+                    self.clock.sleep(1)
 
                 # If state changes happens during the above inner loop
                 if self.state != ExecutionState.Takeoff: continue
@@ -143,49 +189,34 @@ class Core:
 
             elif self.state is ExecutionState.AwaitingReady:
                 if self.isReady() and self.isConnected() and self.isAltitudeOk():
-                    # Prepare for running by resetting rules
-                    for rule in self.rules:
-                        rule.reset()
-
-                    print('entered running state')
-
-                    self.state = ExecutionState.Running
+                    self.startRunning()
 
                 # Shouldn't really happen, but here just in case!
                 elif self.vehicle.mode.name != 'GUIDED':
                     self.state = ExecutionState.PilotOnly
 
-                time.sleep(0.1)
+                self.clock.sleep(0.1)
 
             elif self.state is ExecutionState.Running:
                 # Mode and armed callbacks handle exiting this state.
 
-                # Update each rule with new data
-                for rule in self.rules:
-                    rule.update()
-
-                # Get the highest active rule's output
-                state = ((0.0, 0.0), 0.0)
-                for rule in self.rules:
-                    if rule.isActive():
-                        state = rule.getState()
-                        self.activeRule = rule.name()
-                        break
-
-                # Apply local translation and yaw differential
-                position, yaw = state
-                setPositionTarget(self.vehicle, position, yaw)
+                # Wait for the camera to publish new detections. If none arrive in time,
+                # run anyway so that the current target is kept alive.
+                # The same snapshot is handed to every rule, so they all see the same frame.
+                snapshot = self.camera.waitForDetections(self._lastSequence, LOOP_TIMEOUT)
+                if self.state is not ExecutionState.Running: continue
 
-                time.sleep(0.01)
+                self.loopStats.tick(snapshot.timestamp if snapshot.sequence != self._lastSequence else None)
+                self.tick(snapshot)
 
             elif self.state is ExecutionState.ConnectionLoss:
                 # until reconnected, nothing we can do.
-                time.sleep(1)
+                self.clock.sleep(1)
                 pass
 
             elif self.state is ExecutionState.PilotOnly:
                 # Pilot is in control. Do nothing until we have disarmed again.
-                time.sleep(1)
+                self.clock.sleep(1)
                 pass
 
         # At this point, we are no longer running. Attempt to land if in-flight, else we
@@ -199,6 +230,108 @@ class Core:
         if self.vehicle.armed:
             self.vehicle.disarm()
 
+    def startRunning(self) -> None:
+        '''
+        Enters the Running state, starting the rules and emitter afresh.
+        '''
+
+        # Prepare for running by resetting rules
+        self.engine.reset()
+
+        print('entered running state')
+
+        self._lastSequence = 0
+        self.staleFrames = 0
+        self.loopStats.reset()
+        self.emitter.reset()
+        self.tracker.reset()
+        self.tracks = EMPTY_TRACKS
+        self._origin = None
+
+        self.state = ExecutionState.Running
+
+    def tick(self, snapshot: FrameSnapshot, now: float = None) -> TickResult:
+        '''
+        Runs the rules against a frame, and sends the output of the highest active
+        rule to the vehicle. This is a single iteration of the Running state.
+
+        `now` is the time of this iteration. It defaults to the clock's current
+        time, but can be given to drive the rules offline.
+        '''
+
+        isNewFrame = snapshot.sequence != self._lastSequence
+        self._lastSequence = snapshot.sequence
+
+        evaluateTime = now if now != None else self.clock.now()
+        vehicleState = self.feed.snapshot()
+
+        # Track people from the time the frame was captured, and predict where
+        # they will be once the command reaches the vehicle. Rules never see a
+        # frame that is too old to steer by.
+        if self.isStale(snapshot, evaluateTime):
+            self.staleFrames += 1
+            ruleSnapshot = EMPTY_SNAPSHOT
+            tracks = EMPTY_TRACKS
+        else:
+            pose = self.vehiclePose(vehicleState)
+            if isNewFrame:
+                captureTime = snapshot.detections.captureTime
+                self.tracker.update(snapshot.detections, captureTime if captureTime > 0 else snapshot.timestamp, pose)
+
+            ruleSnapshot = snapshot
+            tracks = self.tracker.predict(evaluateTime + TRACKER_LEAD_TIME, pose)
+
+        self.tracks = tracks
+
+        # Update the rules whose inputs changed, and get the highest active rule's output
+        activeIndex, state, activeMask = self.engine.evaluate(ruleSnapshot, tracks, vehicleState, evaluateTime)
+        if activeIndex != -1:
+            self.activeRule = self.rules[activeIndex].name()
+
+        # When tracking and the rules finished, for tracing. Offline, everything happens at `now`
+        evaluatedAt = self.clock.now() if now == None else now
+
+        # Apply local translation and yaw differential
+        position, yaw = state
+        sent = self.emitter.setPositionTarget(position, yaw, now, vehicleState)
+
+        # Trace how old the frame behind this command is, if the camera timestamped it
+        captureTime = snapshot.detections.captureTime
+        if captureTime > 0:
+            if isNewFrame:
+                self.tracer.evaluated(captureTime, snapshot.timestamp, evaluatedAt)
+            if sent:
+                self.tracer.sent(captureTime, evaluatedAt, self.emitter.lastSentAt)
+
+        if self.flightRecorder:
+            self.flightRecorder.record(evaluateTime, snapshot, vehicleState,
+                                       vehicleState.heading, vehicleState.armed, activeIndex, activeMask, state, sent)
+
+        return TickResult(activeIndex, state, sent)
+
+    def isStale(self, snapshot: FrameSnapshot, now: float) -> bool:
+        '''
+        Whether a frame is too old to act on at `now`.
+        '''
+
+        return snapshot.sequence != 0 and snapshot.detections.age(now) > self.maxDetectionAge
+
+    def vehiclePose(self, vehicleState: VehicleState = None) -> Pose:
+        '''
+        Where the vehicle is relative to where it was when entering the Running state.
+        '''
+
+        if vehicleState == None:
+            vehicleState = self.feed.snapshot()
+
+        if self._origin == None:
+            self._origin = (vehicleState.lat, vehicleState.lon)
+
+        return Pose.fromLocation(self._origin, vehicleState.lat, vehicleState.lon, vehicleState.yaw)
+
+    def ruleNames(self) -> list[str]:
+        return [rule.name() for rule in self.rules]
+
     def stop(self) -> None:
         self.state = ExecutionState.Stop
 
@@ -0,0 +1,222 @@
+'''
+Logging that never blocks the thread doing the logging.
+
+Records are rate limited per call site and put on a bounded queue, then
+written by a background thread as one JSON object per line. Log files rotate
+by size and age, and rotated files are compressed on another thread so that
+writing carries on in the meantime.
+'''
+
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import gzip
+import json
+import logging
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+
+from constants import LOG_QUEUE_SIZE, LOG_RATE_LIMIT, LOG_RATE_INTERVAL, LOG_MAX_BYTES, LOG_ROTATE_INTERVAL, LOG_BACKUP_COUNT
+
+class JsonFormatter(logging.Formatter):
+    '''
+    One line of JSON per record, e.g.
+    {"t": 1043.512, "level": "INFO", "thread": "MainThread", "site": "core:103", "msg": "..."}
+
+    "suppressed" is added when the rate limit dropped records from the same site
+    just before this one, and "exc" when there was an exception.
+    '''
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {
+            "t": round(record.created, 4),
+            "level": record.levelname,
+            "thread": record.threadName,
+            "site": record.module + ':' + str(record.lineno),
+            "msg": record.getMessage(),
+        }
+
+        suppressed = getattr(record, 'suppressed', 0)
+        if suppressed > 0:
+            line["suppressed"] = suppressed
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line["exc"] = record.exc_text
+
+        return json.dumps(line, separators=(',', ':'))
+
+class RateLimitFilter(logging.Filter):
+    '''
+    Lets at most `limit` records through from each call site per `interval`
+    seconds. The next record let through from a site counts how many were dropped.
+    '''
+
+    suppressed = 0 # records dropped in total
+
+    def __init__(self, limit: int = LOG_RATE_LIMIT, interval: float = LOG_RATE_INTERVAL):
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+
+        # Site to [window start, records in window, records dropped since the last one through]
+        self._sites = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        site = (record.pathname, record.lineno)
+        window = self._sites.get(site)
+
+        if window == None or record.created - window[0] >= self.interval:
+            dropped = window[2] if window != None else 0
+            self._sites[site] = [record.created, 1, 0]
+        elif window[1] < self.limit:
+            window[1] += 1
+            dropped, window[2] = window[2], 0
+        else:
+            window[2] += 1
+            self.suppressed += 1
+            return False
+
+        if dropped > 0:
+            record.suppressed = dropped
+
+        return True
+
+class DroppingQueueHandler(QueueHandler):
+    '''
+    Queues records for the listener thread, dropping them rather than waiting
+    when the queue is full.
+    '''
+
+    dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge the message, leaving formatting to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    '''
+    Rotates once the file is larger than `maxBytes` or older than `interval`
+    seconds, keeping `backupCount` old files named `<file>.1.gz`, `<file>.2.gz`, ...
+
+    Rotation only moves the file aside. Renaming older files and compressing
+    happen in order on their own thread. Call `close()` to wait for them.
+    '''
+
+    rotations = 0
+
+    def __init__(self, filename: str, maxBytes: int = LOG_MAX_BYTES, interval: float = LOG_ROTATE_INTERVAL, backupCount: int = LOG_BACKUP_COUNT):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, delay=True)
+
+        self.interval = interval
+
+        self._openedAt = time.monotonic()
+        self._compressions = queue.SimpleQueue()
+        self._compressor = threading.Thread(target=self._compress, daemon=True)
+        self._compressor.start()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval and time.monotonic() - self._openedAt >= self.interval and self.stream != None and self.stream.tell() > 0:
+            return True
+
+        return super().shouldRollover(record)
+
+    def doRollover(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        if os.path.exists(self.baseFilename):
+            self.rotations += 1
+            pending = self.baseFilename + '.rotated' + str(self.rotations)
+            os.replace(self.baseFilename, pending)
+            self._compressions.put(pending)
+
+        # Reopened by the next record
+        self._openedAt = time.monotonic()
+
+    def close(self) -> None:
+        super().close()
+
+        if self._compressor.is_alive():
+            self._compressions.put(None)
+            self._compressor.join()
+
+    def _backup(self, index: int) -> str:
+        return self.baseFilename + '.' + str(index) + '.gz'
+
+    def _compress(self) -> None:
+        while True:
+            pending = self._compressions.get()
+            if pending == None:
+                return
+
+            if self.backupCount == 0:
+                os.remove(pending)
+                continue
+
+            for index in range(self.backupCount - 1, 0, -1):
+                if os.path.exists(self._backup(index)):
+                    os.replace(self._backup(index), self._backup(index + 1))
+
+            with open(pending, 'rb') as source, gzip.open(self._backup(1), 'wb') as compressed:
+                shutil.copyfileobj(source, compressed)
+            os.remove(pending)
+
+class LogPipeline:
+    '''
+    Routes the root logger through a DroppingQueueHandler to a background
+    listener, which writes JSON lines to `path` and plain text to the console.
+    '''
+
+    def __init__(self, path: str, level: int = logging.DEBUG, consoleLevel: int = logging.DEBUG):
+        self.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+
+        self.rateLimit = RateLimitFilter()
+        self.handler = DroppingQueueHandler(self.queue)
+        self.handler.addFilter(self.rateLimit)
+
+        self.fileHandler = CompressingRotatingFileHandler(path)
+        self.fileHandler.setFormatter(JsonFormatter())
+
+        # The real stderr, as sys.stderr may be redirected into logging
+        self.consoleHandler = logging.StreamHandler(sys.__stderr__)
+        self.consoleHandler.setLevel(consoleLevel)
+        self.consoleHandler.setFormatter(logging.Formatter("%(asctime)-15s %(levelname)-8s %(message)s"))
+
+        self.listener = QueueListener(self.queue, self.fileHandler, self.consoleHandler, respect_handler_level=True)
+
+        root = logging.getLogger()
+        root.setLevel(level)
+        root.handlers = [self.handler]
+
+    def start(self) -> None:
+        self.listener.start()
+
+    def stop(self) -> None:
+        '''
+        Writes out everything queued so far, and waits for compression to finish.
+        '''
+
+        logging.getLogger().removeHandler(self.handler)
+        self.listener.stop()
+        self.fileHandler.close()
+
+    def summary(self) -> str:
+        return '{} rate limited, {} dropped'.format(self.rateLimit.suppressed, self.handler.dropped)
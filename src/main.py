@@ -8,8 +8,15 @@ if platform.machine() == 'aarch64':  # Jetson
     os.environ['OPENBLAS_CORETYPE'] = "ARMV8"
 
 from dronekit import connect, Vehicle
-from core import Core
+from core import Core, ExecutionState
+from constants import LATENCY_LOG_INTERVAL, DETECTION_MAX_AGE, SESSION_DISK_BUDGET
 from camera.yolocam import YoloCamera
+from recording.recorder import VideoRecorder, DropPolicy
+from recording.sidecar import SidecarWriter, sidecarPath
+from recording.flightrecorder import FlightRecorder
+from logpipeline import LogPipeline
+from session import SessionStore
+from telemetry import TelemetryPublisher, UdpSink, WebSocketSink
 
 import argparse
 import time
@@ -21,11 +28,12 @@ import logging
 
 PARENT_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir))
 
-EXIT: bool         = False
-core: Core         = None
-camera: YoloCamera = None
-vehicle: Vehicle   = None
-videoWriter        = None
+EXIT: bool              = False
+core: Core              = None
+camera: YoloCamera      = None
+vehicle: Vehicle        = None
+recorder: VideoRecorder = None
+telemetry: TelemetryPublisher = None
 
 # See: https://stackoverflow.com/a/66209331
 class LoggerWriter:
@@ -34,10 +42,14 @@ class LoggerWriter:
         self.buf = []
 
     def write(self, msg):
+        # Logged against the line that printed, so that rate limiting is per print
         if msg.endswith('\n'):
-            self.buf.append(msg.removesuffix('\n'))
-            self.logfct(''.join(self.buf))
-            self.buf = []
+            if len(self.buf) == 0:
+                self.logfct(msg[:-1], stacklevel=2)
+            else:
+                self.buf.append(msg[:-1])
+                self.logfct(''.join(self.buf), stacklevel=2)
+                self.buf = []
         else:
             self.buf.append(msg)
 
@@ -54,9 +66,9 @@ def core_thread(core):
     core.run()
     logging.debug('Stopped core')
 
-def camera_callback(detections, cvFrame):
-    global videoWriter
-    videoWriter.write(cvFrame)
+def camera_callback(snapshot, cvFrame):
+    global recorder
+    recorder.submit(cvFrame, snapshot)
 
 def stop():
     global EXIT, core, camera, vehicle
@@ -72,36 +84,48 @@ def stop():
 def signal_handler(sig, frame):
     stop()
 
+def telemetry_sinks(args):
+    sinks = []
+
+    if args.telemetry:
+        destinations = [(address.rsplit(':', 1)[0], int(address.rsplit(':', 1)[1])) for address in args.telemetry]
+        logging.info('Streaming telemetry over UDP to: ' + ', '.join(args.telemetry))
+        sinks.append(UdpSink(destinations))
+
+    if args.telemetry_ws_port:
+        try:
+            sinks.append(WebSocketSink('0.0.0.0', args.telemetry_ws_port))
+            logging.info('Serving telemetry over WebSocket on port: ' + str(args.telemetry_ws_port))
+        except RuntimeError as error:
+            logging.warning(str(error) + ', not serving telemetry over WebSocket.')
+
+    return sinks
+
 def main(args):
-    global EXIT, core, camera, vehicle, videoWriter
+    global EXIT, core, camera, vehicle, recorder, telemetry
 
     thread = None
 
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
 
-    # Setup the log file
-    logpath = args.log_path
-    if not os.path.exists(logpath):
-        logpath = os.path.join(PARENT_DIRECTORY, 'logs')
+    # Setup the session, which holds this run's log, flight record and video
+    sessionPath = args.session_path
+    if not os.path.exists(sessionPath):
+        sessionPath = os.path.join(PARENT_DIRECTORY, 'sessions')
 
-        print('WARNING Log path not found, redirecting to: ' + os.path.join(PARENT_DIRECTORY, 'logs'))
+        print('WARNING Session path not found, redirecting to: ' + sessionPath)
 
-        # In the event the user has not got a relative `logs` folder
-        if not os.path.exists(logpath):
-            os.mkdir(logpath)
+        # In the event the user has not got a relative `sessions` folder
+        if not os.path.exists(sessionPath):
+            os.mkdir(sessionPath)
 
-    fileCount = len(os.listdir(logpath))
-    logFile = os.path.join(logpath, str(fileCount) + '.log')
+    sessions = SessionStore(sessionPath, args.session_budget * 1024 * 1024 * 1024)
+    session = sessions.allocate()
 
-    logging.basicConfig(
-        level=logging.DEBUG,
-        format="%(asctime)-15s %(levelname)-8s %(message)s",
-        handlers=[
-            logging.FileHandler(logFile),
-            logging.StreamHandler()
-        ]
-    )
+    # Written on a background thread, so that logging never holds up the control loop
+    logPipeline = LogPipeline(session.log)
+    logPipeline.start()
 
     logger = logging.getLogger()
 
@@ -110,16 +134,20 @@ def main(args):
     sys.stdout = LoggerWriter(logger.info)
     sys.stderr = LoggerWriter(logger.error)
 
+    logging.info('Session ' + str(session.id) + ' saving to: ' + session.path)
+
+    # Compress earlier sessions and keep to the disk budget, without holding up startup
+    sessions.startMaintenance()
+
     videoEnabled = args.video
     if args.video:
-        logging.info('Saving videos to: ' + args.video_path)
+        logging.info('Saving video to: ' + session.video)
 
-        if not os.path.exists(args.video_path):
-            logging.warning('Video path ' + args.video_path + ' does not exist, not recording video.')
-            videoEnabled = False
-        else:
-            fileCount = len(os.listdir(args.video_path))
-            videoWriter = cv2.VideoWriter(os.path.join(args.video_path, str(fileCount) + '.mkv'), cv2.VideoWriter_fourcc('M','J','P','G'), 30, YoloCamera.previewSize())
+        videoWriter = cv2.VideoWriter(session.video, cv2.VideoWriter_fourcc('M','J','P','G'), 30, YoloCamera.previewSize())
+
+        # Detections are always saved to a sidecar alongside the video. --video_overlay also draws them onto the frames
+        recorder = VideoRecorder(videoWriter, args.video_drop_policy, sidecar=SidecarWriter(sidecarPath(session.video)), overlay=args.video_overlay)
+        recorder.start()
 
     if not EXIT:
         camera = YoloCamera(camera_callback if videoEnabled else None)
@@ -136,12 +164,35 @@ def main(args):
             vehicle = connect(args.uri, wait_ready=['gps_0', 'armed', 'mode', 'attitude'], rate=20)
 
             # Setup core thread
-            core = Core(vehicle, camera)
+            core = Core(vehicle, camera, maxDetectionAge=args.max_detection_age)
+
+            logging.info('Saving flight record to: ' + session.flight)
+            core.flightRecorder = FlightRecorder(session.flight, core.ruleNames())
             thread = threading.Thread(target=core_thread, args=(core,))
             thread.start()
 
+            # Sampled on its own thread, so that ground stations can't slow down the control loop
+            sinks = telemetry_sinks(args)
+            if len(sinks) > 0:
+                telemetry = TelemetryPublisher(core, sinks)
+                telemetry.start()
+
+            lastLatencyLog = time.monotonic()
+
             while not EXIT:
                 logging.debug('core state is: ' + core.state + ', ' + core.activeRule)
+                if core.state == ExecutionState.Running:
+                    logging.debug('core loop: ' + core.loopStats.summary() + ', ' + str(core.staleFrames) + ' stale, commands: ' + core.emitter.summary())
+                    logging.debug('rules (us): ' + core.engine.summary())
+                logging.debug('camera: ' + camera.syncStats.summary())
+                if recorder:
+                    logging.debug('video recorder: ' + recorder.summary())
+                logging.debug('logging: ' + logPipeline.summary())
+                if telemetry:
+                    logging.debug('telemetry: ' + telemetry.summary())
+                if time.monotonic() - lastLatencyLog >= LATENCY_LOG_INTERVAL:
+                    logging.info('latency (ms): ' + core.tracer.summary())
+                    lastLatencyLog = time.monotonic()
                 time.sleep(1)
 
     # Signal handler will set the value of EXIT
@@ -149,18 +200,34 @@ def main(args):
     if thread:
         thread.join(5)
 
-    if videoWriter:
-        videoWriter.release()
+    if telemetry:
+        telemetry.stop()
+
+    if core and core.flightRecorder:
+        core.flightRecorder.close()
+
+    if recorder:
+        recorder.stop()
+        logging.info('video recorder: ' + recorder.summary())
 
     logging.info('Thank you for flying Matchstic Air. We wish you a pleasant onward journey.')
 
+    sys.stdout = sys.__stdout__
+    sys.stderr = sys.__stderr__
+    logPipeline.stop()
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
 
     parser.add_argument('--uri', type=str, required=True, help="URI to connect with for MAVLink data. e.g., udp:127.0.0.1:14550")
     parser.add_argument('--video', required=False, default=False, help="Specify to save video of detections", action='store_true')
-    parser.add_argument('--log_path', type=str, required=False, default=os.path.join(PARENT_DIRECTORY, 'logs'), help="Path to save log output into")
-    parser.add_argument('--video_path', type=str, required=False, default=os.path.join(PARENT_DIRECTORY, 'videos'), help="Path to save video into")
+    parser.add_argument('--video_overlay', required=False, default=False, help="Specify to draw detections onto the saved video", action='store_true')
+    parser.add_argument('--video_drop_policy', type=str, required=False, default=DropPolicy.DropOldest.value, choices=[policy.value for policy in DropPolicy], help="How to drop video frames when storage can't keep up")
+    parser.add_argument('--session_path', type=str, required=False, default=os.path.join(PARENT_DIRECTORY, 'sessions'), help="Path to save each run's log, flight record and video into")
+    parser.add_argument('--session_budget', type=float, required=False, default=SESSION_DISK_BUDGET / (1024 * 1024 * 1024), help="GB that saved sessions may use, after which the oldest are deleted")
+    parser.add_argument('--max_detection_age', type=float, required=False, default=DETECTION_MAX_AGE, help="Seconds after capture that detections are too old to steer by")
+    parser.add_argument('--telemetry', type=str, nargs='*', required=False, default=[], help="host:port to stream telemetry to over UDP, any number of times. See utils/telemetry.py")
+    parser.add_argument('--telemetry_ws_port', type=int, required=False, default=None, help="Port to serve telemetry on over WebSocket, if websockets is installed")
     parser.add_argument('--killswitch_path', type=str, required=False, default=os.path.join(PARENT_DIRECTORY, 'killswitch'), help="Path to a file that if exists, this program will do nothing when ran")
 
     args = parser.parse_args()
@@ -0,0 +1,188 @@
+import gzip
+import os
+from typing import List, NamedTuple, Tuple
+
+import numpy as np
+
+from camera.snapshot import FrameSnapshot
+from constants import FLIGHT_RECORDER_CAPACITY, FLIGHT_RECORDER_FLUSH
+
+MAGIC          = b'STFR'
+VERSION        = 1
+HEADER_SIZE    = 256
+MAX_DETECTIONS = 4 # closest detections kept per record
+MAX_RULES      = 8
+
+DETECTION_FIELDS = ('x', 'y', 'z', 'confidence') # as recorded for each detection
+
+HEADER_DTYPE = np.dtype([
+    ('magic',      'S4'),
+    ('version',    np.uint32),
+    ('capacity',   np.uint32),
+    ('recordSize', np.uint32),
+    ('count',      np.uint64), # total records ever written, the next one goes at count % capacity
+    ('rules',      'S16', (MAX_RULES,)),
+])
+
+# A single loop iteration. Missing values (e.g. no detection) are NaN.
+FLIGHT_RECORD_DTYPE = np.dtype([
+    ('time',           np.float64), # clock time when the rules were evaluated
+    ('sequence',       np.uint32),  # camera frame sequence number
+    ('captureTime',    np.float64),
+    ('detectionCount', np.uint16),
+    ('detections',     np.float32, (MAX_DETECTIONS, 4)), # x, y, z, confidence, closest first
+    ('latitude',       np.float64),
+    ('longitude',      np.float64),
+    ('altitude',       np.float32), # relative to home
+    ('heading',        np.float32),
+    ('armed',          np.bool_),
+    ('rule',           np.int8),    # index into the header's rule names, -1 if none were active
+    ('activeRules',    np.uint8),   # bitmask of every rule that was active
+    ('targetNorth',    np.float32), # output of the active rule
+    ('targetEast',     np.float32),
+    ('targetYaw',      np.float32),
+    ('commandSent',    np.bool_),   # whether the output was sent to the vehicle
+])
+
+class FlightLog(NamedTuple):
+    records: np.ndarray
+    rules: List[str]
+
+class FlightRecorder:
+    '''
+    Records every Running loop iteration into a fixed-size ring of binary records,
+    in a memory-mapped file. Once full, the oldest records are overwritten.
+
+    As the file is memory-mapped, everything recorded so far survives the process
+    crashing. Recording only fills in a preallocated record, and allocates
+    nothing once its buffers have grown to the most detections seen, so it is
+    cheap enough to do at loop rate.
+    '''
+
+    _map: np.memmap = None
+    _header: np.ndarray = None
+    _records: np.ndarray = None
+    _scratch: np.ndarray = None
+    _closest: np.ndarray = None # the scratch record's detections
+    _depths: np.ndarray = None  # of the current detections, grown as needed
+    _columns: np.ndarray = None # DETECTION_FIELDS of the current detections, grown as needed
+
+    def __init__(self, path: str, rules: List[str], capacity: int = FLIGHT_RECORDER_CAPACITY):
+        if len(rules) > MAX_RULES:
+            raise ValueError('Too many rules to record, maximum is ' + str(MAX_RULES))
+
+        self.path = path
+        self.capacity = capacity
+
+        size = HEADER_SIZE + capacity * FLIGHT_RECORD_DTYPE.itemsize
+        self._map = np.memmap(path, dtype=np.uint8, mode='w+', shape=(size,))
+
+        self._header = self._map[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)
+        self._records = self._map[HEADER_SIZE:].view(FLIGHT_RECORD_DTYPE)
+        self._scratch = np.zeros(1, dtype=FLIGHT_RECORD_DTYPE)
+        self._closest = self._scratch['detections'][0]
+        self._depths = np.empty(0, dtype=np.float32)
+        self._columns = np.empty((0, len(DETECTION_FIELDS)), dtype=np.float32)
+
+        header = self._header[0]
+        header['magic'] = MAGIC
+        header['version'] = VERSION
+        header['capacity'] = capacity
+        header['recordSize'] = FLIGHT_RECORD_DTYPE.itemsize
+        header['count'] = 0
+        header['rules'][:len(rules)] = [name.encode() for name in rules]
+
+        self._map.flush()
+
+    def record(self, time: float, snapshot: FrameSnapshot, location, heading: float, armed: bool,
+               rule: int, activeRules: int, output: Tuple[Tuple[float, float], float], commandSent: bool) -> None:
+        '''
+        Records one loop iteration. `location` is the vehicle's global relative frame.
+        '''
+
+        scratch = self._scratch[0]
+        detections = snapshot.detections.records
+
+        scratch['time'] = time
+        scratch['sequence'] = snapshot.sequence
+        scratch['captureTime'] = snapshot.detections.captureTime
+
+        # Keep the closest few detections, picking them one at a time as there are so few
+        count = len(detections)
+        scratch['detectionCount'] = count
+        self._closest.fill(np.nan)
+        if count > 0:
+            if count > len(self._depths):
+                self._depths = np.empty(count, dtype=np.float32)
+                self._columns = np.empty((count, len(DETECTION_FIELDS)), dtype=np.float32)
+
+            depths = self._depths[:count]
+            columns = self._columns[:count]
+            depths[:] = detections['z']
+            for column, field in enumerate(DETECTION_FIELDS):
+                columns[:, column] = detections[field]
+
+            for i in range(min(count, MAX_DETECTIONS)):
+                closest = depths.argmin()
+                self._closest[i] = columns[closest]
+                depths[closest] = np.inf
+
+        scratch['latitude'] = location.lat
+        scratch['longitude'] = location.lon
+        scratch['altitude'] = location.alt
+        scratch['heading'] = heading if heading != None else np.nan
+        scratch['armed'] = armed
+
+        (north, east), yaw = output
+        scratch['rule'] = rule
+        scratch['activeRules'] = activeRules
+        scratch['targetNorth'] = north
+        scratch['targetEast'] = east
+        scratch['targetYaw'] = yaw
+        scratch['commandSent'] = commandSent
+
+        # Write the record before bumping the count, so a crash never exposes a partial record
+        header = self._header[0]
+        count = int(header['count'])
+        self._records[count % self.capacity] = scratch
+        header['count'] = count + 1
+
+        if (count + 1) % FLIGHT_RECORDER_FLUSH == 0:
+            self._map.flush()
+
+    def close(self) -> None:
+        self._map.flush()
+        del self._map
+
+def loadFlightLog(path: str) -> FlightLog:
+    '''
+    Reads a flight recorder file into a NumPy array of `FLIGHT_RECORD_DTYPE`,
+    oldest record first. The file may be gzipped, as sessions are once finished.
+    '''
+
+    if not os.path.exists(path) and os.path.exists(path + '.gz'):
+        path = path + '.gz'
+
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as file:
+            data = np.frombuffer(file.read(), dtype=np.uint8)
+    else:
+        data = np.fromfile(path, dtype=np.uint8)
+    header = data[:HEADER_DTYPE.itemsize].view(HEADER_DTYPE)[0]
+
+    if header['magic'] != MAGIC or header['version'] != VERSION:
+        raise ValueError('Not a flight recorder file: ' + path)
+
+    capacity = int(header['capacity'])
+    count = int(header['count'])
+    records = data[HEADER_SIZE:HEADER_SIZE + capacity * FLIGHT_RECORD_DTYPE.itemsize].view(FLIGHT_RECORD_DTYPE)
+
+    if count <= capacity:
+        ordered = records[:count].copy()
+    else:
+        start = count % capacity
+        ordered = np.concatenate((records[start:], records[:start]))
+
+    rules = [name.decode() for name in header['rules'] if len(name) > 0]
+
+    return FlightLog(ordered, rules)
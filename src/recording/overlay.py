@@ -0,0 +1,45 @@
+import cv2
+
+from camera.detection import DetectionBatch
+
+COLOR     = (0, 0, 0)
+FONT      = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SIZE = 0.4
+X_START   = 8
+Y_HEIGHT  = 20
+
+def drawOverlay(frame, detections: DetectionBatch):
+    '''
+    Draws bounding boxes for each detection, along with the closest detection's
+    position and the NN fps, onto `frame` in place.
+
+    This is deliberately kept off the camera thread. Call it only where the
+    annotated frame is actually needed.
+    '''
+
+    height = frame.shape[0]
+    width  = frame.shape[1]
+
+    records = detections.records
+    for i in range(len(records)):
+        # Denormalize bounding box
+        x1 = int(records['xmin'][i] * width)
+        x2 = int(records['xmax'][i] * width)
+        y1 = int(records['ymin'][i] * height)
+        y2 = int(records['ymax'][i] * height)
+
+        cv2.rectangle(frame, (x1, y1), (x2, y2), COLOR, cv2.FONT_HERSHEY_SIMPLEX)
+
+    cv2.putText(frame, "NN (fps): {:.2f}".format(detections.fps), (X_START, Y_HEIGHT*4), FONT, FONT_SIZE, COLOR)
+
+    closest = detections.closest()
+    if closest == None:
+        cv2.putText(frame, "X (m): 0", (X_START, Y_HEIGHT), FONT, FONT_SIZE, COLOR)
+        cv2.putText(frame, "Y (m): 0", (X_START, Y_HEIGHT*2), FONT, FONT_SIZE, COLOR)
+        cv2.putText(frame, "Z (m): 0", (X_START, Y_HEIGHT*3), FONT, FONT_SIZE, COLOR)
+    else:
+        cv2.putText(frame, f"X (m): {closest.x:.2f}", (X_START, Y_HEIGHT), FONT, FONT_SIZE, COLOR)
+        cv2.putText(frame, f"Y (m): {closest.y:.2f}", (X_START, Y_HEIGHT*2), FONT, FONT_SIZE, COLOR)
+        cv2.putText(frame, f"Z (m): {closest.z:.2f}", (X_START, Y_HEIGHT*3), FONT, FONT_SIZE, COLOR)
+
+    return frame
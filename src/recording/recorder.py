@@ -0,0 +1,133 @@
+import threading
+from collections import deque
+from enum import Enum
+
+from camera.snapshot import FrameSnapshot
+from constants import RECORDER_QUEUE_SIZE, RECORDER_MAX_DECIMATION
+from .overlay import drawOverlay
+from .sidecar import SidecarWriter
+
+class DropPolicy(str, Enum):
+    DropOldest = "drop-oldest" # Discard the oldest queued frame to make room for the newest
+    Decimate   = "decimate"    # Only accept every Nth frame while the writer is falling behind
+
+class VideoRecorder:
+    '''
+    Writes frames to a video on a dedicated thread, so that slow storage never
+    holds up the camera thread. Frames are held in a bounded queue, and are
+    dropped according to a `DropPolicy` when the writer can't keep up.
+
+    `writer` is anything with `write(frame)` and `release()`, such as `cv2.VideoWriter`.
+
+    Frames are recorded as they came from the camera. If a `sidecar` is given,
+    each written frame's detections are recorded to it as well. Setting `overlay`
+    burns the detections into the video instead, which is done on the writer thread.
+    '''
+
+    queued  = 0
+    written = 0
+    dropped = 0
+
+    _writer = None
+    _sidecar: SidecarWriter = None
+    _overlay = False
+    _thread: threading.Thread = None
+    _queue: deque = None
+    _condition: threading.Condition = None
+    _running = False
+
+    _decimation = 1
+    _submitted  = 0
+
+    def __init__(self, writer, policy: DropPolicy = DropPolicy.DropOldest, queueSize: int = RECORDER_QUEUE_SIZE, sidecar: SidecarWriter = None, overlay: bool = False):
+        self._writer = writer
+        self._sidecar = sidecar
+        self._overlay = overlay
+        self.policy = DropPolicy(policy)
+        self.queueSize = queueSize
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+
+    def start(self) -> None:
+        self._running = True
+
+        self._thread = threading.Thread(target=self._writerThread, name='video-recorder')
+        self._thread.start()
+
+    def stop(self) -> None:
+        '''
+        Writes out anything still queued, then releases the writer.
+        '''
+
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+        if self._thread:
+            self._thread.join()
+
+        self._writer.release()
+
+        if self._sidecar:
+            self._sidecar.close()
+
+    def submit(self, frame, snapshot: FrameSnapshot = None) -> bool:
+        '''
+        Queues a frame, and the detections made on it, to be written. Never blocks,
+        returns False if the frame was dropped.
+        '''
+
+        with self._condition:
+            self._submitted += 1
+
+            if self.policy is DropPolicy.Decimate:
+                if self._submitted % self._decimation != 0:
+                    self.dropped += 1
+                    return False
+
+                if len(self._queue) >= self.queueSize:
+                    # Still falling behind, so keep fewer frames from now on
+                    self._decimation = min(self._decimation * 2, RECORDER_MAX_DECIMATION)
+                    self.dropped += 1
+                    return False
+
+            elif len(self._queue) >= self.queueSize:
+                self._queue.popleft()
+                self.dropped += 1
+
+            self._queue.append((frame, snapshot))
+            self.queued += 1
+            self._condition.notify()
+
+            return True
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def summary(self) -> str:
+        return '{} queued, {} written, {} dropped, {} pending'.format(self.queued, self.written, self.dropped, self.pending())
+
+    def _writerThread(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._queue) > 0 or not self._running)
+
+                if len(self._queue) == 0:
+                    break
+
+                frame, snapshot = self._queue.popleft()
+
+                # Caught up again, so start accepting more frames
+                if self._decimation > 1 and len(self._queue) < self.queueSize // 4:
+                    self._decimation //= 2
+
+            if snapshot != None:
+                if self._overlay:
+                    drawOverlay(frame, snapshot.detections)
+
+                if self._sidecar:
+                    self._sidecar.write(snapshot)
+
+            self._writer.write(frame)
+            self.written += 1
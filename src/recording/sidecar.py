@@ -0,0 +1,90 @@
+import gzip
+import json
+import os
+
+import numpy as np
+
+from camera.detection import DetectionBatch, DETECTION_DTYPE
+from camera.snapshot import FrameSnapshot
+
+# Order of the values stored for each detection in a sidecar line
+SIDECAR_FIELDS = ('x', 'y', 'z', 'confidence', 'xmin', 'ymin', 'xmax', 'ymax', 'label')
+
+def sidecarPath(videoPath: str) -> str:
+    '''
+    The metadata sidecar that sits next to a recorded video, e.g. `3.mkv` -> `3.jsonl`
+    '''
+
+    return os.path.splitext(videoPath)[0] + '.jsonl'
+
+class SidecarWriter:
+    '''
+    Writes one line of JSON per recorded video frame, holding that frame's
+    detections. Together with the raw video, this is enough to re-render the
+    overlay or replay the detections later on.
+
+    Each line looks like:
+    {"frame": 0, "seq": 12, "t": 1043.512, "c": 1043.478, "fps": 29.8, "d": [[x, y, z, confidence, xmin, ymin, xmax, ymax, label], ...]}
+    '''
+
+    frame = 0
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'w')
+
+    def write(self, snapshot: FrameSnapshot) -> None:
+        records = snapshot.detections.records
+
+        line = {
+            "frame": self.frame,
+            "seq": snapshot.sequence,
+            "t": round(snapshot.timestamp, 4),
+            "c": round(snapshot.detections.captureTime, 4),
+            "fps": round(snapshot.detections.fps, 2),
+            "d": [[round(float(record[field]), 3) for field in SIDECAR_FIELDS] for record in records]
+        }
+
+        self._file.write(json.dumps(line, separators=(',', ':')) + '\n')
+        self.frame += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+def findSidecar(videoPath: str) -> str:
+    '''
+    The sidecar next to a video, which may have been compressed with its session,
+    or None if there isn't one.
+    '''
+
+    path = sidecarPath(videoPath)
+    for candidate in (path, path + '.gz'):
+        if os.path.exists(candidate):
+            return candidate
+
+    return None
+
+def readSidecar(path: str):
+    '''
+    Yields a `FrameSnapshot` for each line of a sidecar file, in frame order.
+    The file may be gzipped, as sessions are once finished.
+    '''
+
+    if not os.path.exists(path) and os.path.exists(path + '.gz'):
+        path = path + '.gz'
+
+    with (gzip.open(path, 'rt') if path.endswith('.gz') else open(path, 'r')) as file:
+        for line in file:
+            if line.strip() == '':
+                continue
+
+            data = json.loads(line)
+
+            records = np.zeros(len(data["d"]), dtype=DETECTION_DTYPE)
+            for i, values in enumerate(data["d"]):
+                for field, value in zip(SIDECAR_FIELDS, values):
+                    records[field][i] = value
+
+            records['timestamp'] = data["c"]
+
+            yield FrameSnapshot.create(data["seq"], data["t"], DetectionBatch(records, data["fps"], data["c"]))
@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from camera.detection import Detection, DetectionBatch, EMPTY_BATCH
+from camera.snapshot import FrameSnapshot
+from recording.flightrecorder import FlightRecorder, loadFlightLog
+from constants import FLIGHT_RECORDER_FLUSH
+
+LOCATION = SimpleNamespace(lat=-35.36, lon=149.16, alt=1.75)
+
+def recordTicks(recorder, count):
+    for i in range(count):
+        batch = DetectionBatch.fromDetections([Detection(1.0, 0.0, 10.0, 0.9, 30), Detection(-1.0, 0.0, float(i + 1), 0.8, 30)], float(i), 30)
+        snapshot = FrameSnapshot.create(i + 1, float(i), batch)
+
+        recorder.record(float(i), snapshot, LOCATION, 90.0, True, 1, 0b1110, ((1.0, 0.5), 10.0), i % 2 == 0)
+
+def test_recordsAndLoads(tmp_path):
+    path = str(tmp_path / '0.flight')
+
+    recorder = FlightRecorder(path, ['backoff', 'follow', 'search', 'none'], capacity=10)
+    recordTicks(recorder, 3)
+    recorder.record(3.0, FrameSnapshot.create(4, 3.0, EMPTY_BATCH), LOCATION, None, False, 3, 0b1000, ((0.0, 0.0), 0.0), True)
+    recorder.close()
+
+    log = loadFlightLog(path)
+
+    assert log.rules == ['backoff', 'follow', 'search', 'none']
+    assert len(log.records) == 4
+    assert list(log.records['sequence']) == [1, 2, 3, 4]
+
+    first = log.records[0]
+    assert first['detectionCount'] == 2
+    assert first['detections'][0][2] == pytest.approx(1.0) # closest first
+    assert first['detections'][1][2] == pytest.approx(10.0)
+    assert np.isnan(first['detections'][2]).all()
+    assert first['latitude'] == pytest.approx(-35.36)
+    assert first['rule'] == 1
+    assert first['targetEast'] == pytest.approx(0.5)
+
+    last = log.records[-1]
+    assert last['detectionCount'] == 0
+    assert np.isnan(last['heading'])
+    assert log.rules[last['rule']] == 'none'
+
+def test_recordingDoesNotAllocate(tmp_path):
+    recorder = FlightRecorder(str(tmp_path / '0.flight'), ['follow'], capacity=50)
+
+    # Enough detections that sorting them would show up
+    snapshots = []
+    for i in range(10):
+        detections = [Detection(0.0, 0.0, float((j * 7 + i) % 1000), 0.9, 30) for j in range(1000)]
+        snapshots.append(FrameSnapshot.create(i + 1, float(i), DetectionBatch.fromDetections(detections, float(i), 30)))
+
+    def record(count):
+        for i in range(count):
+            recorder.record(float(i), snapshots[i % 10], LOCATION, 90.0, True, 0, 1, ((1.0, 0.5), 10.0), True)
+
+    # Grows its buffers to fit, and flushes once
+    record(FLIGHT_RECORDER_FLUSH)
+
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        record(500)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        recorder.close()
+
+    # Only small temporaries, and nothing kept per record
+    assert peak - start < 4096
+    assert current - start < 4096
+
+def test_ringOverwritesOldest(tmp_path):
+    path = str(tmp_path / '0.flight')
+
+    recorder = FlightRecorder(path, ['follow'], capacity=5)
+    recordTicks(recorder, 12)
+    recorder.close()
+
+    log = loadFlightLog(path)
+
+    assert list(log.records['sequence']) == [8, 9, 10, 11, 12]
+
+def test_rejectsOtherFiles(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'\0' * 512)
+
+    with pytest.raises(ValueError):
+        loadFlightLog(str(path))
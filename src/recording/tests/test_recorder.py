@@ -0,0 +1,74 @@
+import threading
+
+from constants import RECORDER_MAX_DECIMATION
+from recording.recorder import VideoRecorder, DropPolicy
+
+class BlockedWriter:
+    '''A writer that doesn't write anything until it is unblocked'''
+
+    def __init__(self):
+        self.frames = []
+        self.released = False
+        self.unblocked = threading.Event()
+
+    def write(self, frame):
+        self.unblocked.wait()
+        self.frames.append(frame)
+
+    def release(self):
+        self.released = True
+
+def test_writesAllFramesWhenKeepingUp():
+    writer = BlockedWriter()
+    writer.unblocked.set()
+
+    recorder = VideoRecorder(writer, queueSize=100)
+    recorder.start()
+
+    for i in range(50):
+        assert recorder.submit(i)
+
+    recorder.stop()
+
+    assert writer.frames == list(range(50))
+    assert writer.released
+    assert recorder.queued == 50
+    assert recorder.written == 50
+    assert recorder.dropped == 0
+
+def test_dropOldestKeepsNewestFrames():
+    writer = BlockedWriter()
+
+    recorder = VideoRecorder(writer, DropPolicy.DropOldest, queueSize=4)
+
+    # Not started, so nothing is consumed from the queue
+    for i in range(10):
+        recorder.submit(i)
+
+    assert recorder.dropped == 6
+
+    writer.unblocked.set()
+    recorder.start()
+    recorder.stop()
+
+    assert writer.frames == [6, 7, 8, 9]
+
+def test_decimateKeepsFewerFramesWhenFull():
+    writer = BlockedWriter()
+
+    recorder = VideoRecorder(writer, DropPolicy.Decimate, queueSize=4)
+
+    for i in range(20):
+        recorder.submit(i)
+
+    assert recorder.queued == 4
+    assert recorder.dropped == 16
+    assert recorder._decimation == RECORDER_MAX_DECIMATION
+
+    writer.unblocked.set()
+    recorder.start()
+    recorder.stop()
+
+    # Draining the queue starts relaxing the decimation again
+    assert writer.frames == [0, 1, 2, 3]
+    assert recorder._decimation < RECORDER_MAX_DECIMATION
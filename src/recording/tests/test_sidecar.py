@@ -0,0 +1,81 @@
+import gzip
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from camera.detection import Detection, DetectionBatch, EMPTY_BATCH
+from camera.snapshot import FrameSnapshot
+from recording.recorder import VideoRecorder
+from recording.sidecar import SidecarWriter, findSidecar, readSidecar, sidecarPath
+
+class ListWriter:
+    def __init__(self):
+        self.frames = []
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+    def release(self):
+        pass
+
+def test_sidecarPath():
+    assert sidecarPath('/videos/3.mkv') == '/videos/3.jsonl'
+
+def test_roundTrip(tmp_path):
+    path = str(tmp_path / '0.jsonl')
+    batch = DetectionBatch.fromDetections([Detection(1.25, -0.5, 4.0, 0.9, 30), Detection(0.0, 0.0, 2.5, 0.8, 30)], 10.0, 29.5)
+
+    writer = SidecarWriter(path)
+    writer.write(FrameSnapshot.create(7, 10.0, batch))
+    writer.write(FrameSnapshot.create(8, 10.1, EMPTY_BATCH))
+    writer.close()
+
+    snapshots = list(readSidecar(path))
+
+    assert [s.sequence for s in snapshots] == [7, 8]
+    assert snapshots[0].detections.fps == 29.5
+    assert snapshots[0].closest.z == pytest.approx(2.5)
+    assert len(snapshots[1].detections) == 0
+
+def test_readsCompressedSidecar(tmp_path):
+    video = str(tmp_path / 'video.mkv')
+
+    writer = SidecarWriter(sidecarPath(video))
+    writer.write(FrameSnapshot.create(1, 0.0, EMPTY_BATCH))
+    writer.close()
+
+    with open(sidecarPath(video), 'rb') as source, gzip.open(sidecarPath(video) + '.gz', 'wb') as destination:
+        shutil.copyfileobj(source, destination)
+    os.remove(sidecarPath(video))
+
+    assert findSidecar(video) == sidecarPath(video) + '.gz'
+    assert [s.sequence for s in readSidecar(sidecarPath(video))] == [1]
+
+def test_recorderWritesRawFramesAndSidecar(tmp_path):
+    path = str(tmp_path / '0.jsonl')
+    writer = ListWriter()
+    batch = DetectionBatch.fromDetections([Detection(1.0, 0.0, 4.0, 0.9, 30)], 0.0, 30)
+
+    recorder = VideoRecorder(writer, sidecar=SidecarWriter(path))
+    recorder.start()
+
+    frame = np.zeros((416, 416, 3), dtype=np.uint8)
+    recorder.submit(frame, FrameSnapshot.create(1, 0.0, batch))
+    recorder.stop()
+
+    # No overlay was requested, so the frame is untouched
+    assert not writer.frames[0].any()
+    assert len(list(readSidecar(path))) == 1
+
+def test_recorderDrawsOverlayWhenAsked():
+    writer = ListWriter()
+    recorder = VideoRecorder(writer, overlay=True)
+    recorder.start()
+
+    frame = np.full((416, 416, 3), 255, dtype=np.uint8)
+    recorder.submit(frame, FrameSnapshot.create(1, 0.0, EMPTY_BATCH))
+    recorder.stop()
+
+    assert (writer.frames[0] != 255).any()
@@ -0,0 +1,109 @@
+from typing import List, NamedTuple
+
+import numpy as np
+from dronekit import LocationGlobalRelative, Attitude
+import math
+
+from core import Core
+from camera.base import BaseCamera
+from camera.detection import DetectionBatch, DETECTION_DTYPE, PERSON_LABEL
+from recording.flightrecorder import FlightLog, MAX_DETECTIONS
+from testutils.vehicle import MockVehicle
+
+# A gap between records longer than this means Core left the Running state, and
+# so is restarted before continuing.
+RESTART_GAP = 1.0 # seconds
+
+class ReplayCommand(NamedTuple):
+    time: float
+    message: dict
+
+class ReplayResult(NamedTuple):
+    commands: List[ReplayCommand] # every message that would have been sent
+    rules: np.ndarray             # index of the active rule at each record, -1 if none
+    outputs: np.ndarray           # (north, east, yaw rate) output at each record
+
+class ReplayCamera(BaseCamera):
+    '''
+    A camera that publishes the detections stored in flight recorder records.
+    '''
+
+    def running(self):
+        return True
+
+    def playRecord(self, record) -> None:
+        count = min(int(record['detectionCount']), MAX_DETECTIONS)
+
+        records = np.zeros(count, dtype=DETECTION_DTYPE)
+        for i in range(count):
+            records['x'][i], records['y'][i], records['z'][i], records['confidence'][i] = record['detections'][i]
+
+        records['label'] = PERSON_LABEL
+        records['timestamp'] = record['captureTime']
+
+        self._publishDetections(DetectionBatch(records, 0.0, float(record['captureTime'])), float(record['time']))
+
+class ReplayVehicle(MockVehicle):
+    '''
+    A vehicle whose state is set from flight recorder records, and which collects
+    the messages sent to it rather than sending them anywhere.
+    '''
+
+    time = 0.0
+    commands: List[ReplayCommand] = None
+
+    def __init__(self):
+        super().__init__()
+        self.commands = []
+
+    def playRecord(self, record) -> None:
+        self.time = float(record['time'])
+        self.location.global_relative_frame = LocationGlobalRelative(float(record['latitude']), float(record['longitude']), float(record['altitude']))
+        self.heading = float(record['heading'])
+        self.attitude = Attitude(0.0, math.radians(self.heading), 0.0)
+
+        # Set directly, so that Core doesn't react as if the pilot disarmed
+        self._armed = bool(record['armed'])
+
+    def send_mavlink(self, message):
+        self.commands.append(ReplayCommand(self.time, message.to_dict()))
+
+def replayFlight(log: FlightLog) -> ReplayResult:
+    '''
+    Drives `Core` and its rules with a recorded flight, as fast as possible.
+
+    Detections and vehicle state come from the recording, and each record is
+    one iteration of the Running state at the recorded time. Returns what Core
+    would have done given that input.
+    '''
+
+    camera = ReplayCamera()
+    vehicle = ReplayVehicle()
+    core = Core(vehicle, camera)
+
+    rules = np.full(len(log.records), -1, dtype=np.int8)
+    outputs = np.zeros((len(log.records), 3), dtype=np.float32)
+
+    lastSequence = None
+    lastTime = None
+
+    for index, record in enumerate(log.records):
+        time = float(record['time'])
+
+        if lastTime == None or time - lastTime > RESTART_GAP:
+            core.startRunning()
+        lastTime = time
+
+        vehicle.playRecord(record)
+
+        if record['sequence'] != lastSequence:
+            camera.playRecord(record)
+            lastSequence = record['sequence']
+
+        result = core.tick(camera.snapshot(), time)
+
+        (north, east), yaw = result.output
+        rules[index] = result.rule
+        outputs[index] = (north, east, yaw)
+
+    return ReplayResult(vehicle.commands, rules, outputs)
@@ -1,4 +1,4 @@
-from .base import BaseRule
+from .base import BaseRule, RuleInput
 from constants import BACKOFF_DISTANCE, MINIMUM_DISTANCE
 
 class BackoffRule(BaseRule):
@@ -6,19 +6,29 @@ class BackoffRule(BaseRule):
     Rule to move back if the detection is too close
     '''
 
+    inputs = (RuleInput.Target,)
+
+    _active = False
+
     def isActive(self):
-        return self.camera.closestDetection() != None and \
-            self.camera.closestDetection().z < BACKOFF_DISTANCE
+        return self._active
 
-    def update(self):
-        detection = self.camera.closestDetection()
-        if detection == None:
+    def update(self, snapshot, tracks):
+        target = tracks.target
+        if target == None:
+            self._active = False
             return
 
-        xDistance = detection.x
-        zDistance = detection.z
+        xDistance = target.x
+        zDistance = target.z
 
+        self._active = zDistance < BACKOFF_DISTANCE
         self._targetPosition = (zDistance - MINIMUM_DISTANCE, xDistance)
 
+    def reset(self):
+        super().reset()
+
+        self._active = False
+
     def name(self) -> str:
-        return 'backoff'
\ No newline at end of file
+        return 'backoff'
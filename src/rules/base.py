@@ -1,12 +1,34 @@
+from enum import Enum
 from typing import Tuple
 from camera.base import BaseCamera
+from camera.snapshot import FrameSnapshot
+from tracking.tracker import TrackSet
 from dronekit import Vehicle
 
+class RuleInput(str, Enum):
+    Snapshot = "SNAPSHOT" # the latest frame, changing with each new frame
+    Tracks   = "TRACKS"   # every tracked person, changing each tick
+    Target   = "TARGET"   # the tracked person being followed, or None. Only changes with a new frame, not with each prediction
+    Vehicle  = "VEHICLE"  # the VehicleState for the tick
+    Time     = "TIME"     # the time of the tick, for rules with timers
+
 class BaseRule:
+    '''
+    A behaviour, wanting control of the vehicle or not.
+
+    `inputs` are what `update()` depends on. The `RuleEngine` only calls
+    `update()` when at least one of them has changed, and otherwise keeps the
+    rule's last result. `vehicleState` and `now` are set by the engine before
+    each update.
+    '''
 
     vehicle: Vehicle = None
     camera: BaseCamera = None
 
+    inputs: Tuple[RuleInput, ...] = (RuleInput.Snapshot, RuleInput.Tracks)
+    vehicleState = None
+    now = 0.0
+
     _targetPosition = (0.0, 0.0)
     _targetYaw      = 0.0
 
@@ -15,9 +37,17 @@ class BaseRule:
         self.camera = camera
 
     def isActive(self) -> bool:
+        '''
+        Whether this rule wants control, as of the last call to `update()`
+        '''
         return False
 
-    def update(self) -> None:
+    def update(self, snapshot: FrameSnapshot, tracks: TrackSet) -> None:
+        '''
+        Called each iteration with the latest frame, and the tracked people
+        predicted to when the output will be sent.
+        '''
+
         self._targetPosition = (0.0, 0.0)
         self._targetYaw = 0.0
 
@@ -29,4 +59,4 @@ class BaseRule:
         return (self._targetPosition, self._targetYaw)
 
     def name(self) -> str:
-        return 'base'
\ No newline at end of file
+        return 'base'
@@ -0,0 +1,163 @@
+'''
+Runs the rules each tick, and picks which of them has control.
+
+Rules declare their inputs, so only those with an input that changed since the
+previous tick are updated. The rest keep their last result, leaving the cost of
+a tick to grow with what changed rather than with the number of rules.
+'''
+
+from typing import NamedTuple, Tuple
+import time
+
+from camera.snapshot import FrameSnapshot
+from tracking.tracker import TrackSet
+from .base import BaseRule, RuleInput
+
+NO_OUTPUT = ((0.0, 0.0), 0.0)
+
+# A bit per input, so that finding the rules to update is a mask test per rule
+INPUT_BITS = {input: 1 << index for index, input in enumerate(RuleInput)}
+SNAPSHOT_BIT = INPUT_BITS[RuleInput.Snapshot]
+TRACKS_BIT   = INPUT_BITS[RuleInput.Tracks]
+TARGET_BIT   = INPUT_BITS[RuleInput.Target]
+VEHICLE_BIT  = INPUT_BITS[RuleInput.Vehicle]
+TIME_BIT     = INPUT_BITS[RuleInput.Time]
+
+class Arbitration(NamedTuple):
+    rule: int                                 # index of the active rule, or -1
+    output: Tuple[Tuple[float, float], float] # position offset and yaw rate from that rule
+    activeMask: int                           # bit per active rule, by index
+
+class RuleEngine:
+    '''
+    Holds the rules in priority order, highest first. The first active rule has
+    control.
+
+    Every rule is updated on the first tick after `reset()`. After that, a rule
+    is only updated when one of its `inputs` changes. How long each update takes
+    is recorded per rule, see `summary()`.
+    '''
+
+    rules: list[BaseRule]
+
+    updates = 0 # rule updates made
+    skipped = 0 # rule updates not needed, as nothing they depend on changed
+
+    def __init__(self, rules: list[BaseRule]):
+        self.rules = rules
+
+        self._last = None # (sequence, tracks, target, vehicle state, time) of the previous tick
+        self._inputMasks = [self._inputMask(rule) for rule in rules]
+        self._outputs = [NO_OUTPUT] * len(rules)
+        self._activeMask = 0
+
+        # Per rule, since the last summary
+        self._counts = [0] * len(rules)
+        self._totals = [0.0] * len(rules)
+        self._maxima = [0.0] * len(rules)
+
+    def reset(self) -> None:
+        '''
+        Resets every rule, so that each is updated on the next tick.
+        '''
+
+        for rule in self.rules:
+            rule.reset()
+
+        self._last = None
+        self._inputMasks = [self._inputMask(rule) for rule in self.rules]
+        self._outputs = [NO_OUTPUT] * len(self.rules)
+        self._activeMask = 0
+
+    def evaluate(self, snapshot: FrameSnapshot, tracks: TrackSet, vehicleState = None, now: float = 0.0) -> Arbitration:
+        '''
+        Updates the rules whose inputs changed, and returns the output of the
+        highest priority active rule.
+        '''
+
+        target = tracks.target
+        last = self._last
+
+        # Tracks hold arrays, and vehicle states are replaced whenever they change, so both are compared by identity
+        changed = 0
+        if last != None:
+            if snapshot.sequence != last[0]:
+                changed |= SNAPSHOT_BIT
+            if tracks is not last[1]:
+                changed |= TRACKS_BIT
+            if self._targetChanged(target, last[2], snapshot.sequence != last[0]):
+                changed |= TARGET_BIT
+            if vehicleState is not last[3]:
+                changed |= VEHICLE_BIT
+            if now != last[4]:
+                changed |= TIME_BIT
+
+        self._last = (snapshot.sequence, tracks, target, vehicleState, now)
+
+        for index, rule in enumerate(self.rules):
+            # Every rule is updated on the first tick, including those without inputs
+            if last != None and not changed & self._inputMasks[index]:
+                self.skipped += 1
+                continue
+
+            rule.vehicleState = vehicleState
+            rule.now = now
+
+            start = time.perf_counter()
+            rule.update(snapshot, tracks)
+            active = rule.isActive()
+            self._outputs[index] = rule.getState()
+            elapsed = time.perf_counter() - start
+
+            if active:
+                self._activeMask |= 1 << index
+            else:
+                self._activeMask &= ~(1 << index)
+
+            self.updates += 1
+            self._counts[index] += 1
+            self._totals[index] += elapsed
+            self._maxima[index] = max(self._maxima[index], elapsed)
+
+        if self._activeMask == 0:
+            return Arbitration(-1, NO_OUTPUT, 0)
+
+        # Lowest set bit, as lower indices are higher priority
+        activeIndex = (self._activeMask & -self._activeMask).bit_length() - 1
+
+        return Arbitration(activeIndex, self._outputs[activeIndex], self._activeMask)
+
+    def _targetChanged(self, target, lastTarget, isNewFrame: bool) -> bool:
+        # The target is predicted afresh every tick, so moves a little whenever
+        # anyone is moving. Only a new estimate counts as a change: a new frame,
+        # a different person, or being found or lost.
+        if target == None or lastTarget == None:
+            return target is not lastTarget
+
+        return target.id != lastTarget.id or (isNewFrame and target != lastTarget)
+
+    def _inputMask(self, rule: BaseRule) -> int:
+        mask = 0
+        for input in rule.inputs:
+            mask |= INPUT_BITS[input]
+
+        return mask
+
+    def summary(self, reset = True) -> str:
+        '''
+        Updates made and their mean and max time for each rule, in microseconds,
+        as one line suitable for logging.
+        '''
+
+        parts = []
+        for index, rule in enumerate(self.rules):
+            count = self._counts[index]
+            mean = self._totals[index] / count if count > 0 else 0.0
+            parts.append('{} {} updates, mean {:.1f} max {:.1f}'.format(rule.name(), count, mean * 1e6, self._maxima[index] * 1e6))
+
+        if reset:
+            self._counts = [0] * len(self.rules)
+            self._totals = [0.0] * len(self.rules)
+            self._maxima = [0.0] * len(self.rules)
+
+        return ', '.join(parts) + ', {} skipped'.format(self.skipped)
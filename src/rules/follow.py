@@ -1,4 +1,4 @@
-from .base import BaseRule
+from .base import BaseRule, RuleInput
 import math
 from constants import MINIMUM_DISTANCE, YAW_RATE
 
@@ -7,16 +7,22 @@ class FollowRule(BaseRule):
     Rule to follow a detected person
     '''
 
+    inputs = (RuleInput.Target,)
+
+    _active = False
+
     def isActive(self):
-        return self.camera.closestDetection() != None
+        return self._active
 
-    def update(self):
-        detection = self.camera.closestDetection()
-        if detection == None:
+    def update(self, snapshot, tracks):
+        target = tracks.target
+        self._active = target != None
+
+        if target == None:
             return
 
-        xDistance = detection.x
-        zDistance = detection.z
+        xDistance = target.x
+        zDistance = target.z
 
         invertYaw = xDistance < 0
 
@@ -46,5 +52,7 @@ class FollowRule(BaseRule):
     def reset(self):
         super().reset()
 
+        self._active = False
+
     def name(self) -> str:
         return 'follow'
\ No newline at end of file
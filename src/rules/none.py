@@ -6,6 +6,8 @@ class NoDetectionRule(BaseRule):
     detection
     '''
 
+    inputs = () # always the same, so only updated after a reset
+
     def isActive(self):
         return True
 
@@ -1,4 +1,4 @@
-from .base import BaseRule
+from .base import BaseRule, RuleInput
 import enum
 from constants import YAW_RATE
 
@@ -12,19 +12,21 @@ class SearchRule(BaseRule):
     Rule to yaw in the direction a detection was last seen in
     '''
 
+    inputs = (RuleInput.Target,)
+
     hasSeenPerson = False
     personDirection = Direction.NONE
 
     def isActive(self):
         return self.hasSeenPerson
 
-    def update(self):
-        detection = self.camera.closestDetection()
+    def update(self, snapshot, tracks):
+        target = tracks.target
 
-        if detection != None:
-            if detection.x < 0:
+        if target != None:
+            if target.x < 0:
                 self.personDirection = Direction.LEFT
-            elif detection.x > 0:
+            elif target.x > 0:
                 self.personDirection = Direction.RIGHT
             else:
                 self.personDirection = Direction.NONE
@@ -0,0 +1,64 @@
+import numpy as np
+
+from camera.snapshot import EMPTY_SNAPSHOT
+from tracking.tracker import Target, EMPTY_TRACKS
+
+from rules.base import BaseRule, RuleInput
+from rules.engine import RuleEngine
+from rules.backoff import BackoffRule
+from rules.follow import FollowRule
+from rules.search import SearchRule
+from rules.none import NoDetectionRule
+
+def tracksWith(x, z):
+    return EMPTY_TRACKS._replace(ids=np.array([0]), positions=np.array([[x, z]]), velocities=np.zeros((1, 2)),
+                                 target=Target(0, x, z, 0.0, 0.0))
+
+class CountingRule(BaseRule):
+    updateCount = 0
+
+    def update(self, snapshot, tracks):
+        super().update(snapshot, tracks)
+        self.updateCount += 1
+
+def test_onlyUpdatesRulesWhoseInputsChanged():
+    timed = CountingRule(None, None)
+    timed.inputs = (RuleInput.Time,)
+    targeted = CountingRule(None, None)
+    targeted.inputs = (RuleInput.Target,)
+    constant = CountingRule(None, None)
+    constant.inputs = ()
+
+    engine = RuleEngine([timed, targeted, constant])
+    tracks = tracksWith(0.0, 6.0)
+
+    for i in range(5):
+        engine.evaluate(EMPTY_SNAPSHOT, tracks._replace(time=float(i)), now=float(i))
+
+    assert timed.updateCount == 5
+    assert targeted.updateCount == 1
+    assert constant.updateCount == 1
+
+    # Everything is updated again after a reset
+    engine.reset()
+    engine.evaluate(EMPTY_SNAPSHOT, tracks, now=5.0)
+
+    assert (timed.updateCount, targeted.updateCount, constant.updateCount) == (6, 2, 2)
+
+def test_arbitratesByPriority():
+    engine = RuleEngine([BackoffRule(None, None), FollowRule(None, None), SearchRule(None, None), NoDetectionRule(None, None)])
+
+    result = engine.evaluate(EMPTY_SNAPSHOT, EMPTY_TRACKS)
+    assert result.rule == 3
+    assert result.activeMask == 0b1000
+
+    result = engine.evaluate(EMPTY_SNAPSHOT, tracksWith(1.0, 6.0))
+    assert result.rule == 1
+    assert result.activeMask == 0b1110
+
+    # Losing the person leaves search in control
+    result = engine.evaluate(EMPTY_SNAPSHOT, EMPTY_TRACKS)
+    assert result.rule == 2
+    assert result.output[1] > 0
+
+    assert engine.summary().startswith('backoff 3 updates')
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from camera.snapshot import EMPTY_SNAPSHOT
+from tracking.tracker import Target, EMPTY_TRACKS
+from constants import MINIMUM_DISTANCE, BACKOFF_DISTANCE
+
+from rules.backoff import BackoffRule
+from rules.follow import FollowRule
+from rules.search import SearchRule
+
+def tracksWith(x, z):
+    return EMPTY_TRACKS._replace(ids=np.array([0]), positions=np.array([[x, z]]), velocities=np.zeros((1, 2)),
+                                 target=Target(0, x, z, 0.0, 0.0))
+
+def test_backoff_activeWhenTooClose():
+    rule = BackoffRule(None, None)
+
+    rule.update(EMPTY_SNAPSHOT, tracksWith(0.5, BACKOFF_DISTANCE - 1))
+    assert rule.isActive()
+    assert rule.getState()[0] == pytest.approx((BACKOFF_DISTANCE - 1 - MINIMUM_DISTANCE, 0.5))
+
+    rule.update(EMPTY_SNAPSHOT, EMPTY_TRACKS)
+    assert not rule.isActive()
+
+def test_follow_activeWithDetection():
+    rule = FollowRule(None, None)
+
+    rule.update(EMPTY_SNAPSHOT, tracksWith(-1.0, 6.0))
+    assert rule.isActive()
+
+    position, yaw = rule.getState()
+    assert position == pytest.approx((6.0 - MINIMUM_DISTANCE, -1.0))
+    assert yaw < 0
+
+    rule.update(EMPTY_SNAPSHOT, EMPTY_TRACKS)
+    assert not rule.isActive()
+
+def test_search_yawsTowardsLastSeen():
+    rule = SearchRule(None, None)
+
+    rule.update(EMPTY_SNAPSHOT, EMPTY_TRACKS)
+    assert not rule.isActive()
+
+    rule.update(EMPTY_SNAPSHOT, tracksWith(1.0, 6.0))
+    rule.update(EMPTY_SNAPSHOT, EMPTY_TRACKS)
+
+    assert rule.isActive()
+    assert rule.getState()[1] > 0
@@ -0,0 +1,165 @@
+'''
+Storage for everything a run of the program records, grouped per session.
+
+Each session is a numbered directory holding that run's log, flight record and
+video. Numbers come from a small index file rather than from counting what is
+on disk, so they always go up, even after sessions are deleted.
+'''
+
+from typing import List
+import gzip
+import json
+import os
+import shutil
+import threading
+
+from constants import SESSION_DISK_BUDGET
+
+INDEX_FILE = 'sessions.json'
+
+class Session:
+    '''
+    One run's directory, and the names of the files within it.
+    '''
+
+    def __init__(self, id: int, path: str):
+        self.id = id
+        self.path = path
+
+    @property
+    def log(self) -> str:
+        return os.path.join(self.path, 'log.jsonl')
+
+    @property
+    def flight(self) -> str:
+        return os.path.join(self.path, 'record.flight')
+
+    @property
+    def video(self) -> str:
+        # The video's sidecar is video.jsonl, see `recording.sidecar`
+        return os.path.join(self.path, 'video.mkv')
+
+    def size(self) -> int:
+        '''
+        Bytes used by files in the session.
+        '''
+
+        return sum(entry.stat().st_size for entry in os.scandir(self.path) if entry.is_file())
+
+class SessionStore:
+    '''
+    Allocates sessions under `root`, and looks after the ones already there.
+
+    Maintenance compresses every session but the current one, leaving videos as
+    they are already compressed, then deletes the oldest sessions until all of
+    them fit in `budget` bytes. The current session is never deleted. Use
+    `startMaintenance()` to do this on a low priority background thread.
+    '''
+
+    current: Session = None
+
+    def __init__(self, root: str, budget: int = SESSION_DISK_BUDGET):
+        self.root = root
+        self.budget = budget
+        self._maintenanceThread = None
+
+    def allocate(self) -> Session:
+        '''
+        Creates the next session, and makes it the current one.
+        '''
+
+        indexPath = os.path.join(self.root, INDEX_FILE)
+
+        if os.path.exists(indexPath):
+            with open(indexPath, 'r') as file:
+                id = json.load(file)["next"]
+        else:
+            # Carry on from any sessions made before the index existed
+            id = max([session.id for session in self.sessions()], default=-1) + 1
+
+        # Replaced whole, so that a crash can't leave it half written
+        with open(indexPath + '.tmp', 'w') as file:
+            json.dump({"next": id + 1}, file)
+        os.replace(indexPath + '.tmp', indexPath)
+
+        self.current = Session(id, os.path.join(self.root, str(id)))
+        os.makedirs(self.current.path, exist_ok=True)
+
+        return self.current
+
+    def sessions(self) -> List[Session]:
+        '''
+        Every session in the store, oldest first.
+        '''
+
+        sessions = [Session(int(entry.name), entry.path) for entry in os.scandir(self.root) if entry.is_dir() and entry.name.isdigit()]
+        return sorted(sessions, key=lambda session: session.id)
+
+    def startMaintenance(self) -> None:
+        self._maintenanceThread = threading.Thread(target=self._maintainInBackground, daemon=True)
+        self._maintenanceThread.start()
+
+    def waitForMaintenance(self, timeout: float = None) -> None:
+        if self._maintenanceThread != None:
+            self._maintenanceThread.join(timeout)
+
+    def maintain(self) -> None:
+        for session in self.sessions():
+            if self.current == None or session.id != self.current.id:
+                self.compress(session)
+
+        self.enforceBudget()
+
+    def compress(self, session: Session) -> None:
+        '''
+        Gzips every file in a finished session except videos. Each file is only
+        replaced once its compressed copy is complete, so this can be
+        interrupted at any point and run again.
+        '''
+
+        for entry in os.scandir(session.path):
+            if not entry.is_file() or entry.name.endswith(('.gz', '.mkv', '.tmp')):
+                continue
+
+            compressed = entry.path + '.gz'
+            with open(entry.path, 'rb') as source, gzip.open(compressed + '.tmp', 'wb') as destination:
+                shutil.copyfileobj(source, destination)
+
+            os.replace(compressed + '.tmp', compressed)
+            os.remove(entry.path)
+
+    def enforceBudget(self) -> List[int]:
+        '''
+        Deletes the oldest sessions until the store fits in its budget. Returns
+        the ids of the sessions deleted.
+        '''
+
+        sessions = self.sessions()
+        sizes = [session.size() for session in sessions]
+        total = sum(sizes)
+
+        evicted = []
+        for session, size in zip(sessions, sizes):
+            if total <= self.budget:
+                break
+
+            if self.current != None and session.id == self.current.id:
+                continue
+
+            shutil.rmtree(session.path, ignore_errors=True)
+            total -= size
+            evicted.append(session.id)
+
+        return evicted
+
+    def _maintainInBackground(self) -> None:
+        # Lowest priority for this thread only, so that flying always comes first
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError):
+            pass
+
+        try:
+            self.maintain()
+        except OSError as error:
+            print('Session maintenance failed: ' + str(error))
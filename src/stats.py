@@ -0,0 +1,74 @@
+from clock import Clock, REAL_CLOCK
+
+class LoopStats:
+    '''
+    Tracks how often the control loop runs, and how quickly it wakes up after
+    the camera publishes new detections.
+    '''
+
+    ticks          = 0
+    frameWakeups   = 0
+    timeoutWakeups = 0
+
+    _windowStart  = 0.0
+    _latencyTotal = 0.0
+    _latencyMax   = 0.0
+
+    def __init__(self, clock: Clock = None):
+        self.clock = clock if clock != None else REAL_CLOCK
+        self.reset()
+
+    def reset(self) -> None:
+        self.ticks = 0
+        self.frameWakeups = 0
+        self.timeoutWakeups = 0
+
+        self._windowStart = self.clock.now()
+        self._latencyTotal = 0.0
+        self._latencyMax = 0.0
+
+    def tick(self, frameTime: float = None) -> None:
+        '''
+        Records a loop iteration. `frameTime` is when the detections that woke the
+        loop were published, or None if the loop timed out.
+        '''
+
+        self.ticks += 1
+
+        if frameTime == None:
+            self.timeoutWakeups += 1
+            return
+
+        latency = self.clock.now() - frameTime
+
+        self.frameWakeups += 1
+        self._latencyTotal += latency
+        if latency > self._latencyMax:
+            self._latencyMax = latency
+
+    def loopRate(self) -> float:
+        elapsed = self.clock.now() - self._windowStart
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+    def meanLatency(self) -> float:
+        return self._latencyTotal / self.frameWakeups if self.frameWakeups > 0 else 0.0
+
+    def maxLatency(self) -> float:
+        return self._latencyMax
+
+    def summary(self, reset = True) -> str:
+        '''
+        A one-line description of the stats since the last reset, suitable for logging.
+        '''
+
+        text = '{:.1f} Hz, {} frame / {} timeout wakeups, wakeup latency mean {:.2f} ms, max {:.2f} ms'.format(
+            self.loopRate(),
+            self.frameWakeups,
+            self.timeoutWakeups,
+            self.meanLatency() * 1000.0,
+            self.maxLatency() * 1000.0)
+
+        if reset:
+            self.reset()
+
+        return text
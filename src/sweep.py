@@ -0,0 +1,176 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple
+import contextlib
+import itertools
+import math
+import os
+
+import constants
+import rules.backoff
+import rules.follow
+import rules.search
+
+from core import Core
+from clock import VirtualClock
+from camera.gpx import GPXTrack
+from camera.mock import MockCamera
+from testutils.simulator import SimulatedVehicle
+
+# Constants a scenario may override. Rules import these by name, so they are
+# replaced in each module that uses them.
+TUNABLES = ('MINIMUM_DISTANCE', 'BACKOFF_DISTANCE', 'YAW_RATE')
+TUNED_MODULES = (constants, rules.follow, rules.search, rules.backoff)
+DEFAULT_TUNING = { name: getattr(constants, name) for name in TUNABLES }
+
+START_DISTANCE = 5.0 # meters behind the start of the walk the vehicle begins at
+LOST_FRAMES    = 3   # frames without a detection before the person counts as lost
+
+class Scenario(NamedTuple):
+    track: str                      # path to a GPX walk
+    noise: float = 0.0              # standard deviation of detection noise, in meters
+    tuning: Dict[str, float] = None # overrides for TUNABLES
+    seed: int = 0                   # seed for detection noise
+    rate: float = constants.MOCK_FPS # camera frames per second
+
+class ScenarioResult(NamedTuple):
+    scenario: Scenario
+    duration: float      # seconds of walk simulated
+    minSeparation: float # closest the vehicle came to the person, in meters
+    reacquireTime: float # longest the person was lost for after first being seen, in seconds
+    losses: int          # number of times the person was lost
+    yawError: float      # mean absolute angle between heading and the person, in degrees
+    commandRate: float   # messages sent to the vehicle per second
+
+def applyTuning(tuning: Dict[str, float] = None) -> None:
+    '''
+    Sets the tunable constants, with any not in `tuning` set to their defaults.
+    '''
+
+    tuning = tuning or {}
+
+    unknown = set(tuning) - set(TUNABLES)
+    if unknown:
+        raise ValueError('Cannot tune: ' + ', '.join(sorted(unknown)))
+
+    values = dict(DEFAULT_TUNING, **tuning)
+
+    for module in TUNED_MODULES:
+        for name, value in values.items():
+            if hasattr(module, name):
+                setattr(module, name, value)
+
+def runScenario(scenario: Scenario) -> ScenarioResult:
+    '''
+    Flies Core's rules after a person walking a GPX track, using the mock camera
+    and a simulated vehicle on a virtual clock. Each camera frame is one
+    iteration of the Running state, so this runs as fast as the rules allow.
+    '''
+
+    applyTuning(scenario.tuning)
+
+    # Core's state changes would otherwise be printed for every scenario
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return _runScenario(scenario)
+    finally:
+        applyTuning()
+
+def _runScenario(scenario: Scenario) -> ScenarioResult:
+    track = GPXTrack.load(scenario.track)
+    clock = VirtualClock()
+
+    startLatitude, startLongitude = track.position(0)
+    vehicle = SimulatedVehicle(startLatitude, startLongitude, clock)
+    camera = MockCamera(vehicle, clock, scenario.noise, scenario.seed)
+    core = Core(vehicle, camera, clock)
+
+    # Start in the air behind the person, facing the way they set off
+    heading = _initialHeading(vehicle, track)
+    vehicle.place(-START_DISTANCE * math.cos(heading), -START_DISTANCE * math.sin(heading), constants.ALTITUDE, heading)
+    vehicle.armed = True
+    core.startRunning()
+
+    dt = 1.0 / scenario.rate
+    frames = int(track.duration() / dt) + 1
+
+    minSeparation = math.inf
+    yawErrorTotal = 0.0
+    lastSeen = None
+    missed = 0
+    losses = 0
+    reacquireTime = 0.0
+
+    for frame in range(frames):
+        now = frame * dt
+        clock.step(dt if frame > 0 else 0)
+
+        latitude, longitude = track.position(now)
+        camera.setGlobalCoordinate(latitude, longitude)
+        snapshot = camera.snapshot()
+        core.tick(snapshot)
+
+        personNorth, personEast = vehicle.toLocal(latitude, longitude)
+        north, east, _ = vehicle.localPosition()
+
+        minSeparation = min(minSeparation, math.hypot(personNorth - north, personEast - east))
+
+        bearing = math.atan2(personEast - east, personNorth - north)
+        yawErrorTotal += abs((bearing - vehicle.yaw + math.pi) % (2 * math.pi) - math.pi)
+
+        if len(snapshot.detections) > 0:
+            if lastSeen != None and missed >= LOST_FRAMES:
+                losses += 1
+                reacquireTime = max(reacquireTime, now - lastSeen)
+
+            lastSeen = now
+            missed = 0
+        else:
+            missed += 1
+
+    # Never seen again counts as lost for the rest of the walk
+    if lastSeen != None and missed >= LOST_FRAMES:
+        losses += 1
+        reacquireTime = max(reacquireTime, (frames - 1) * dt - lastSeen)
+
+    duration = (frames - 1) * dt
+
+    return ScenarioResult(
+        scenario,
+        duration,
+        minSeparation,
+        reacquireTime,
+        losses,
+        math.degrees(yawErrorTotal / frames),
+        core.emitter.sent / duration if duration > 0 else 0.0)
+
+def _initialHeading(vehicle: SimulatedVehicle, track: GPXTrack) -> float:
+    # Direction of the first few meters of the walk
+    offset = min(track.duration(), 5.0)
+    north, east = vehicle.toLocal(*track.position(offset))
+
+    return math.atan2(east, north) if north != 0 or east != 0 else 0.0
+
+def scenarioGrid(tracks: Iterable[str], noises: Iterable[float] = (0.0,), tunings: Iterable[Dict[str, float]] = (None,),
+                 seeds: Iterable[int] = (0,)) -> List[Scenario]:
+    '''
+    Every combination of track, noise level, tuning and seed.
+    '''
+
+    return [Scenario(track, noise, tuning, seed) for tuning, track, noise, seed in itertools.product(tunings, tracks, noises, seeds)]
+
+def sweep(scenarios: List[Scenario], workers: int = None) -> List[ScenarioResult]:
+    '''
+    Runs scenarios across a pool of processes, returning results in the same
+    order. Tuning is applied per scenario inside each worker.
+    '''
+
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1:
+        return [runScenario(scenario) for scenario in scenarios]
+
+    # Batch scenarios so that short ones don't spend their time in IPC
+    chunksize = max(1, len(scenarios) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(runScenario, scenarios, chunksize=chunksize))
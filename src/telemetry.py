@@ -0,0 +1,365 @@
+'''
+Streams Core's state to ground stations while flying.
+
+A publisher thread samples Core at a fixed rate, so the control loop does no
+telemetry work at all. Each sample is packed into a small binary frame made of
+channels: the execution state and rule, the vehicle, detections, the target
+and loop stats. A channel is only included when it has changed since the
+previous frame. Every so often a keyframe includes every channel, so that
+anyone who joined late or missed frames catches up.
+
+Frames are sent over UDP to fixed destinations, and to WebSocket clients if
+the `websockets` package is installed. Each destination has its own small
+queue, or none at all for UDP. A destination that falls behind loses frames,
+and its next frame is a keyframe.
+'''
+
+from typing import Dict, List, Tuple
+import asyncio
+import math
+import socket
+import struct
+import threading
+
+from clock import Clock, REAL_CLOCK
+from constants import TELEMETRY_RATE, TELEMETRY_KEYFRAME_PERIOD, TELEMETRY_MAX_DETECTIONS, TELEMETRY_CLIENT_QUEUE
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+MAGIC   = b'ST'
+VERSION = 1
+
+# magic, version, channel mask, sequence, time
+HEADER = struct.Struct('<2sBBHd')
+
+# Channels, in the order they appear in a frame
+STATE      = 1 << 0
+VEHICLE    = 1 << 1
+DETECTIONS = 1 << 2
+TARGET     = 1 << 3
+LOOP       = 1 << 4
+NAMES      = 1 << 5 # only sent in keyframes
+ALL        = STATE | VEHICLE | DETECTIONS | TARGET | LOOP | NAMES
+
+STATE_FORMAT     = struct.Struct('<BB')    # execution state, active rule
+VEHICLE_FORMAT   = struct.Struct('<iihHB') # latitude, longitude (1e-7 degrees), altitude (cm), heading (degrees), armed
+COUNT_FORMAT     = struct.Struct('<B')
+DETECTION_FORMAT = struct.Struct('<hhB')   # x, z (cm), confidence (1/255)
+TARGET_FORMAT    = struct.Struct('<ihhhh') # track id or -1, x, z (cm), vx, vz (cm/s)
+LOOP_FORMAT      = struct.Struct('<HHHH')  # loop rate (0.1 Hz), mean wakeup latency (0.1 ms), stale frames, commands sent
+
+EXECUTION_STATES = ('INIT', 'AWAITING_ARM', 'TAKEOFF', 'AWAITING_READY', 'RUNNING', 'PILOT_ONLY', 'CONNECTION_LOSS', 'STOP')
+NO_RULE = 0xFF
+
+def _clamp(value: float, limit: int) -> int:
+    return max(-limit, min(limit, int(round(value))))
+
+class TelemetryEncoder:
+    '''
+    Packs samples of Core into frames, remembering what was last sent so that
+    unchanged channels can be left out. Values are rounded as they are packed,
+    so changes smaller than that rounding are never sent.
+    '''
+
+    sequence = 0
+
+    def __init__(self):
+        self._last: Dict[int, bytes] = {}
+
+    def encode(self, core, time: float) -> Tuple[bytes, bytes]:
+        '''
+        Returns a delta frame and a keyframe for the current state of `core`.
+        '''
+
+        names = core.ruleNames()
+        # Without polling, so that this thread doesn't move simulated vehicles along
+        vehicle = core.feed.state
+
+        channels = {
+            STATE: self._state(core, names),
+            VEHICLE: VEHICLE_FORMAT.pack(
+                int(round(vehicle.lat * 1e7)), int(round(vehicle.lon * 1e7)),
+                _clamp(vehicle.alt * 100, 32767), int(vehicle.heading) % 360, 1 if vehicle.armed else 0),
+            DETECTIONS: self._detections(core.camera.snapshot()),
+            TARGET: self._target(core.tracks.target),
+            LOOP: LOOP_FORMAT.pack(
+                min(65535, int(core.loopStats.loopRate() * 10)), min(65535, int(core.loopStats.meanLatency() * 10000)),
+                core.staleFrames % 65536, core.emitter.sent % 65536),
+            NAMES: COUNT_FORMAT.pack(len(names)) + b''.join(COUNT_FORMAT.pack(len(name)) + name.encode() for name in names),
+        }
+
+        deltaMask = 0
+        for channel, data in channels.items():
+            if channel != NAMES and self._last.get(channel) != data:
+                deltaMask |= channel
+
+        self._last = channels
+        self.sequence = (self.sequence + 1) % 65536
+
+        return (self._frame(channels, deltaMask, time), self._frame(channels, ALL, time))
+
+    def _frame(self, channels: Dict[int, bytes], mask: int, time: float) -> bytes:
+        parts = [HEADER.pack(MAGIC, VERSION, mask, self.sequence, time)]
+        for channel, data in channels.items():
+            if mask & channel:
+                parts.append(data)
+
+        return b''.join(parts)
+
+    @staticmethod
+    def _state(core, names: List[str]) -> bytes:
+        state = EXECUTION_STATES.index(core.state) if core.state in EXECUTION_STATES else 0
+        rule = names.index(core.activeRule) if core.activeRule in names else NO_RULE
+
+        return STATE_FORMAT.pack(state, rule)
+
+    @staticmethod
+    def _detections(snapshot) -> bytes:
+        records = snapshot.detections.records
+        if len(records) > TELEMETRY_MAX_DETECTIONS:
+            records = records[records['z'].argsort()[:TELEMETRY_MAX_DETECTIONS]]
+
+        return COUNT_FORMAT.pack(len(records)) + b''.join(
+            DETECTION_FORMAT.pack(_clamp(x * 100, 32767), _clamp(z * 100, 32767), _clamp(confidence * 255, 255))
+            for x, z, confidence in zip(records['x'].tolist(), records['z'].tolist(), records['confidence'].tolist()))
+
+    @staticmethod
+    def _target(target) -> bytes:
+        if target == None:
+            return TARGET_FORMAT.pack(-1, 0, 0, 0, 0)
+
+        return TARGET_FORMAT.pack(target.id, _clamp(target.x * 100, 32767), _clamp(target.z * 100, 32767),
+                                  _clamp(target.vx * 100, 32767), _clamp(target.vz * 100, 32767))
+
+class TelemetryDecoder:
+    '''
+    Rebuilds the full state from frames, for a ground station. Fields stay at
+    their last value until a frame changes them.
+    '''
+
+    def __init__(self):
+        self.state = {}
+        self.names = []
+        self.sequence = None
+        self.missed = 0
+
+    def decode(self, frame: bytes) -> dict:
+        magic, version, mask, sequence, time = HEADER.unpack_from(frame)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a telemetry frame')
+
+        if self.sequence != None:
+            self.missed += (sequence - self.sequence - 1) % 65536
+        self.sequence = sequence
+
+        offset = HEADER.size
+        state = self.state
+        state["time"] = time
+
+        if mask & STATE:
+            stateIndex, rule = STATE_FORMAT.unpack_from(frame, offset)
+            offset += STATE_FORMAT.size
+            state["state"] = EXECUTION_STATES[stateIndex]
+            state["rule"] = rule
+
+        if mask & VEHICLE:
+            latitude, longitude, altitude, heading, armed = VEHICLE_FORMAT.unpack_from(frame, offset)
+            offset += VEHICLE_FORMAT.size
+            state["vehicle"] = { "latitude": latitude / 1e7, "longitude": longitude / 1e7, "altitude": altitude / 100, "heading": heading, "armed": armed == 1 }
+
+        if mask & DETECTIONS:
+            (count,) = COUNT_FORMAT.unpack_from(frame, offset)
+            offset += COUNT_FORMAT.size
+            detections = []
+            for _ in range(count):
+                x, z, confidence = DETECTION_FORMAT.unpack_from(frame, offset)
+                offset += DETECTION_FORMAT.size
+                detections.append({ "x": x / 100, "z": z / 100, "confidence": confidence / 255 })
+            state["detections"] = detections
+
+        if mask & TARGET:
+            id, x, z, vx, vz = TARGET_FORMAT.unpack_from(frame, offset)
+            offset += TARGET_FORMAT.size
+            state["target"] = { "id": id, "x": x / 100, "z": z / 100, "vx": vx / 100, "vz": vz / 100 } if id != -1 else None
+
+        if mask & LOOP:
+            rate, latency, stale, sent = LOOP_FORMAT.unpack_from(frame, offset)
+            offset += LOOP_FORMAT.size
+            state["loop"] = { "rate": rate / 10, "latency": latency / 10000, "stale": stale, "sent": sent }
+
+        if mask & NAMES:
+            (count,) = COUNT_FORMAT.unpack_from(frame, offset)
+            offset += COUNT_FORMAT.size
+            self.names = []
+            for _ in range(count):
+                (length,) = COUNT_FORMAT.unpack_from(frame, offset)
+                offset += COUNT_FORMAT.size
+                self.names.append(frame[offset:offset + length].decode())
+                offset += length
+
+        if "rule" in state:
+            rule = state["rule"]
+            state["ruleName"] = self.names[rule] if rule < len(self.names) else 'n/a'
+
+        return state
+
+class UdpSink:
+    '''
+    Sends frames to fixed (host, port) destinations without ever waiting. A
+    frame the socket can't take right away is dropped.
+    '''
+
+    sent = 0
+    dropped = 0
+
+    def __init__(self, destinations: List[Tuple[str, int]]):
+        self.destinations = destinations
+        self._needsKeyframe = [True] * len(destinations)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.setblocking(False)
+
+    def publish(self, delta: bytes, keyframe: bytes, isKeyframe: bool) -> None:
+        for index, destination in enumerate(self.destinations):
+            frame = keyframe if isKeyframe or self._needsKeyframe[index] else delta
+
+            try:
+                self._socket.sendto(frame, destination)
+                self._needsKeyframe[index] = False
+                self.sent += 1
+            except (BlockingIOError, OSError):
+                self._needsKeyframe[index] = True
+                self.dropped += 1
+
+    def close(self) -> None:
+        self._socket.close()
+
+class WebSocketSink:
+    '''
+    Serves frames to WebSocket clients from its own asyncio thread. Each client
+    has a queue of `TELEMETRY_CLIENT_QUEUE` frames, and a slow client loses its
+    oldest frames rather than holding up anyone else.
+    '''
+
+    sent = 0
+    dropped = 0
+
+    def __init__(self, host: str, port: int):
+        if websockets == None:
+            raise RuntimeError('WebSocket telemetry needs the websockets package')
+
+        self.host = host
+        self.port = port
+        self._clients = {}
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+
+    def publish(self, delta: bytes, keyframe: bytes, isKeyframe: bool) -> None:
+        if len(self._clients) > 0:
+            self._loop.call_soon_threadsafe(self._enqueue, delta, keyframe, isKeyframe)
+
+    def close(self) -> None:
+        if self._ready.is_set():
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join(5)
+
+    def _enqueue(self, delta: bytes, keyframe: bytes, isKeyframe: bool) -> None:
+        for queue, state in self._clients.items():
+            if queue.full():
+                queue.get_nowait()
+                state["needsKeyframe"] = True
+                self.dropped += 1
+
+            frame = keyframe if isKeyframe or state["needsKeyframe"] else delta
+            state["needsKeyframe"] = False
+            queue.put_nowait(frame)
+
+    async def _serve(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+
+        async with websockets.serve(self._handle, self.host, self.port):
+            self._ready.set()
+            await self._stop.wait()
+
+    async def _handle(self, websocket, path = None) -> None:
+        queue = asyncio.Queue(maxsize=TELEMETRY_CLIENT_QUEUE)
+        self._clients[queue] = { "needsKeyframe": True }
+
+        try:
+            while True:
+                await websocket.send(await queue.get())
+                self.sent += 1
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            del self._clients[queue]
+
+class TelemetryPublisher:
+    '''
+    Samples `core` `rate` times a second on its own thread, and publishes a
+    frame to each sink.
+    '''
+
+    frames = 0
+
+    def __init__(self, core, sinks: list, rate: float = TELEMETRY_RATE, keyframeInterval: float = TELEMETRY_KEYFRAME_PERIOD, clock: Clock = None):
+        self.core = core
+        self.sinks = sinks
+        self.rate = rate
+        self.keyframeInterval = keyframeInterval
+        self.clock = clock if clock != None else REAL_CLOCK
+        self.encoder = TelemetryEncoder()
+
+        self._stopEvent = threading.Event()
+        self._thread = None
+        self._lastKeyframe = -math.inf
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopEvent.set()
+
+        if self._thread:
+            self._thread.join(5)
+
+        for sink in self.sinks:
+            sink.close()
+
+    def publish(self) -> None:
+        '''
+        Samples and publishes one frame.
+        '''
+
+        now = self.clock.now()
+        delta, keyframe = self.encoder.encode(self.core, now)
+
+        isKeyframe = now - self._lastKeyframe >= self.keyframeInterval
+        if isKeyframe:
+            self._lastKeyframe = now
+
+        for sink in self.sinks:
+            sink.publish(delta, keyframe, isKeyframe)
+
+        self.frames += 1
+
+    def summary(self) -> str:
+        return '{} frames, {} sent, {} dropped'.format(self.frames, sum(sink.sent for sink in self.sinks), sum(sink.dropped for sink in self.sinks))
+
+    def _run(self) -> None:
+        interval = 1.0 / self.rate
+
+        while not self._stopEvent.is_set():
+            try:
+                self.publish()
+            except Exception as error:
+                # Telemetry must never take anything else down with it
+                print('Telemetry failed: ' + str(error))
+
+            self._stopEvent.wait(interval)
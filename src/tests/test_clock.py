@@ -0,0 +1,77 @@
+import threading
+import time
+
+from clock import VirtualClock, AcceleratedClock
+from core import Core, ExecutionState
+from camera.base import BaseCamera
+from testutils.vehicle import MockVehicle
+
+class StaticCamera(BaseCamera):
+    def running(self):
+        return True
+
+def test_virtualClockOnlyMovesWhenAsked():
+    clock = VirtualClock(100.0)
+
+    clock.sleep(5)
+    clock.step(0.5)
+
+    assert clock.now() == 105.5
+
+def test_virtualClockWaitAdvancesByTimeout():
+    clock = VirtualClock()
+    camera = StaticCamera(clock)
+
+    start = time.monotonic()
+    snapshot = camera.waitForDetections(0, 30)
+
+    assert snapshot.sequence == 0
+    assert clock.now() == 30
+    assert time.monotonic() - start < 1
+
+def test_virtualClockHasOneDriver():
+    clock = VirtualClock()
+    clock.sleep(1)
+
+    errors = []
+    def sleepElsewhere():
+        try:
+            clock.sleep(1)
+        except RuntimeError as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=sleepElsewhere)
+    thread.start()
+    thread.join()
+
+    assert len(errors) == 1
+    assert clock.now() == 1
+
+def test_acceleratedClock():
+    clock = AcceleratedClock(50)
+
+    start = clock.now()
+    clock.sleep(1)
+
+    assert clock.now() - start >= 1
+
+def test_coreRunsFasterThanRealTime():
+    clock = VirtualClock()
+    vehicle = MockVehicle(altitude=2.0)
+    core = Core(vehicle, StaticCamera(clock), clock)
+
+    thread = threading.Thread(target=core.run)
+    thread.start()
+
+    # Includes the 5 second safety delay before takeoff
+    deadline = time.monotonic() + 5
+    while clock.now() < 30 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    reachedRunning = core.state is ExecutionState.Running
+    core.stop()
+    thread.join()
+
+    assert reachedRunning
+    assert clock.now() >= 30
+    assert core.emitter.sent > 0
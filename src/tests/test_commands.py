@@ -0,0 +1,70 @@
+import math
+from types import SimpleNamespace
+
+from pymavlink.dialects.v20 import ardupilotmega as mavlink
+
+from commands import CommandEmitter
+
+class FakeVehicle:
+    def __init__(self):
+        self.message_factory = mavlink.MAVLink(None)
+        self.location = SimpleNamespace(global_relative_frame=SimpleNamespace(lat=-35.36, lon=149.16, alt=1.5))
+        self.attitude = SimpleNamespace(yaw=0.0)
+        self.messages = []
+
+    def send_mavlink(self, message):
+        # Messages are reused, so keep a copy of what was actually sent
+        self.messages.append(message.to_dict())
+
+def test_suppressesUnchangedTargets():
+    vehicle = FakeVehicle()
+    emitter = CommandEmitter(vehicle, maxRate=10, keepAlive=1.0, positionTolerance=0.1, yawTolerance=1.0)
+
+    assert emitter.setPositionTarget((1.0, 0.5), 5.0, now=0.0)
+    assert not emitter.setPositionTarget((1.05, 0.5), 5.0, now=0.2)
+    assert emitter.setPositionTarget((1.05, 0.5), 5.0, now=1.0) # keep-alive
+
+    assert emitter.sent == 2
+    assert emitter.suppressed == 1
+
+    message = vehicle.messages[0]
+    assert message['mavpackettype'] == 'SET_POSITION_TARGET_LOCAL_NED'
+    assert message['x'] == 1.0 and message['y'] == 0.5
+    assert math.isclose(message['yaw_rate'], math.radians(5.0), rel_tol=1e-6)
+
+def test_limitsRateOfChanges():
+    vehicle = FakeVehicle()
+    emitter = CommandEmitter(vehicle, maxRate=10, keepAlive=1.0)
+
+    assert emitter.setPositionTarget((1.0, 0.0), 0.0, now=0.0)
+    assert not emitter.setPositionTarget((2.0, 0.0), 0.0, now=0.05)
+    assert emitter.setPositionTarget((2.0, 0.0), 0.0, now=0.1)
+
+    assert vehicle.messages[-1]['x'] == 2.0
+
+def test_loiterIsSentImmediately():
+    vehicle = FakeVehicle()
+    emitter = CommandEmitter(vehicle, maxRate=10, keepAlive=1.0)
+
+    emitter.setPositionTarget((1.0, 0.0), 0.0, now=0.0)
+    assert emitter.setPositionTarget((0, 0), 0.0, now=0.01)
+
+    message = vehicle.messages[-1]
+    assert message['mavpackettype'] == 'SET_POSITION_TARGET_GLOBAL_INT'
+    assert message['lat_int'] == int(-35.36 * 1e7)
+    assert emitter.isLoiter
+
+def test_sameOffsetFromANewPositionIsSent():
+    vehicle = FakeVehicle()
+    emitter = CommandEmitter(vehicle, maxRate=10, keepAlive=1.0, positionTolerance=0.1)
+
+    # Following someone walking away, so the offset stays the same as the vehicle moves
+    frame = vehicle.location.global_relative_frame
+    assert emitter.setPositionTarget((3.0, 0.0), 0.0, now=0.0, vehicleState=SimpleNamespace(lat=frame.lat, lon=frame.lon, alt=frame.alt, yaw=0.0))
+    assert emitter.setPositionTarget((3.0, 0.0), 0.0, now=0.2, vehicleState=SimpleNamespace(lat=frame.lat + 1e-5, lon=frame.lon, alt=frame.alt, yaw=0.0))
+
+    # Turning on the spot moves where a forward offset ends up
+    assert emitter.setPositionTarget((3.0, 0.0), 0.0, now=0.4, vehicleState=SimpleNamespace(lat=frame.lat + 1e-5, lon=frame.lon, alt=frame.alt, yaw=math.pi / 2))
+
+    # Whereas holding still doesn't
+    assert not emitter.setPositionTarget((3.0, 0.0), 0.0, now=0.6, vehicleState=SimpleNamespace(lat=frame.lat + 1e-5, lon=frame.lon, alt=frame.alt, yaw=math.pi / 2))
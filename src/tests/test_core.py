@@ -0,0 +1,65 @@
+from clock import VirtualClock
+from core import Core
+from camera.base import BaseCamera
+from camera.detection import Detection, DetectionBatch
+from testutils.vehicle import MockVehicle
+
+class StaticCamera(BaseCamera):
+    def running(self):
+        return True
+
+def test_staleFramesAreNoDetection():
+    clock = VirtualClock()
+    camera = StaticCamera(clock)
+    core = Core(MockVehicle(altitude=2.0), camera, clock, maxDetectionAge=0.5)
+    core.startRunning()
+
+    # Seen twice, so that the person is tracked
+    for _ in range(2):
+        batch = DetectionBatch.fromDetections([Detection(0.0, 0.0, 6.0, 0.9, 30)], clock.now(), 30)
+        camera._publishDetections(batch)
+        result = core.tick(camera.snapshot())
+        clock.step(0.1)
+
+    assert core.ruleNames()[result.rule] == 'follow'
+
+    # The camera stalls, leaving its last frame in place
+    clock.step(0.4)
+    result = core.tick(camera.snapshot())
+
+    assert core.ruleNames()[result.rule] != 'follow'
+    assert core.staleFrames == 1
+
+def test_receiveTimeUsedWithoutCaptureTime():
+    clock = VirtualClock(100.0)
+    camera = StaticCamera(clock)
+    core = Core(MockVehicle(altitude=2.0), camera, clock)
+
+    camera._publishDetections(DetectionBatch.fromDetections([Detection(0.0, 0.0, 6.0, 0.9, 30)], 0.0, 30))
+
+    assert not core.isStale(camera.snapshot(), 100.1)
+    assert core.isStale(camera.snapshot(), 100.0 + core.maxDetectionAge + 0.1)
+
+def test_targetRulesSkippedBetweenFrames():
+    clock = VirtualClock()
+    camera = StaticCamera(clock)
+    core = Core(MockVehicle(altitude=2.0), camera, clock)
+    core.startRunning()
+
+    # A person walking away, seen at 10 Hz and ticked at 100 Hz
+    for frame in range(5):
+        batch = DetectionBatch.fromDetections([Detection(0.0, 0.0, 6.0 + frame * 0.1, 0.9, 30)], clock.now(), 30)
+        camera._publishDetections(batch)
+
+        for tick in range(10):
+            result = core.tick(camera.snapshot())
+            clock.step(0.01)
+
+    assert core.tracks.target.vz > 0
+    assert core.ruleNames()[result.rule] == 'follow'
+
+    # Updated on the first tick, and then on each frame once the person is confirmed
+    assert 'follow 5 updates' in core.engine.summary()
+
+    # Backoff, follow and search skip the 45 ticks between frames, and none every tick but the first
+    assert core.engine.skipped == 3 * 45 + 49
@@ -0,0 +1,71 @@
+import gzip
+import json
+import logging
+import os
+import queue
+
+from logpipeline import CompressingRotatingFileHandler, DroppingQueueHandler, JsonFormatter, LogPipeline, RateLimitFilter
+
+def makeRecord(message: str, created: float = 0.0, lineno: int = 10) -> logging.LogRecord:
+    record = logging.LogRecord('test', logging.INFO, '/src/core.py', lineno, message, None, None)
+    record.created = created
+    return record
+
+def test_rateLimitsPerSite():
+    limit = RateLimitFilter(limit=3, interval=1.0)
+
+    passed = [limit.filter(makeRecord('spam', i * 0.01)) for i in range(10)]
+    assert passed == [True] * 3 + [False] * 7
+
+    # Another line of code has its own limit
+    assert limit.filter(makeRecord('other', 0.5, lineno=20))
+
+    record = makeRecord('spam', 1.0)
+    assert limit.filter(record)
+    assert record.suppressed == 7
+    assert limit.suppressed == 7
+
+def test_queueDropsRatherThanBlocks():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+
+    for i in range(5):
+        handler.handle(makeRecord('message %d'))
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+def test_rotatesAndCompresses(tmp_path):
+    path = str(tmp_path / 'log.jsonl')
+    handler = CompressingRotatingFileHandler(path, maxBytes=200, interval=None, backupCount=2)
+    handler.setFormatter(JsonFormatter())
+
+    for i in range(20):
+        handler.handle(makeRecord('message ' + str(i)))
+    handler.close()
+
+    assert sorted(os.listdir(tmp_path)) == ['log.jsonl', 'log.jsonl.1.gz', 'log.jsonl.2.gz']
+
+    with gzip.open(path + '.1.gz', 'rt') as file:
+        lines = [json.loads(line) for line in file]
+
+    assert lines[0]["site"] == 'core:10'
+    assert lines[0]["msg"].startswith('message ')
+
+def test_pipelineWritesJsonLines(tmp_path):
+    path = str(tmp_path / 'log.jsonl')
+    handlers = logging.getLogger().handlers[:]
+
+    try:
+        pipeline = LogPipeline(path, consoleLevel=logging.CRITICAL)
+        pipeline.start()
+        logging.getLogger().info('hello %s', 'world')
+        pipeline.stop()
+    finally:
+        logging.getLogger().handlers = handlers
+
+    with open(path) as file:
+        line = json.loads(file.readline())
+
+    assert line["msg"] == 'hello world'
+    assert line["level"] == 'INFO'
+    assert line["site"] == 'test_logpipeline:' + str(test_pipelineWritesJsonLines.__code__.co_firstlineno + 7)
@@ -0,0 +1,61 @@
+from types import SimpleNamespace
+
+from camera.detection import Detection, DetectionBatch, EMPTY_BATCH
+from camera.snapshot import FrameSnapshot
+from recording.flightrecorder import FlightRecorder, loadFlightLog
+from replay import replayFlight
+
+RULES = ['backoff', 'follow', 'search', 'none']
+LOCATION = SimpleNamespace(lat=-35.36, lon=149.16, alt=1.75)
+
+def recordFlight(path):
+    '''
+    Nobody in view, then a person walking up to the drone, then lost again
+    '''
+
+    recorder = FlightRecorder(path, RULES, capacity=1000)
+
+    for i in range(400):
+        time = 100.0 + i * 0.01
+
+        if i < 100 or i >= 250:
+            batch = EMPTY_BATCH
+        else:
+            batch = DetectionBatch.fromDetections([Detection(0.5, 0.0, 8.0 - (i - 100) * 0.04, 0.9, 30)], time, 30)
+
+        # Output isn't used by replay, only the inputs
+        recorder.record(time, FrameSnapshot.create(i + 1, time, batch), LOCATION, 0.0, True, -1, 0, ((0.0, 0.0), 0.0), False)
+
+    recorder.close()
+
+def test_replayIsDeterministic(tmp_path):
+    path = str(tmp_path / '0.flight')
+    recordFlight(path)
+
+    log = loadFlightLog(path)
+
+    first = replayFlight(log)
+    second = replayFlight(log)
+
+    assert (first.rules == second.rules).all()
+    assert (first.outputs == second.outputs).all()
+    assert first.commands == second.commands
+
+def test_replayDrivesRules(tmp_path):
+    path = str(tmp_path / '0.flight')
+    recordFlight(path)
+
+    result = replayFlight(loadFlightLog(path))
+    names = [RULES[i] for i in result.rules]
+
+    assert names[0] == 'none'
+    assert names[150] == 'follow'
+    assert names[240] == 'backoff'
+
+    # The track coasts through short gaps, then is dropped
+    assert names[260] == 'backoff'
+    assert names[399] == 'search'
+
+    # Commands are rate limited in replayed time, not wall-clock time
+    assert 0 < len(result.commands) < 400
+    assert result.commands[0].message['mavpackettype'] == 'SET_POSITION_TARGET_GLOBAL_INT'
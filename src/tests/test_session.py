@@ -0,0 +1,56 @@
+import gzip
+import os
+import shutil
+
+from session import SessionStore
+
+def writeFile(path: str, size: int) -> None:
+    with open(path, 'wb') as file:
+        file.write(b'x' * size)
+
+def test_idsAlwaysGoUp(tmp_path):
+    store = SessionStore(str(tmp_path))
+
+    assert [store.allocate().id for _ in range(3)] == [0, 1, 2]
+
+    # Deleting a session, or starting afresh, doesn't reuse its id
+    shutil.rmtree(str(tmp_path / '2'))
+    assert SessionStore(str(tmp_path)).allocate().id == 3
+
+def test_continuesFromSessionsWithoutIndex(tmp_path):
+    os.mkdir(str(tmp_path / '4'))
+
+    assert SessionStore(str(tmp_path)).allocate().id == 5
+
+def test_compressesFinishedSessionsExceptVideo(tmp_path):
+    store = SessionStore(str(tmp_path))
+    finished = store.allocate()
+
+    with open(finished.log, 'w') as file:
+        file.write('{"msg":"hello"}\n')
+    writeFile(finished.video, 10)
+
+    current = store.allocate()
+    writeFile(current.log, 10)
+
+    store.maintain()
+
+    assert sorted(os.listdir(finished.path)) == ['log.jsonl.gz', 'video.mkv']
+    assert os.listdir(current.path) == ['log.jsonl']
+
+    with gzip.open(finished.log + '.gz', 'rt') as file:
+        assert file.read() == '{"msg":"hello"}\n'
+
+def test_evictsOldestSessionsOverBudget(tmp_path):
+    store = SessionStore(str(tmp_path), budget=250)
+
+    for _ in range(4):
+        writeFile(store.allocate().video, 100)
+
+    assert store.enforceBudget() == [0, 1]
+    assert [session.id for session in store.sessions()] == [2, 3]
+
+    # The current session is kept, even if it alone is over budget
+    store.budget = 50
+    assert store.enforceBudget() == [2]
+    assert [session.id for session in store.sessions()] == [3]
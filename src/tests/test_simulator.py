@@ -0,0 +1,91 @@
+import math
+import threading
+import time
+
+import pytest
+
+from clock import VirtualClock
+from commands import CommandEmitter, setYaw
+from core import Core, ExecutionState
+from camera.base import BaseCamera
+from testutils.simulator import SimulatedVehicle
+from constants import ALTITUDE, SIM_MAX_SPEED
+
+class StaticCamera(BaseCamera):
+    def running(self):
+        return True
+
+def flyingVehicle(clock):
+    vehicle = SimulatedVehicle(clock=clock)
+    vehicle.armed = True
+    vehicle.simple_takeoff(ALTITUDE)
+    clock.step(10)
+
+    return vehicle
+
+def test_takeoffClimbsToAltitude():
+    clock = VirtualClock()
+    vehicle = flyingVehicle(clock)
+
+    assert vehicle.location.global_relative_frame.alt == pytest.approx(ALTITUDE)
+
+def test_bodyOffsetIsRelativeToHeading():
+    clock = VirtualClock()
+    vehicle = flyingVehicle(clock)
+    vehicle.yaw = math.radians(90)
+
+    emitter = CommandEmitter(vehicle, clock=clock)
+    emitter.setPositionTarget((10, 0), 0)
+
+    # Half way there after one second at full speed
+    clock.step(1)
+    north, east, _ = vehicle.localPosition()
+    assert east == pytest.approx(SIM_MAX_SPEED)
+
+    clock.step(10)
+    north, east, _ = vehicle.localPosition()
+    assert north == pytest.approx(0, abs=1e-6)
+    assert east == pytest.approx(10)
+
+def test_yawRateAndLoiter():
+    clock = VirtualClock()
+    vehicle = flyingVehicle(clock)
+    start = vehicle.location.global_relative_frame
+
+    emitter = CommandEmitter(vehicle, clock=clock)
+    emitter.setPositionTarget((0, 0), 45)
+
+    clock.step(2)
+    assert vehicle.heading == 90
+
+    frame = vehicle.location.global_relative_frame
+    assert frame.lat == pytest.approx(start.lat)
+    assert frame.lon == pytest.approx(start.lon)
+
+def test_conditionYawTurnsToHeading():
+    clock = VirtualClock()
+    vehicle = flyingVehicle(clock)
+
+    setYaw(vehicle, -30)
+    clock.step(5)
+
+    assert vehicle.heading == 330
+
+def test_coreFliesWithoutSITL():
+    clock = VirtualClock()
+    vehicle = SimulatedVehicle(clock=clock)
+    core = Core(vehicle, StaticCamera(clock), clock)
+
+    thread = threading.Thread(target=core.run)
+    thread.start()
+
+    deadline = time.monotonic() + 5
+    while core.state is not ExecutionState.Running and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    reachedRunning = core.state is ExecutionState.Running
+    core.stop()
+    thread.join()
+
+    assert reachedRunning
+    assert vehicle.location.global_relative_frame.alt == pytest.approx(0, abs=0.1)
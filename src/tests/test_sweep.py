@@ -0,0 +1,47 @@
+import pytest
+
+import constants
+import rules.follow
+from sweep import Scenario, runScenario, scenarioGrid, sweep, applyTuning
+
+GPX = '''<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1">
+  <trk><trkseg>
+    <trkpt lat="-35.363261" lon="149.165230"><time>2022-05-01T10:00:00Z</time></trkpt>
+    <trkpt lat="-35.363081" lon="149.165230"><time>2022-05-01T10:00:15Z</time></trkpt>
+  </trkseg></trk>
+</gpx>
+'''
+
+@pytest.fixture
+def gpxPath(tmp_path):
+    path = tmp_path / 'walk.gpx'
+    path.write_text(GPX)
+    return str(path)
+
+def test_followsAWalk(gpxPath):
+    result = runScenario(Scenario(gpxPath))
+
+    assert result.duration == pytest.approx(15)
+    assert result.minSeparation == pytest.approx(constants.MINIMUM_DISTANCE, abs=0.5)
+    assert result.losses == 0
+    assert result.commandRate > 0
+
+def test_tuningIsRestored(gpxPath):
+    close = runScenario(Scenario(gpxPath, tuning={ 'MINIMUM_DISTANCE': 2.5 }))
+
+    assert close.minSeparation < 3.0
+    assert rules.follow.MINIMUM_DISTANCE == constants.MINIMUM_DISTANCE
+
+    with pytest.raises(ValueError):
+        applyTuning({ 'SPEED': 2.0 })
+
+def test_parallelMatchesSerial(gpxPath):
+    scenarios = scenarioGrid([gpxPath], noises=(0.0, 0.3), tunings=(None, { 'YAW_RATE': 40 }))
+
+    serial = sweep(scenarios, workers=1)
+    parallel = sweep(scenarios, workers=2)
+
+    assert len(parallel) == 4
+    assert [result.scenario for result in parallel] == scenarios
+    assert [result.minSeparation for result in parallel] == [result.minSeparation for result in serial]
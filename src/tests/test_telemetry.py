@@ -0,0 +1,83 @@
+import socket
+
+import pytest
+
+from clock import VirtualClock
+from core import Core
+from camera.base import BaseCamera
+from camera.detection import Detection, DetectionBatch
+from telemetry import TelemetryDecoder, TelemetryEncoder, TelemetryPublisher, UdpSink, HEADER, LOOP, STATE, NAMES, DETECTIONS, TARGET
+from testutils.vehicle import MockVehicle
+
+def makeCore():
+    clock = VirtualClock()
+    camera = BaseCamera(clock)
+    core = Core(MockVehicle(altitude=2.0), camera, clock)
+    core.startRunning()
+
+    for _ in range(2):
+        camera._publishDetections(DetectionBatch.fromDetections([Detection(0.5, 0.0, 6.0, 0.9, 30)], clock.now(), 30))
+        core.tick(camera.snapshot())
+        clock.step(0.1)
+
+    return core
+
+def test_deltaLeavesOutUnchangedChannels():
+    core = makeCore()
+    encoder = TelemetryEncoder()
+
+    delta, keyframe = encoder.encode(core, 0.0)
+    assert HEADER.unpack_from(delta)[2] & NAMES == 0
+    assert HEADER.unpack_from(keyframe)[2] & NAMES == NAMES
+
+    # Nothing has changed, so only the header is sent
+    delta, keyframe = encoder.encode(core, 0.1)
+    assert len(delta) == HEADER.size
+
+    core.loopStats.tick()
+    delta, keyframe = encoder.encode(core, 0.2)
+    assert HEADER.unpack_from(delta)[2] == LOOP
+
+def test_decoderRebuildsState():
+    core = makeCore()
+    encoder = TelemetryEncoder()
+    decoder = TelemetryDecoder()
+
+    _, keyframe = encoder.encode(core, 0.0)
+    state = decoder.decode(keyframe)
+
+    assert state["state"] == 'RUNNING'
+    assert state["ruleName"] == 'follow'
+    assert state["detections"] == [{ "x": 0.5, "z": 6.0, "confidence": pytest.approx(0.9, abs=0.01) }]
+    assert state["target"]["x"] == pytest.approx(0.5, abs=0.05)
+    assert state["vehicle"]["altitude"] == 2.0
+
+    # A delta only changes what it holds
+    core.activeRule = 'search'
+    delta, _ = encoder.encode(core, 0.1)
+    state = decoder.decode(delta)
+
+    assert HEADER.unpack_from(delta)[2] & (STATE | DETECTIONS | TARGET) == STATE
+    assert state["ruleName"] == 'search'
+    assert len(state["detections"]) == 1
+    assert decoder.missed == 0
+
+def test_publishesOverUdp():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('127.0.0.1', 0))
+    receiver.settimeout(5)
+
+    core = makeCore()
+    publisher = TelemetryPublisher(core, [UdpSink([receiver.getsockname()])], clock=core.clock)
+    decoder = TelemetryDecoder()
+
+    publisher.publish()
+    publisher.publish()
+
+    assert decoder.decode(receiver.recv(1024))["ruleName"] == 'follow'
+    decoder.decode(receiver.recv(1024))
+    assert decoder.missed == 0
+    assert publisher.summary() == '2 frames, 2 sent, 0 dropped'
+
+    publisher.stop()
+    receiver.close()
@@ -0,0 +1,32 @@
+import pytest
+
+from tracing import LatencyHistogram, LatencyTracer
+
+def test_histogramPercentiles():
+    histogram = LatencyHistogram()
+
+    for _ in range(90):
+        histogram.record(0.010)
+    for _ in range(10):
+        histogram.record(0.200)
+
+    # Percentiles are reported as the bucket's upper bound
+    assert histogram.percentile(50) == pytest.approx(0.010, rel=0.3)
+    assert histogram.percentile(99) == pytest.approx(0.200, rel=0.3)
+
+    histogram.reset()
+    assert histogram.count == 0
+    assert histogram.percentile(50) == 0.0
+
+def test_tracerStages():
+    tracer = LatencyTracer()
+
+    tracer.evaluated(captureTime=1.000, dequeueTime=1.030, evaluateTime=1.031)
+    tracer.sent(captureTime=1.000, evaluateTime=1.031, sendTime=1.032)
+
+    assert tracer.histograms['capture-dequeue'].percentile(50) == pytest.approx(0.030, rel=0.3)
+    assert tracer.histograms['capture-send'].percentile(50) == pytest.approx(0.032, rel=0.3)
+
+    summary = tracer.summary()
+    assert 'capture-send' in summary
+    assert tracer.histograms['capture-send'].count == 0
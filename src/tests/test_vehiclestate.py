@@ -0,0 +1,56 @@
+import math
+
+import pytest
+from dronekit import VehicleMode
+
+from clock import VirtualClock
+from testutils.vehicle import MockVehicle
+from testutils.simulator import SimulatedVehicle
+from vehiclestate import VehicleStateFeed
+
+def test_messagesUpdateState():
+    vehicle = MockVehicle(altitude=2.0)
+    feed = VehicleStateFeed(vehicle)
+    before = feed.state
+
+    vehicle._applyMessage(vehicle.message_factory.global_position_int_encode(0, -353630000, 1491650000, 0, 4500, 0, 0, 0, 9000))
+    vehicle._applyMessage(vehicle.message_factory.attitude_encode(0, 0.0, 0.0, 1.5, 0.0, 0.0, 0.0))
+
+    assert feed.state.lat == pytest.approx(-35.363)
+    assert feed.state.lon == pytest.approx(149.165)
+    assert feed.state.alt == pytest.approx(4.5)
+    assert feed.state.yaw == pytest.approx(1.5)
+
+    # Replaced rather than changed, so a state already read stays consistent
+    assert before.alt == pytest.approx(2.0)
+
+def test_attributesUpdateStateBeforeLaterListeners():
+    vehicle = MockVehicle()
+    feed = VehicleStateFeed(vehicle)
+
+    seen = []
+    vehicle.add_attribute_listener('mode', lambda _, _1, _2: seen.append(feed.state.mode))
+
+    vehicle.armed = True
+    vehicle.mode = VehicleMode('RTL')
+
+    assert feed.state.armed
+    assert seen == ['RTL']
+
+def test_snapshotPollsSimulatedVehicle():
+    clock = VirtualClock()
+    vehicle = SimulatedVehicle(clock=clock)
+    feed = VehicleStateFeed(vehicle, clock)
+
+    vehicle.place(10.0, 0.0, 3.0, math.radians(90))
+    state = feed.snapshot()
+
+    latitude, longitude = vehicle.toGlobal(10.0, 0.0)
+    assert state.lat == pytest.approx(latitude, abs=1e-7)
+    assert state.lon == pytest.approx(longitude, abs=1e-7)
+    assert state.alt == pytest.approx(3.0)
+    assert state.heading == 90
+
+    feed.close()
+    vehicle.place(0.0, 0.0, 0.0)
+    assert feed.snapshot() == state
@@ -0,0 +1,252 @@
+import math
+
+from dronekit import LocationGlobalRelative, Attitude
+from pymavlink import mavutil
+
+from clock import Clock, REAL_CLOCK
+from constants import RADIUS_OF_EARTH, SIM_MAX_SPEED, SIM_CLIMB_RATE, SIM_YAW_SPEED
+from .vehicle import MockVehicle, MockLocations
+
+IGNORE_POSITION_MASK = 0b111
+IGNORE_YAW_RATE_MASK = 0b100000000000
+
+class SimulatedVehicle(MockVehicle):
+    '''
+    A kinematic multicopter, standing in for a dronekit `Vehicle` without needing
+    SITL. It understands the messages `commands.py` sends:
+
+    - SET_POSITION_TARGET_LOCAL_NED, in the body offset or local NED frame
+    - SET_POSITION_TARGET_GLOBAL_INT
+    - MAV_CMD_CONDITION_YAW
+
+    along with takeoff and RTL. It flies towards the latest position target at a fixed speed, while yawing
+    at the commanded rate. There is no inertia or wind.
+
+    The simulation moves forward to the clock's current time whenever the vehicle
+    is read from or sent to, so it keeps up with Core without being stepped. It
+    can also be stepped by hand with `step()`.
+    '''
+
+    north    = 0.0 # m from home
+    east     = 0.0 # m from home
+    altitude = 0.0 # m above home
+    yaw      = 0.0 # radians, clockwise from north
+
+    _target  = None  # (north, east, altitude)
+    _yawRate = 0.0   # radians per second
+    _yawTarget = None # radians, for CONDITION_YAW
+    _lastAdvance = None
+
+    def __init__(self, latitude = -35.363261, longitude = 149.165230, clock: Clock = None):
+        self.clock = clock if clock != None else REAL_CLOCK
+        self.home = (latitude, longitude)
+        self._target = (0.0, 0.0, 0.0)
+        self._lastAdvance = self.clock.now()
+
+        super().__init__(latitude, longitude, 0.0)
+
+    #### Vehicle surface
+
+    @property
+    def location(self) -> MockLocations:
+        self._advance()
+        return self._location
+
+    @location.setter
+    def location(self, value):
+        self._location = value
+
+    @property
+    def attitude(self) -> Attitude:
+        self._advance()
+        return self._attitude
+
+    @attitude.setter
+    def attitude(self, value):
+        self._attitude = value
+
+    @property
+    def heading(self) -> int:
+        self._advance()
+        return int(math.degrees(self.yaw)) % 360
+
+    @heading.setter
+    def heading(self, value):
+        pass
+
+    def simple_takeoff(self, altitude):
+        self._advance()
+
+        if self.armed:
+            self._target = (self.north, self.east, altitude)
+
+    def wait_for_alt(self, altitude, epsilon = 0.1):
+        while abs(self.location.global_relative_frame.alt - altitude) > epsilon:
+            self.clock.sleep(0.1)
+
+    @MockVehicle.mode.setter
+    def mode(self, value):
+        MockVehicle.mode.fset(self, value)
+
+        # Return home and land
+        if self._mode.name == 'RTL':
+            self._advance()
+            self._target = (0.0, 0.0, 0.0)
+            self._yawRate = 0.0
+
+    def send_mavlink(self, message):
+        super().send_mavlink(message)
+
+        self._advance()
+
+        messageType = message.get_type()
+
+        if messageType == 'SET_POSITION_TARGET_LOCAL_NED':
+            self._handleLocalTarget(message)
+        elif messageType == 'SET_POSITION_TARGET_GLOBAL_INT':
+            self._handleGlobalTarget(message)
+        elif messageType == 'COMMAND_LONG' and message.command == mavutil.mavlink.MAV_CMD_CONDITION_YAW:
+            self._handleConditionYaw(message)
+
+    #### Simulation
+
+    def place(self, north: float, east: float, altitude: float, yaw: float = 0.0) -> None:
+        '''
+        Moves the vehicle straight to a position and heading, and holds it there.
+        '''
+
+        self._advance()
+
+        self.north, self.east, self.altitude = north, east, altitude
+        self.yaw = yaw % (2 * math.pi)
+        self._target = (north, east, altitude)
+        self._yawRate = 0.0
+        self._yawTarget = None
+
+        self._updateState()
+
+    def localPosition(self):
+        '''
+        Returns (north, east, altitude) in meters from home.
+        '''
+
+        self._advance()
+        return (self.north, self.east, self.altitude)
+
+    def toGlobal(self, north: float, east: float):
+        '''
+        Converts meters from home to (latitude, longitude).
+        '''
+
+        homeLatitude, homeLongitude = self.home
+
+        latitude = homeLatitude + math.degrees(north / RADIUS_OF_EARTH)
+        longitude = homeLongitude + math.degrees(east / (RADIUS_OF_EARTH * math.cos(math.radians(homeLatitude))))
+
+        return (latitude, longitude)
+
+    def toLocal(self, latitude: float, longitude: float):
+        '''
+        Converts a global coordinate to (north, east) meters from home.
+        '''
+
+        homeLatitude, homeLongitude = self.home
+
+        north = math.radians(latitude - homeLatitude) * RADIUS_OF_EARTH
+        east = math.radians(longitude - homeLongitude) * RADIUS_OF_EARTH * math.cos(math.radians(homeLatitude))
+
+        return (north, east)
+
+    def step(self, dt: float) -> None:
+        '''
+        Moves the simulation forward by `dt` seconds.
+        '''
+
+        if not self.armed:
+            return
+
+        targetNorth, targetEast, targetAltitude = self._target
+
+        # Horizontal, in a straight line at fixed speed
+        dNorth = targetNorth - self.north
+        dEast = targetEast - self.east
+        distance = math.hypot(dNorth, dEast)
+        travel = min(distance, SIM_MAX_SPEED * dt)
+
+        if distance > 0:
+            self.north += dNorth / distance * travel
+            self.east += dEast / distance * travel
+
+        # Vertical
+        dAltitude = targetAltitude - self.altitude
+        climb = min(abs(dAltitude), SIM_CLIMB_RATE * dt)
+        self.altitude += math.copysign(climb, dAltitude)
+
+        # Yaw, either to a fixed heading or at a rate
+        if self._yawTarget != None:
+            difference = (self._yawTarget - self.yaw + math.pi) % (2 * math.pi) - math.pi
+            turn = min(abs(difference), math.radians(SIM_YAW_SPEED) * dt)
+            self.yaw += math.copysign(turn, difference)
+
+            if abs(difference) <= turn:
+                self._yawTarget = None
+        else:
+            self.yaw += self._yawRate * dt
+
+        self.yaw %= 2 * math.pi
+
+        self._updateState()
+
+    def _advance(self) -> None:
+        now = self.clock.now()
+        dt = now - self._lastAdvance
+        self._lastAdvance = now
+
+        if dt > 0:
+            self.step(dt)
+
+    def _updateState(self) -> None:
+        latitude, longitude = self.toGlobal(self.north, self.east)
+
+        self._location.global_relative_frame = LocationGlobalRelative(latitude, longitude, self.altitude)
+        self._attitude = Attitude(0.0, self.yaw if self.yaw <= math.pi else self.yaw - 2 * math.pi, 0.0)
+
+    def _applyYawRate(self, message) -> None:
+        if not message.type_mask & IGNORE_YAW_RATE_MASK:
+            self._yawRate = message.yaw_rate
+            self._yawTarget = None
+
+    def _handleLocalTarget(self, message) -> None:
+        if not message.type_mask & IGNORE_POSITION_MASK:
+            if message.coordinate_frame == mavutil.mavlink.MAV_FRAME_BODY_OFFSET_NED:
+                # x is forwards and y is to the right, relative to the current heading
+                cosYaw = math.cos(self.yaw)
+                sinYaw = math.sin(self.yaw)
+
+                north = self.north + message.x * cosYaw - message.y * sinYaw
+                east = self.east + message.x * sinYaw + message.y * cosYaw
+                self._target = (north, east, self.altitude - message.z)
+
+            elif message.coordinate_frame == mavutil.mavlink.MAV_FRAME_LOCAL_NED:
+                self._target = (message.x, message.y, -message.z)
+
+        self._applyYawRate(message)
+
+    def _handleGlobalTarget(self, message) -> None:
+        if not message.type_mask & IGNORE_POSITION_MASK:
+            north, east = self.toLocal(message.lat_int / 1e7, message.lon_int / 1e7)
+            self._target = (north, east, message.alt)
+
+        self._applyYawRate(message)
+
+    def _handleConditionYaw(self, message) -> None:
+        angle = math.radians(message.param1)
+
+        if message.param4 == 1:
+            # Relative, in the direction of param3
+            direction = -1 if message.param3 < 0 else 1
+            self._yawTarget = (self.yaw + direction * angle) % (2 * math.pi)
+        else:
+            self._yawTarget = angle % (2 * math.pi)
+
+        self._yawRate = 0.0
@@ -1,22 +1,102 @@
+from dronekit import LocationGlobalRelative, VehicleMode, Attitude
+from pymavlink import mavutil
+
+class MockLocations():
+    '''Stands in for `vehicle.location`'''
+
+    def __init__(self, latitude, longitude, altitude):
+        self.global_relative_frame = LocationGlobalRelative(latitude, longitude, altitude)
+
 class MockVehicle():
     '''A mock implementation of the DroneKit vehicle class'''
 
-    _mode = 'GUIDED'
-    _armed = False
-    _listeners = {}
+    def __init__(self, latitude = -35.363261, longitude = 149.165230, altitude = 0.0):
+        self._mode = VehicleMode('GUIDED')
+        self._armed = False
+        self._listeners = {}
+        self._messageListeners = {}
+        self._lastPolled = None
+
+        self.location = MockLocations(latitude, longitude, altitude)
+        self.attitude = Attitude(0.0, 0.0, 0.0)
+        self.heading = 0
+        self.last_heartbeat = 0.0
+        self.is_armable = True
+
+        # Encodes messages without needing a connection
+        self.message_factory = mavutil.mavlink.MAVLink(None)
+        self.messages = []
 
     def add_attribute_listener(self, parameter, fn):
-        listenerList = self._listeners[parameter]
-        if listenerList is None:
-            listenerList = []
+        self._listeners.setdefault(parameter, []).append(fn)
 
-        listenerList.append(fn)
+    def remove_attribute_listener(self, parameter, fn):
+        if fn in self._listeners.get(parameter, []):
+            self._listeners[parameter].remove(fn)
 
     def _applyCallback(self, parameter, value):
-        listenerList = self._listeners[parameter]
-        if listenerList:
-            for l in listenerList:
-                l(parameter, value)
+        # Same arguments as dronekit passes to attribute listeners
+        for l in list(self._listeners.get(parameter, [])):
+            l(self, parameter, value)
+
+    def add_message_listener(self, name, fn):
+        self._messageListeners.setdefault(name, []).append(fn)
+
+        # So that the new listener hears the current state on the next poll
+        self._lastPolled = None
+
+    def remove_message_listener(self, name, fn):
+        if fn in self._messageListeners.get(name, []):
+            self._messageListeners[name].remove(fn)
+
+    def _applyMessage(self, message):
+        # Same arguments as dronekit passes to message listeners
+        name = message.get_type()
+        for l in list(self._messageListeners.get(name, [])):
+            l(self, name, message)
+
+    def poll(self):
+        '''
+        Sends the vehicle's current position and attitude to message listeners,
+        as the messages a real vehicle would stream. Nothing is sent while they
+        are unchanged since the last poll.
+        '''
+
+        if not self._messageListeners:
+            return
+
+        frame = self.location.global_relative_frame
+        attitude = self.attitude
+        heading = int(self.heading or 0)
+
+        polled = (frame.lat, frame.lon, frame.alt, attitude.roll, attitude.pitch, attitude.yaw, heading)
+        if polled == self._lastPolled:
+            return
+        self._lastPolled = polled
+
+        self._applyMessage(self.message_factory.global_position_int_encode(
+            0, int(round(frame.lat * 1e7)), int(round(frame.lon * 1e7)), 0, int(round(frame.alt * 1000)), 0, 0, 0, heading * 100))
+        self._applyMessage(self.message_factory.attitude_encode(0, attitude.roll, attitude.pitch, attitude.yaw, 0.0, 0.0, 0.0))
+        self._applyMessage(self.message_factory.vfr_hud_encode(0.0, 0.0, heading, 0, frame.alt, 0.0))
+
+    def send_mavlink(self, message):
+        # Messages may be reused by the sender, so keep a copy of what was sent
+        self.messages.append(message.to_dict())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def simple_takeoff(self, altitude):
+        pass
+
+    def wait_for_alt(self, altitude):
+        pass
+
+    def disarm(self):
+        self.armed = False
 
     @property
     def armed(self):
@@ -33,5 +113,5 @@ class MockVehicle():
 
     @mode.setter
     def mode(self, value):
-        self._mode = value
-        self._applyCallback('mode', value)
\ No newline at end of file
+        self._mode = value if isinstance(value, VehicleMode) else VehicleMode(value)
+        self._applyCallback('mode', self._mode)
@@ -0,0 +1,87 @@
+from bisect import bisect_left
+
+# Upper bounds of each histogram bucket in seconds, spaced logarithmically
+# from 0.1 ms to ~10 s. Anything larger lands in a final overflow bucket.
+BUCKETS = [0.0001 * (10 ** (i / 10.0)) for i in range(51)]
+
+class LatencyHistogram:
+    '''
+    Counts latency samples into fixed, logarithmically spaced buckets. Recording
+    a sample doesn't allocate, and percentiles are accurate to within a bucket (~25%).
+    '''
+
+    count = 0
+
+    def __init__(self):
+        self._counts = [0] * (len(BUCKETS) + 1)
+
+    def record(self, seconds: float) -> None:
+        self._counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+
+    def percentile(self, percent: float) -> float:
+        '''
+        Upper bound of the bucket holding the given percentile, in seconds.
+        '''
+
+        if self.count == 0:
+            return 0.0
+
+        target = self.count * percent / 100.0
+        total = 0
+        for index, bucketCount in enumerate(self._counts):
+            total += bucketCount
+            if total >= target:
+                return BUCKETS[index] if index < len(BUCKETS) else float('inf')
+
+        return float('inf')
+
+    def reset(self) -> None:
+        for index in range(len(self._counts)):
+            self._counts[index] = 0
+        self.count = 0
+
+class LatencyTracer:
+    '''
+    Tracks how old a frame is at each point between the camera and a MAVLink
+    command leaving for the vehicle. All times are from Core's clock, which in
+    real time is `time.monotonic()`, the same clock depthai timestamps frames with.
+
+    - capture:  when the device captured the frame
+    - dequeue:  when the host took the frame off the device queue
+    - evaluate: when the rules finished evaluating the frame
+    - send:     when the resulting command was sent
+    '''
+
+    STAGES = ['capture-dequeue', 'dequeue-evaluate', 'evaluate-send', 'capture-send']
+
+    def __init__(self):
+        self.histograms = { stage: LatencyHistogram() for stage in self.STAGES }
+
+    def evaluated(self, captureTime: float, dequeueTime: float, evaluateTime: float) -> None:
+        self.histograms['capture-dequeue'].record(dequeueTime - captureTime)
+        self.histograms['dequeue-evaluate'].record(evaluateTime - dequeueTime)
+
+    def sent(self, captureTime: float, evaluateTime: float, sendTime: float) -> None:
+        self.histograms['evaluate-send'].record(sendTime - evaluateTime)
+        self.histograms['capture-send'].record(sendTime - captureTime)
+
+    def summary(self, reset = True) -> str:
+        '''
+        p50/p95/p99 for each stage in ms, as one line suitable for logging.
+        '''
+
+        parts = []
+        for stage in self.STAGES:
+            histogram = self.histograms[stage]
+            parts.append('{} p50 {:.1f} p95 {:.1f} p99 {:.1f} (n={})'.format(
+                stage,
+                histogram.percentile(50) * 1000.0,
+                histogram.percentile(95) * 1000.0,
+                histogram.percentile(99) * 1000.0,
+                histogram.count))
+
+            if reset:
+                histogram.reset()
+
+        return ', '.join(parts)
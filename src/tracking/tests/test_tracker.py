@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from camera.detection import Detection, DetectionBatch
+from tracking.tracker import Tracker, Pose
+
+def batchOf(*positions):
+    return DetectionBatch.fromDetections([Detection(x, 0.0, z, 1.0, 30) for x, z in positions], 0.0, 30)
+
+def test_confirmsBeforeTargeting():
+    tracker = Tracker(confirmHits=2)
+
+    tracker.update(batchOf((0.0, 5.0)), 0.0)
+    assert tracker.predict(0.0).target == None
+
+    tracker.update(batchOf((0.0, 5.0)), 0.1)
+    assert tracker.predict(0.1).target != None
+
+def test_predictsAlongVelocity():
+    tracker = Tracker()
+
+    # Walking away at 1 m/s
+    for frame in range(30):
+        time = frame / 30
+        tracker.update(batchOf((0.5, 4.0 + time)), time)
+
+    target = tracker.predict(29 / 30 + 0.5).target
+
+    assert target.vz == pytest.approx(1.0, abs=0.05)
+    assert target.z == pytest.approx(4.0 + 29 / 30 + 0.5, abs=0.05)
+    assert target.x == pytest.approx(0.5, abs=0.05)
+
+def test_keepsTargetWhenSomeoneCloserAppears():
+    tracker = Tracker()
+
+    for frame in range(5):
+        tracker.update(batchOf((1.0, 5.0)), frame / 30)
+    target = tracker.predict(5 / 30).target.id
+
+    # A second person walks in closer, listed first
+    for frame in range(5, 10):
+        tracker.update(batchOf((-1.0, 3.0), (1.0, 5.0)), frame / 30)
+    tracks = tracker.predict(10 / 30)
+
+    assert tracks.target.id == target
+    assert tracks.target.z == pytest.approx(5.0, abs=0.05)
+    assert len(tracks.ids) == 2
+
+def test_dropsTracksAfterMaxAge():
+    tracker = Tracker(maxAge=0.5)
+
+    for frame in range(5):
+        tracker.update(batchOf((0.0, 5.0)), frame / 30)
+    target = tracker.predict(0.2).target.id
+
+    tracker.update(batchOf(), 1.0)
+    assert len(tracker) == 0
+    assert tracker.predict(1.0).target == None
+
+    # Someone seen again is a new track
+    tracker.update(batchOf((0.0, 5.0)), 1.1)
+    tracker.update(batchOf((0.0, 5.0)), 1.2)
+    assert tracker.predict(1.2).target.id != target
+
+def test_gatesFarDetections():
+    tracker = Tracker()
+
+    for frame in range(5):
+        tracker.update(batchOf((0.0, 5.0)), frame / 30)
+
+    tracker.update(batchOf((4.0, 9.0)), 5 / 30)
+
+    assert len(tracker) == 2
+    assert np.array_equal(tracker.hits, [5, 1])
+
+def test_vehicleMovementIsNotPersonMovement():
+    tracker = Tracker()
+
+    # Someone standing 5 m north, while the vehicle turns to face east and moves north
+    for frame in range(30):
+        heading = np.radians(90) * frame / 29
+        north = frame / 29
+
+        x = -(5.0 - north) * np.sin(heading)
+        z = (5.0 - north) * np.cos(heading)
+        tracker.update(batchOf((x, z)), frame / 30, Pose(north, 0.0, heading))
+
+    target = tracker.predict(2.0, Pose(1.0, 0.0, np.radians(90))).target
+
+    assert len(tracker) == 1
+    assert target.x == pytest.approx(-4.0, abs=0.05)
+    assert target.z == pytest.approx(0.0, abs=0.05)
+    assert target.vx == pytest.approx(0.0, abs=0.05)
@@ -0,0 +1,317 @@
+'''
+Tracks people across frames, so that rules act on one person consistently and
+on where they are now rather than where they were when the frame was captured.
+
+Positions given to and from the tracker are relative to the camera, as for
+detections: x is to the right and z is forwards, in meters. Internally tracks
+are kept as north and east of a fixed origin, using the vehicle's pose, so that
+the vehicle moving or yawing doesn't look like everyone else moving.
+'''
+
+from typing import NamedTuple, Optional
+import math
+
+import numpy as np
+
+from camera.detection import DetectionBatch
+from constants import RADIUS_OF_EARTH
+from constants import TRACKER_GATE, TRACKER_MAX_AGE, TRACKER_CONFIRM_HITS, TRACKER_LOCK_TIMEOUT, TRACKER_ACCEL_NOISE, TRACKER_MEASUREMENT_NOISE
+
+INITIAL_VELOCITY_VARIANCE = 4.0 # (m/s)^2, people walk at up to about 2 m/s
+
+# Rows of each track's filter state, with columns for north and east
+POSITION          = 0
+VELOCITY          = 1
+POSITION_VARIANCE = 2
+COVARIANCE        = 3 # between position and velocity
+VELOCITY_VARIANCE = 4
+
+NO_INDICES = np.zeros(0, dtype=np.int64)
+
+class Pose(NamedTuple):
+    north: float   # m from the origin
+    east: float    # m from the origin
+    heading: float # radians clockwise from north
+
+    @staticmethod
+    def fromLocation(origin, latitude: float, longitude: float, heading: float) -> 'Pose':
+        '''
+        The pose at a global coordinate, relative to an `origin` of (latitude, longitude)
+        close enough to treat the earth as flat.
+        '''
+
+        originLatitude, originLongitude = origin
+        north = math.radians(latitude - originLatitude) * RADIUS_OF_EARTH
+        east = math.radians(longitude - originLongitude) * RADIUS_OF_EARTH * math.cos(math.radians(originLatitude))
+
+        return Pose(north, east, heading)
+
+ORIGIN_POSE = Pose(0.0, 0.0, 0.0)
+
+class Target(NamedTuple):
+    id: int
+    x: float  # m
+    z: float  # m
+    vx: float # m/s, the person's own velocity in camera axes
+    vz: float # m/s
+
+class TrackSet(NamedTuple):
+    time: float               # time the tracks are predicted to
+    ids: np.ndarray           # (N,) confirmed track ids
+    positions: np.ndarray     # (N, 2) x, z in the camera frame
+    velocities: np.ndarray    # (N, 2) vx, vz in camera axes
+    target: Optional[Target]  # the locked on track, if any
+
+EMPTY_TRACKS = TrackSet(0.0, np.zeros(0, dtype=np.int64), np.zeros((0, 2)), np.zeros((0, 2)), None)
+
+class Tracker:
+    '''
+    A constant velocity Kalman filter per person, with every filter stored in
+    shared arrays so that each step is a handful of NumPy operations however
+    many people are in view.
+
+    North and east are filtered independently. With the same model and noise
+    on both, they never become correlated, so each axis of each track only needs
+    a 2x2 covariance of position and velocity.
+
+    Detections are matched to tracks by nearest Mahalanobis distance within a
+    gate. A track is confirmed once it has been seen `confirmHits` times, and is
+    dropped once it has not been seen for `maxAge` seconds.
+
+    The target is the closest confirmed track, and stays locked on even if
+    someone else comes closer. It only moves on once the target is dropped, or
+    has not been seen for `lockTimeout` seconds while another track has.
+    '''
+
+    targetId = -1
+
+    def __init__(self, gate: float = TRACKER_GATE, maxAge: float = TRACKER_MAX_AGE, confirmHits: int = TRACKER_CONFIRM_HITS,
+                 lockTimeout: float = TRACKER_LOCK_TIMEOUT, accelNoise: float = TRACKER_ACCEL_NOISE,
+                 measurementNoise: float = TRACKER_MEASUREMENT_NOISE):
+        self.gate = gate
+        self.maxAge = maxAge
+        self.confirmHits = confirmHits
+        self.lockTimeout = lockTimeout
+        self.accelVariance = accelNoise ** 2
+        self.measurementVariance = measurementNoise ** 2
+
+        self.reset()
+
+    def reset(self) -> None:
+        self.time = None
+        self.pose = ORIGIN_POSE
+        self.nextId = 0
+        self.targetId = -1
+
+        # Each filter is a (5, 2) block of the rows below, for the x and z axes
+        self.filters = np.zeros((0, 5, 2))
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.lastSeen = np.zeros(0)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def positions(self) -> np.ndarray:
+        return self.filters[:, POSITION]
+
+    def velocities(self) -> np.ndarray:
+        return self.filters[:, VELOCITY]
+
+    def update(self, detections: DetectionBatch, time: float, pose: Pose = ORIGIN_POSE) -> None:
+        '''
+        Adds the detections from a frame captured at `time`, while the vehicle
+        was at `pose`.
+        '''
+
+        if self.time != None and len(self.ids) > 0:
+            self._propagate(max(0.0, time - self.time))
+        self.time = time if self.time == None else max(self.time, time)
+        self.pose = pose
+
+        if len(self.ids) == 0 and len(detections) == 0:
+            return
+
+        # From the camera frame to north and east of the origin
+        records = detections.records
+        cos, sin = math.cos(pose.heading), math.sin(pose.heading)
+        measurements = np.empty((len(records), 2))
+        measurements[:, 0] = records['z'] * cos - records['x'] * sin + pose.north
+        measurements[:, 1] = records['z'] * sin + records['x'] * cos + pose.east
+
+        trackIndices, detectionIndices = self._associate(measurements)
+
+        if len(trackIndices) > 0:
+            self._correct(trackIndices, measurements[detectionIndices])
+            self.hits[trackIndices] += 1
+            self.lastSeen[trackIndices] = time
+
+        # Forget anyone not seen for a while
+        alive = self.time - self.lastSeen <= self.maxAge
+        if not alive.all():
+            self._keep(alive)
+
+        if len(detectionIndices) < len(measurements):
+            unmatched = np.ones(len(measurements), dtype=bool)
+            unmatched[detectionIndices] = False
+            self._add(measurements[unmatched], time)
+
+        self._lockTarget()
+
+    def predict(self, time: float, pose: Pose = ORIGIN_POSE) -> TrackSet:
+        '''
+        Where the confirmed tracks will be at `time`, relative to the camera with
+        the vehicle at `pose`. This doesn't change any state.
+        '''
+
+        if len(self.ids) == 0:
+            return EMPTY_TRACKS._replace(time=time)
+
+        dt = max(0.0, time - self.time)
+        filters = self.filters
+        ids = self.ids
+
+        confirmed = self.hits >= self.confirmHits
+        if not confirmed.all():
+            filters = filters[confirmed]
+            ids = ids[confirmed]
+
+        # From north and east of the origin back to the camera frame
+        cos, sin = math.cos(pose.heading), math.sin(pose.heading)
+        rotation = np.array([[-sin, cos], [cos, sin]])
+        offset = np.array([pose.north, pose.east])
+
+        velocities = filters[:, VELOCITY] @ rotation
+        positions = (filters[:, POSITION] + filters[:, VELOCITY] * dt - offset) @ rotation
+
+        target = None
+        if self.targetId != -1:
+            index = int((ids == self.targetId).argmax())
+            (x, z), (vx, vz) = positions[index].tolist(), velocities[index].tolist()
+            target = Target(self.targetId, x, z, vx, vz)
+
+        return TrackSet(time, ids, positions, velocities, target)
+
+    def _propagate(self, dt: float) -> None:
+        # P' = F P F^T + Q for a constant velocity model is linear in the rows of
+        # each filter, so moving every filter forward is one matrix product
+        q = self.accelVariance
+        transition = np.array([
+            [1, dt, 0, 0,      0        ],
+            [0, 1,  0, 0,      0        ],
+            [0, 0,  1, 2 * dt, dt**2    ],
+            [0, 0,  0, 1,      dt       ],
+            [0, 0,  0, 0,      1        ],
+        ])
+        noise = np.array([[0], [0], [q * dt**4 / 4], [q * dt**3 / 2], [q * dt**2]])
+
+        self.filters = transition @ self.filters + noise
+
+    def _associate(self, measurements: np.ndarray):
+        '''
+        Greedily pairs tracks and detections, closest first, ignoring any pair
+        outside the gate. Confirmed tracks are matched before new ones, so that
+        a new track started by one noisy detection can't take over from the
+        track it came from. Returns matched track and detection indices.
+        '''
+
+        if len(self.ids) == 0 or len(measurements) == 0:
+            return (NO_INDICES, NO_INDICES)
+
+        innovations = measurements[np.newaxis, :, :] - self.filters[:, np.newaxis, POSITION]
+        variances = self.filters[:, np.newaxis, POSITION_VARIANCE] + self.measurementVariance
+        distances = (innovations**2 / variances).sum(axis=2)
+
+        candidates = np.flatnonzero(distances <= self.gate)
+        if len(candidates) <= 1:
+            return divmod(candidates, len(measurements))
+
+        trackIndices = []
+        detectionIndices = []
+        usedTracks = set()
+        usedDetections = set()
+
+        # Every confirmed pair sorts before every unconfirmed one
+        priorities = distances + np.where(self.hits >= self.confirmHits, 0.0, self.gate)[:, np.newaxis]
+
+        for flat in candidates[priorities.ravel()[candidates].argsort(kind='stable')].tolist():
+            track, detection = divmod(flat, len(measurements))
+
+            if track in usedTracks or detection in usedDetections:
+                continue
+
+            usedTracks.add(track)
+            usedDetections.add(detection)
+            trackIndices.append(track)
+            detectionIndices.append(detection)
+
+        return (np.array(trackIndices, dtype=np.int64), np.array(detectionIndices, dtype=np.int64))
+
+    def _correct(self, indices: np.ndarray, measurements: np.ndarray) -> None:
+        # Kalman update where only position is measured, per axis. When every
+        # track was matched, update in place rather than gathering and scattering
+        inPlace = len(indices) == len(self.filters)
+        if inPlace:
+            filters = self.filters
+            ordered = np.empty_like(measurements)
+            ordered[indices] = measurements
+            measurements = ordered
+        else:
+            filters = self.filters[indices]
+
+        innovation = measurements - filters[:, POSITION]
+        innovationVariance = filters[:, POSITION_VARIANCE] + self.measurementVariance
+        positionGain = filters[:, POSITION_VARIANCE] / innovationVariance
+        velocityGain = filters[:, COVARIANCE] / innovationVariance
+
+        filters[:, POSITION] += positionGain * innovation
+        filters[:, VELOCITY] += velocityGain * innovation
+        filters[:, VELOCITY_VARIANCE] -= velocityGain * filters[:, COVARIANCE]
+        filters[:, POSITION_VARIANCE:COVARIANCE + 1] *= (1 - positionGain)[:, np.newaxis, :]
+
+        if not inPlace:
+            self.filters[indices] = filters
+
+    def _keep(self, mask: np.ndarray) -> None:
+        self.filters = self.filters[mask]
+        self.ids = self.ids[mask]
+        self.hits = self.hits[mask]
+        self.lastSeen = self.lastSeen[mask]
+
+    def _add(self, measurements: np.ndarray, time: float) -> None:
+        count = len(measurements)
+
+        filters = np.zeros((count, 5, 2))
+        filters[:, POSITION] = measurements
+        filters[:, POSITION_VARIANCE] = self.measurementVariance
+        filters[:, VELOCITY_VARIANCE] = INITIAL_VELOCITY_VARIANCE
+
+        self.filters = np.concatenate((self.filters, filters))
+        self.ids = np.concatenate((self.ids, np.arange(self.nextId, self.nextId + count)))
+        self.hits = np.concatenate((self.hits, np.ones(count, dtype=np.int64)))
+        self.lastSeen = np.concatenate((self.lastSeen, np.full(count, time)))
+
+        self.nextId += count
+
+    def _lockTarget(self) -> None:
+        confirmed = self.hits >= self.confirmHits
+        candidates = confirmed
+
+        # Stay on the current target for as long as it is tracked, unless it has
+        # gone unseen while someone else is in view
+        isTarget = confirmed & (self.ids == self.targetId)
+        if self.targetId != -1 and isTarget.any():
+            if self.time - self.lastSeen[isTarget][0] <= self.lockTimeout:
+                return
+
+            candidates = confirmed & (self.lastSeen == self.time)
+            if not candidates.any():
+                return
+
+        if not candidates.any():
+            self.targetId = -1
+            return
+
+        offsets = self.filters[:, POSITION] - np.array([self.pose.north, self.pose.east])
+        ranges = np.where(candidates, (offsets**2).sum(axis=1), np.inf)
+        self.targetId = int(self.ids[ranges.argmin()])
@@ -0,0 +1,97 @@
+'''
+A consistent view of the vehicle, read once per tick.
+
+dronekit builds new location and attitude objects on every attribute read, and
+each read may see a different message from the one before. Instead, listeners
+fold each incoming message into an immutable `VehicleState`, and swap in the new
+state as a single reference assignment. Readers take `state` once and use it
+for the whole tick, with no locking.
+'''
+
+from typing import NamedTuple
+
+from clock import Clock, REAL_CLOCK
+
+class VehicleState(NamedTuple):
+    time: float    = 0.0   # clock time of the latest message
+    lat: float     = 0.0   # degrees
+    lon: float     = 0.0   # degrees
+    alt: float     = 0.0   # m above home
+    yaw: float     = 0.0   # radians, clockwise from north
+    heading: int   = 0     # degrees
+    armed: bool    = False
+    mode: str      = ''
+
+    # `lat`, `lon` and `alt` are named as on dronekit's LocationGlobalRelative,
+    # so that a state can be used wherever a global relative frame is
+
+class VehicleStateFeed:
+    '''
+    Keeps `state` up to date from a dronekit vehicle's MAVLink messages:
+
+    - GLOBAL_POSITION_INT for position and altitude
+    - ATTITUDE for yaw
+    - VFR_HUD for heading
+
+    and its `armed` and `mode` attributes. Listeners run on dronekit's receive
+    thread, and are the only writers.
+
+    Create the feed before adding other listeners for `armed` or `mode`, as
+    dronekit calls listeners in the order they were added. Those listeners will
+    then see the new value in `state` too.
+    '''
+
+    state: VehicleState = VehicleState()
+
+    def __init__(self, vehicle, clock: Clock = None):
+        self.vehicle = vehicle
+        self.clock = clock if clock != None else REAL_CLOCK
+
+        # Until the first messages arrive
+        frame = vehicle.location.global_relative_frame
+        self.state = VehicleState(
+            self.clock.now(), frame.lat or 0.0, frame.lon or 0.0, frame.alt or 0.0,
+            vehicle.attitude.yaw or 0.0, int(vehicle.heading or 0), bool(vehicle.armed),
+            vehicle.mode.name if vehicle.mode != None else '')
+
+        vehicle.add_message_listener('GLOBAL_POSITION_INT', self._onPosition)
+        vehicle.add_message_listener('ATTITUDE', self._onAttitude)
+        vehicle.add_message_listener('VFR_HUD', self._onHud)
+        vehicle.add_attribute_listener('armed', self._onArmed)
+        vehicle.add_attribute_listener('mode', self._onMode)
+
+    def snapshot(self) -> VehicleState:
+        '''
+        The latest state. Vehicles without a receive thread, such as those in
+        `testutils`, are polled for new messages first.
+        '''
+
+        poll = getattr(self.vehicle, 'poll', None)
+        if poll != None:
+            poll()
+
+        return self.state
+
+    def close(self) -> None:
+        self.vehicle.remove_message_listener('GLOBAL_POSITION_INT', self._onPosition)
+        self.vehicle.remove_message_listener('ATTITUDE', self._onAttitude)
+        self.vehicle.remove_message_listener('VFR_HUD', self._onHud)
+        self.vehicle.remove_attribute_listener('armed', self._onArmed)
+        self.vehicle.remove_attribute_listener('mode', self._onMode)
+
+    #### Listeners
+
+    def _onPosition(self, _, _1, message) -> None:
+        self.state = self.state._replace(time=self.clock.now(), lat=message.lat / 1e7, lon=message.lon / 1e7, alt=message.relative_alt / 1000.0)
+
+    def _onAttitude(self, _, _1, message) -> None:
+        self.state = self.state._replace(time=self.clock.now(), yaw=message.yaw)
+
+    def _onHud(self, _, _1, message) -> None:
+        self.state = self.state._replace(time=self.clock.now(), heading=message.heading)
+
+    def _onArmed(self, _, _1, armed) -> None:
+        self.state = self.state._replace(armed=bool(armed))
+
+    def _onMode(self, _, _1, mode) -> None:
+        self.state = self.state._replace(mode=mode.name)
@@ -1,7 +1,6 @@
 import pytest
 import time
 import threading
-import json
 
 from typing import Tuple
 
@@ -15,13 +14,17 @@ sys.path.insert(0, './src')
 
 from core import Core, ExecutionState
 from camera.mock import MockCamera
+from clock import Clock, AcceleratedClock
 from .uiconnection import UIConnection
 
 ACTIVE_THREADS = []
 
+def pytest_addoption(parser):
+    parser.addoption('--speedup', type=float, default=1, help='Run SITL, and the clock used by Core, this many times faster than real time')
+
 @pytest.fixture
-def environment():
-    [core, vehicle, camera, sitl, ui] = prepareForTest()
+def environment(request):
+    [core, vehicle, camera, sitl, ui] = prepareForTest(speedup=request.config.getoption('--speedup'))
     yield (vehicle, camera, core)
     shutdownAfterTest(sitl, core, camera, ui)
 
@@ -35,7 +38,7 @@ def ui_thread(ui: UIConnection, core: Core, vehicle: Vehicle, camera: MockCamera
 
     # On startup, send reset message
     resetMessage = { "type": "reset" }
-    ui.send(json.dumps(resetMessage))
+    ui.send(resetMessage)
 
     while ui.active():
         # generate json blob of data to send
@@ -78,23 +81,27 @@ def ui_thread(ui: UIConnection, core: Core, vehicle: Vehicle, camera: MockCamera
 
     # On shutdown, send reset message
     resetMessage = { "type": "reset" }
-    ui.send(json.dumps(resetMessage))
+    ui.send(resetMessage)
 
     print('stopped ui thread')
 
-def prepareForTest(timeout = True, verbose=False) -> Tuple[Core, Vehicle, MockCamera, SITL, UIConnection]:
+def prepareForTest(timeout = True, verbose=False, speedup=1) -> Tuple[Core, Vehicle, MockCamera, SITL, UIConnection]:
     '''
     Prepares the SITL environment for a test.
 
-    Should be called from a fixture
+    Should be called from a fixture. With a `speedup`, SITL and Core's clock both
+    run that many times faster than real time. Tests should then wait with
+    `core.clock.sleep()` rather than `time.sleep()`.
     '''
 
     print('start fixture')
 
+    clock = AcceleratedClock(speedup) if speedup != 1 else Clock()
+
     HOME = '-35.363261,149.165230,584,353'
 
     sitl = SITL(path=os.path.abspath('./.dronekit/arducopter'), defaults_filepath=os.path.abspath('./.dronekit/copter-hexa.parm'))
-    sitl_args = ['--model', 'hexa']
+    sitl_args = ['--model', 'hexa', '--speedup', str(speedup)]
     sitl.launch(sitl_args, await_ready=True, restart=False, verbose=verbose)
 
     connection_string = sitl.connection_string()
@@ -102,9 +109,9 @@ def prepareForTest(timeout = True, verbose=False) -> Tuple[Core, Vehicle, MockCa
     print('connecting to ' + connection_string)
 
     vehicle = connect(connection_string, wait_ready=True, rate=10)
-    camera = MockCamera(vehicle)
+    camera = MockCamera(vehicle, clock)
 
-    core = Core(vehicle, camera)
+    core = Core(vehicle, camera, clock)
     thread = threading.Thread(target=core_thread, args=(core,))
     thread.start()
 
@@ -119,7 +126,7 @@ def prepareForTest(timeout = True, verbose=False) -> Tuple[Core, Vehicle, MockCa
     print('init done')
 
     # Wait until the virtual drone hits the home position
-    start = time.time()
+    start = clock.now()
     while True:
         # -35.363261 149.1652299
         location = vehicle.location.global_relative_frame
@@ -128,11 +135,11 @@ def prepareForTest(timeout = True, verbose=False) -> Tuple[Core, Vehicle, MockCa
         if location.lat == -35.363261 and location.lon == 149.1652299:
             break
 
-        if timeout and time.time() - start > 10:
+        if timeout and clock.now() - start > 10:
             core.stop()
             raise ValueError('timeout on gps initial position exceeded')
 
-        time.sleep(1)
+        clock.sleep(1)
 
     # Setup initial state to get the drone "flying"
 
@@ -141,17 +148,17 @@ def prepareForTest(timeout = True, verbose=False) -> Tuple[Core, Vehicle, MockCa
 
     print('waiting for vehicle start')
 
-    start = time.time()
+    start = clock.now()
     while True:
         if core.state == ExecutionState.Running:
             print('started')
             break
 
-        if timeout and time.time() - start > 60:
+        if timeout and clock.now() - start > 60:
             core.stop()
             raise ValueError('timeout on takeoff exceeded')
 
-        time.sleep(1)
+        clock.sleep(1)
 
     return [core, vehicle, camera, sitl, ui]
 
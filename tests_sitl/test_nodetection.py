@@ -1,12 +1,11 @@
 from .utils import headingDiff, gpsDistance, Environment
-import time
 
 def test_drone_does_not_rotate(environment: Environment):
-    vehicle, _, _ = environment
+    vehicle, _, core = environment
 
     heading = vehicle.heading
 
-    time.sleep(5)
+    core.clock.sleep(5)
 
     difference = headingDiff(heading, vehicle.heading)
     print(difference)
@@ -14,11 +13,11 @@ def test_drone_does_not_rotate(environment: Environment):
     assert abs(difference) < 3
 
 def test_drone_does_not_drift(environment: Environment):
-    vehicle, _, _ = environment
+    vehicle, _, core = environment
 
     location1 = vehicle.location.global_frame
 
-    time.sleep(5)
+    core.clock.sleep(5)
 
     location2 = vehicle.location.global_frame
 
@@ -4,46 +4,85 @@ import time
 import threading
 import json
 
-def UIThread(connection):
-    connection.run()
+UI_MAX_PENDING = 16 # message types buffered per client, beyond which the oldest type is dropped
+
+class UIClient:
+    '''
+    One connected visualiser. Holds the latest message of each type not yet
+    sent to it, so a slow client gets the newest state rather than a backlog.
+    '''
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self.pending = {}
+        self.ready = asyncio.Event()
+
+    def queue(self, type: str, message: str):
+        # Re-inserted, so that messages are sent in the order they were last updated
+        self.pending.pop(type, None)
+        self.pending[type] = message
+
+        if len(self.pending) > UI_MAX_PENDING:
+            del self.pending[next(iter(self.pending))]
+
+        self.ready.set()
 
 class UIConnection:
+    '''
+    Serves the visualiser over a WebSocket, from its own thread running an
+    asyncio loop. Any thread may `send()` a message, which is handed to that
+    loop and pushed to every connected client straight away.
 
-    _sendQueue = []
-    _lock = asyncio.Lock()
-    _active = False
+    Messages are coalesced by their "type", keeping only the latest of each.
+    The latest of each type is also sent to clients as they connect.
+    '''
 
     _onDataCallback = None
 
     def __init__(self):
-        thread = threading.Thread(target=UIThread, args=(self,))
-        thread.start()
-
         self._active = True
+        self._clients = set()
+        self._latest = {}
+        self._loop = None
+        self._ready = threading.Event()
 
-    async def msgHandler(self, websocket, path):
-        sendTask = asyncio.create_task(self.sendHandler(websocket, path))
-        receiveTask = asyncio.create_task(self.receiveHandler(websocket, path))
+        self._thread = threading.Thread(target=self.run)
+        self._thread.start()
+        self._ready.wait(5)
 
-        await asyncio.wait([sendTask, receiveTask], return_when=asyncio.FIRST_COMPLETED)
+    async def msgHandler(self, websocket, path = None):
+        client = UIClient(websocket)
 
-    async def sendHandler(self, websocket, _):
-        while True:
-            await asyncio.sleep(0.05)
+        for type, message in self._latest.items():
+            client.queue(type, message)
+
+        self._clients.add(client)
 
-            if len(self._sendQueue) == 0:
-                continue
+        sendTask = asyncio.create_task(self.sendHandler(client))
+        receiveTask = asyncio.create_task(self.receiveHandler(websocket))
 
-            message = '\n'.join(self._sendQueue)
+        try:
+            await asyncio.wait([sendTask, receiveTask], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            self._clients.discard(client)
+            sendTask.cancel()
+            receiveTask.cancel()
+
+    async def sendHandler(self, client: UIClient):
+        while True:
+            await client.ready.wait()
+            client.ready.clear()
+
+            message = '\n'.join(client.pending.values())
+            client.pending.clear()
 
             try:
-                await websocket.send(message)
-            except websockets.exceptions.ConnectionClosedOK:
+                await client.websocket.send(message)
+            except websockets.exceptions.ConnectionClosed:
                 print('connection closed during send')
+                return
 
-            self._sendQueue = []
-
-    async def receiveHandler(self, websocket, _):
+    async def receiveHandler(self, websocket):
         async for message in websocket:
             await self.handleMessage(message)
 
@@ -61,24 +100,49 @@ class UIConnection:
                 print(e)
 
     async def main(self):
-        self.stop_event = threading.Event()
-        stop = asyncio.get_event_loop().run_in_executor(None, self.stop_event.wait)
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
 
-        async with websockets.serve(lambda websocket, path: self.msgHandler(websocket, path), '127.0.0.1', 5678):
-            await stop
+        async with websockets.serve(self.msgHandler, '127.0.0.1', 5678):
+            self._ready.set()
+            await self._stop.wait()
 
     def run(self):
         asyncio.run(self.main())
 
     def stop(self):
-        self.stop_event.set()
         self._active = False
 
+        if self._loop != None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+            self._thread.join(5)
+
     def active(self):
         return self._active
 
-    def send(self, data):
-        self._sendQueue.append(json.dumps(data))
+    def send(self, data: dict):
+        '''
+        Sends a message to every client. Safe to call from any thread.
+        '''
+
+        if self._loop == None or self._loop.is_closed():
+            return
+
+        message = json.dumps(data)
+
+        try:
+            self._loop.call_soon_threadsafe(self._broadcast, data["type"], message)
+        except RuntimeError:
+            # Stopped since checking
+            pass
+
+    def _broadcast(self, type: str, message: str):
+        # Runs on the event loop, so needs no locking
+        self._latest.pop(type, None)
+        self._latest[type] = message
+
+        for client in self._clients:
+            client.queue(type, message)
 
     def setOnDataCallback(self, callback):
         self._onDataCallback = callback
@@ -92,4 +156,4 @@ if __name__ == '__main__':
         except:
             break
 
-    connection.stop()
\ No newline at end of file
+    connection.stop()
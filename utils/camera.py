@@ -1,39 +1,56 @@
 import sys
 import os.path
-sys.path.append(
-    os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir)))
 
-sys.path.insert(0, './src')
+# Import from src/ the same way its modules import each other. This replaces
+# utils/ on the path, as utils/camera.py would otherwise shadow src/camera.
+sys.path[0] = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir, 'src'))
 
-from src.camera.yolocam import YoloCamera
+from recording.overlay import drawOverlay
+import argparse
 import cv2
 
 EXIT = False
 HAS_FRAME = False
 FRAME = None
+SNAPSHOT = None
 
 camera = None
 
-def callback(detections, frame):
+def callback(snapshot, frame):
     global EXIT
     global FRAME
+    global SNAPSHOT
     global HAS_FRAME
 
-    print(str(camera.closestDetection().z) + ', confidence: ' + \
-          str(camera.closestDetection().confidence) if len(detections) > 0 else 'no detection')
+    closest = snapshot.closest
+    print(str(closest.z) + ', confidence: ' + \
+          str(closest.confidence) if closest != None else 'no detection')
     FRAME = frame
+    SNAPSHOT = snapshot
     HAS_FRAME = True
 
-camera = YoloCamera(callback)
+parser = argparse.ArgumentParser()
+parser.add_argument('--source', type=str, required=False, default=None, help="Detect on the CPU with OpenCV DNN from a webcam index, video or stream, rather than on the OAK-D")
+args = parser.parse_args()
+
+# Imported when needed, so that either works without the other's dependencies
+if args.source != None:
+    from camera.dnn import DnnCamera
+    camera = DnnCamera(int(args.source) if args.source.isdigit() else args.source, callback=callback)
+else:
+    from camera.yolocam import YoloCamera
+    camera = YoloCamera(callback)
+
 camera.start()
 
 try:
     while EXIT == False:
         if HAS_FRAME:
-            cv2.imshow("rgb", FRAME)
+            # Overlay is only drawn here for the preview, not on the camera thread
+            cv2.imshow("rgb", drawOverlay(FRAME.copy(), SNAPSHOT.detections))
             if cv2.waitKey(1) == ord('q'):
                 EXIT = True
 except KeyboardInterrupt:
     EXIT = True
 
-camera.stop()
\ No newline at end of file
+camera.stop()
@@ -0,0 +1,49 @@
+import sys
+import os.path
+
+# Import from src/ the same way its modules import each other. This replaces
+# utils/ on the path, as utils/camera.py would otherwise shadow src/camera.
+sys.path[0] = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir, 'src'))
+
+from recording.overlay import drawOverlay
+from recording.sidecar import readSidecar, sidecarPath
+import argparse
+import cv2
+
+# Renders the detection overlay onto a video recorded by `src/main.py --video`,
+# using the metadata sidecar saved next to it.
+
+def export(videoPath, sidecar, outputPath):
+    capture = cv2.VideoCapture(videoPath)
+    fps = capture.get(cv2.CAP_PROP_FPS)
+    size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    writer = cv2.VideoWriter(outputPath, cv2.VideoWriter_fourcc('M','J','P','G'), fps, size)
+
+    count = 0
+    for snapshot in readSidecar(sidecar):
+        ok, frame = capture.read()
+        if not ok:
+            break
+
+        writer.write(drawOverlay(frame, snapshot.detections))
+        count += 1
+
+    capture.release()
+    writer.release()
+
+    print('Exported ' + str(count) + ' frames to: ' + outputPath)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('video', type=str, help="Path to a recorded video")
+    parser.add_argument('--sidecar', type=str, required=False, default=None, help="Path to the video's metadata sidecar. Defaults to the one next to the video")
+    parser.add_argument('--output', type=str, required=False, default=None, help="Path to save the annotated video into")
+
+    args = parser.parse_args()
+
+    sidecar = args.sidecar if args.sidecar else sidecarPath(args.video)
+    output = args.output if args.output else os.path.splitext(args.video)[0] + '-overlay.mkv'
+
+    export(args.video, sidecar, output)
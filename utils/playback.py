@@ -0,0 +1,55 @@
+import sys
+import os.path
+
+# Import from src/ the same way its modules import each other. This replaces
+# utils/ on the path, as utils/camera.py would otherwise shadow src/camera.
+sys.path[0] = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir, 'src'))
+
+from camera.video import VideoFileCamera
+from constants import ALTITUDE, LOOP_TIMEOUT, VIDEO_PREFETCH, VIDEO_DECODE_WORKERS
+from core import Core
+from testutils.simulator import SimulatedVehicle
+import argparse
+import time
+
+# Plays a video recorded by `src/main.py --video` through Core against a
+# simulated vehicle, and reports how fast the host side of the pipeline runs.
+
+def playback(args):
+    camera = VideoFileCamera(args.video, realTime=args.realtime, prefetch=args.prefetch, workers=args.workers)
+
+    vehicle = SimulatedVehicle()
+    vehicle.place(0, 0, ALTITUDE)
+    vehicle.armed = True
+
+    core = Core(vehicle, camera)
+    core.startRunning()
+
+    start = time.monotonic()
+    camera.start()
+
+    # The same as Core's Running state, until every frame has been seen
+    sequence = 0
+    while camera.running() or camera.snapshot().sequence != sequence:
+        snapshot = camera.waitForDetections(sequence, LOOP_TIMEOUT)
+
+        core.loopStats.tick(snapshot.timestamp if snapshot.sequence != sequence else None)
+        core.tick(snapshot)
+        sequence = snapshot.sequence
+
+    elapsed = time.monotonic() - start
+    camera.stop()
+
+    print('Played {} frames in {:.2f} s ({:.1f} fps)'.format(camera.published, elapsed, camera.published / elapsed if elapsed > 0 else 0.0))
+    print('core loop: ' + core.loopStats.summary() + ', ' + str(core.staleFrames) + ' stale, commands: ' + core.emitter.summary())
+    print('latency (ms): ' + core.tracer.summary())
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('video', type=str, help="Path to a video recorded with --video, with its sidecar alongside")
+    parser.add_argument('--realtime', required=False, default=False, help="Specify to play at the recorded fps, rather than as fast as possible", action='store_true')
+    parser.add_argument('--prefetch', type=int, required=False, default=VIDEO_PREFETCH, help="Frames to read ahead of playback")
+    parser.add_argument('--workers', type=int, required=False, default=VIDEO_DECODE_WORKERS, help="Threads to decode frames on")
+    args = parser.parse_args()
+
+    playback(args)
@@ -0,0 +1,48 @@
+import sys
+import os.path
+
+# Import from src/ the same way its modules import each other. This replaces
+# utils/ on the path, as utils/camera.py would otherwise shadow src/camera.
+sys.path[0] = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir, 'src'))
+
+from recording.flightrecorder import loadFlightLog
+from replay import replayFlight
+import argparse
+import time
+
+import numpy as np
+
+# Replays a flight recorded by `src/main.py` through the current rules, and
+# reports where they now behave differently to what was recorded.
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('flight', type=str, help="Path to a .flight file")
+    args = parser.parse_args()
+
+    log = loadFlightLog(args.flight)
+    if len(log.records) == 0:
+        print('No records in: ' + args.flight)
+        sys.exit(0)
+
+    start = time.monotonic()
+    result = replayFlight(log)
+    elapsed = time.monotonic() - start
+
+    duration = float(log.records['time'][-1] - log.records['time'][0])
+    print('Replayed {} records ({:.1f} s of flight) in {:.2f} s'.format(len(log.records), duration, elapsed))
+
+    recordedRules = np.array([log.rules[i] if i >= 0 else 'n/a' for i in log.records['rule']])
+    replayedRules = np.array([log.rules[i] if i >= 0 else 'n/a' for i in result.rules])
+
+    recordedOutputs = np.stack((log.records['targetNorth'], log.records['targetEast'], log.records['targetYaw']), axis=1)
+
+    ruleChanges = recordedRules != replayedRules
+    outputChanges = ~np.isclose(recordedOutputs, result.outputs, atol=1e-3).all(axis=1)
+
+    print('Commands sent: {} recorded, {} replayed'.format(int(log.records['commandSent'].sum()), len(result.commands)))
+    print('Records with a different active rule: {}'.format(int(ruleChanges.sum())))
+    print('Records with a different rule output: {}'.format(int(outputChanges.sum())))
+
+    for index in np.flatnonzero(ruleChanges)[:10]:
+        print('  t={:.2f} recorded {} -> replayed {}'.format(log.records['time'][index], recordedRules[index], replayedRules[index]))
@@ -0,0 +1,76 @@
+import sys
+import os.path
+
+# Import from src/ the same way its modules import each other. This replaces
+# utils/ on the path, as utils/camera.py would otherwise shadow src/camera.
+sys.path[0] = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir, 'src'))
+
+from sweep import scenarioGrid, sweep, DEFAULT_TUNING
+import argparse
+import itertools
+import time
+
+# Runs follow scenarios for every combination of GPX walk, detection noise and
+# tuning across a process pool, then prints how well each tuning tracked.
+
+COLUMNS = ('track', 'noise', 'tuning', 'min sep (m)', 'reacquire (s)', 'losses', 'yaw err (deg)', 'cmd/s')
+
+def formatTuning(tuning) -> str:
+    return ' '.join('{}={}'.format(name, value) for name, value in sorted(tuning.items())) if tuning else 'default'
+
+def printTable(rows):
+    widths = [max(len(str(row[i])) for row in rows) for i in range(len(rows[0]))]
+
+    for row in rows:
+        print('  '.join(str(value).ljust(width) for value, width in zip(row, widths)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('tracks', type=str, nargs='+', help="GPX walks to follow")
+    parser.add_argument('--noise', type=float, nargs='+', default=[0.0], help="Detection noise levels, in meters")
+    parser.add_argument('--seeds', type=int, default=1, help="Repeats of each noisy scenario with a different seed")
+    parser.add_argument('--minimum_distance', type=float, nargs='+', default=[DEFAULT_TUNING['MINIMUM_DISTANCE']])
+    parser.add_argument('--backoff_distance', type=float, nargs='+', default=[DEFAULT_TUNING['BACKOFF_DISTANCE']])
+    parser.add_argument('--yaw_rate', type=float, nargs='+', default=[DEFAULT_TUNING['YAW_RATE']])
+    parser.add_argument('--workers', type=int, default=None, help="Processes to use, defaults to one per CPU")
+    parser.add_argument('--all', action='store_true', help="Print every scenario, not just the summary per tuning")
+    args = parser.parse_args()
+
+    tunings = [
+        { 'MINIMUM_DISTANCE': minimum, 'BACKOFF_DISTANCE': backoff, 'YAW_RATE': yawRate }
+        for minimum, backoff, yawRate in itertools.product(args.minimum_distance, args.backoff_distance, args.yaw_rate)
+    ]
+
+    scenarios = scenarioGrid(args.tracks, args.noise, tunings, range(args.seeds))
+
+    start = time.monotonic()
+    results = sweep(scenarios, args.workers)
+    elapsed = time.monotonic() - start
+
+    simulated = sum(result.duration for result in results)
+    print('Ran {} scenarios ({:.0f} s of flight) in {:.1f} s\n'.format(len(results), simulated, elapsed))
+
+    if args.all:
+        rows = [COLUMNS]
+        for result in results:
+            scenario = result.scenario
+            rows.append((os.path.basename(scenario.track), scenario.noise, formatTuning(scenario.tuning),
+                         '{:.2f}'.format(result.minSeparation), '{:.2f}'.format(result.reacquireTime), result.losses,
+                         '{:.1f}'.format(result.yawError), '{:.1f}'.format(result.commandRate)))
+
+        printTable(rows)
+        print()
+
+    # Worst case separation and reacquire time, mean of the rest, per tuning
+    rows = [('tuning', 'scenarios') + COLUMNS[3:]]
+    for tuning in tunings:
+        group = [result for result in results if result.scenario.tuning == tuning]
+
+        rows.append((formatTuning(tuning), len(group),
+                     '{:.2f}'.format(min(result.minSeparation for result in group)),
+                     '{:.2f}'.format(max(result.reacquireTime for result in group)),
+                     sum(result.losses for result in group),
+                     '{:.1f}'.format(sum(result.yawError for result in group) / len(group)),
+                     '{:.1f}'.format(sum(result.commandRate for result in group) / len(group))))
+
+    printTable(rows)
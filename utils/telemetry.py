@@ -0,0 +1,48 @@
+import sys
+import os.path
+
+# Import from src/ the same way its modules import each other. This replaces
+# utils/ on the path, as utils/camera.py would otherwise shadow src/camera.
+sys.path[0] = os.path.abspath(os.path.join(os.path.dirname(__file__), os.path.pardir, 'src'))
+
+from telemetry import TelemetryDecoder
+import argparse
+import socket
+
+# Listens for telemetry sent by `src/main.py --telemetry <host>:<port>`, and
+# prints the state it holds once per keyframe.
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, required=False, default=14600, help="UDP port to listen on")
+    args = parser.parse_args()
+
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(('0.0.0.0', args.port))
+
+    decoder = TelemetryDecoder()
+    lastPrinted = None
+
+    print('Listening for telemetry on port ' + str(args.port))
+
+    try:
+        while True:
+            state = decoder.decode(receiver.recv(4096))
+
+            if lastPrinted != None and state["time"] - lastPrinted < 1.0:
+                continue
+            lastPrinted = state["time"]
+
+            vehicle = state.get("vehicle", {})
+            target = state.get("target")
+            loop = state.get("loop", {})
+
+            print('{} {}: {} detections, target {}, alt {} m, heading {}, loop {} Hz, {} stale, {} sent, {} frames missed'.format(
+                state.get("state"), state.get("ruleName"), len(state.get("detections", [])),
+                '{:.1f} m at {:.1f} m'.format(target["z"], target["x"]) if target else 'none',
+                vehicle.get("altitude"), vehicle.get("heading"),
+                loop.get("rate"), loop.get("stale"), loop.get("sent"), decoder.missed))
+    except KeyboardInterrupt:
+        pass
+
+    receiver.close()